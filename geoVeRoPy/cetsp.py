@@ -1,5 +1,6 @@
 import math
 import networkx as nx
+import numpy as np
 import shapely
 from shapely.geometry import mapping
 
@@ -482,20 +483,24 @@ def cetspCheckVisit(startPt, endPt, nodes, seq, algo = 'SOCP'):
     path = degen['newPath']
     ofv = c2c['dist']
 
-    for i in range(len(path) - 1):
-        # 分段的线段
-        seg = [path[i], path[i + 1]]    
-        # 对于每个线段，测试哪些圆是经过了的
+    # 对于每个线段，测试哪些圆是经过了的，trespass按第一次经过的线段排序
+    if (len(path) > 1):
+        segs = [[path[i], path[i + 1]] for i in range(len(path) - 1)]
+        turningSet = set(turning)
+        seqSet = set(seq)
+        candIDs = [j for j in nodes if j not in turningSet and j not in seqSet]
+        firstSeg = {}
+        if (len(candIDs) > 0):
+            dist2Segs = distPts2Segs([nodes[j]['pt'] for j in candIDs], segs)
+            visited = dist2Segs <= np.array([nodes[j]['radius'] for j in candIDs])[:, None]
+            for k in range(len(candIDs)):
+                if (visited[k].any()):
+                    firstSeg[candIDs[k]] = int(np.argmax(visited[k]))
         for j in nodes:
-            if (j not in turning and j not in trespass):
-                if (j not in seq):
-                    dist2Seg = distPt2Seg(
-                        pt = nodes[j]['pt'],
-                        seg = seg)
-                    if (dist2Seg <= nodes[j]['radius']):
-                        trespass.append(j)
-                else:
-                    trespass.append(j)
+            if (j not in turningSet and j in seqSet):
+                firstSeg[j] = 0
+        order = {j: k for k, j in enumerate(nodes)}
+        trespass = sorted(firstSeg, key = lambda j: (firstSeg[j], order[j]))
 
     # 注意，turning中不包括startPt和endPt
     turning = turning[1:-1]
@@ -40,17 +40,7 @@ def solveDTSP(
         if (edges == 'Dictionary'):
             raise UnsupportedInputError(
                 "ERROR: `edges='Dictionary'` cannot re-optimize from an in-transit vehicle position.")
-        tmpNodes = {
-            '__from_position__': {'pt': pt1},
-            '__to_position__': {'pt': pt2}
-        }
-        tmpTau = matrixDist(
-            nodes = tmpNodes,
-            nodeIDs = ['__from_position__', '__to_position__'],
-            edges = edges,
-            ptFieldName = 'pt',
-            **kwargs)
-        return tmpTau['__from_position__', '__to_position__']
+        return pairDist(pt1, pt2, edges = edges, **kwargs)
 
     def extractPlan(solSeq, curKey, availableCustomerIDs):
         if (solSeq == None or len(solSeq) == 0):
@@ -103,14 +93,19 @@ def solveDTSP(
 
         tspTau = {}
         if (curNodeID == None):
-            localTau = matrixDist(
+            # NOTE: 只有当前位置是新的，其余的距离从tau中取
+            for i in tspNodeIDs[1:]:
+                for j in tspNodeIDs[1:]:
+                    if ((i, j) in tau):
+                        tspTau[i, j] = tau[i, j]
+            tspTau = updateMatrixDist(
+                oriTau = tspTau,
                 nodes = tspNodes,
-                nodeIDs = tspNodeIDs,
+                addNodeIDs = [curKey],
+                nodeIDs = tspNodeIDs[1:],
                 edges = edges,
                 ptFieldName = 'pt',
                 **kwargs)
-            for p in localTau:
-                tspTau[p] = localTau[p]
         else:
             for i in tspNodeIDs:
                 for j in tspNodeIDs:
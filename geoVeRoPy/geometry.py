@@ -15,6 +15,55 @@ import networkx as nx
 from .common import *
 from .tree import *
 
+# Shapely cache ===============================================================
+# NOTE: 按坐标内容缓存多边形对应的shapely对象，shapely对象不可修改，可以共用，超过上限时删除最久未使用的
+_polyShapelyCache = {}
+_polyShapelyCacheSize = 1000
+
+def cachedPolyShapely(poly: poly) -> shapely.Polygon:
+    """
+    Returns the prepared shapely.Polygon of a polygon, the same polygon (by coordinates) is only converted once
+
+    Parameters
+    ----------
+    poly: poly, required
+        The polygon
+
+    Return
+    ------
+    shapely.Polygon
+        The shapely object, prepared by `shapely.prepare()` so that the predicates (e.g., contains, intersects) are faster
+
+    Note
+    ----
+    The cache keeps the most recently used polygons, see :func:`~configSetPolyShapelyCache()`. Modifying `poly` in place is safe, since the key is the coordinates rather than the object.
+
+    """
+
+    arr = np.asarray(poly, dtype = float)
+    key = (arr.shape, arr.tobytes())
+    if (key in _polyShapelyCache):
+        polyShapely = _polyShapelyCache.pop(key)
+    else:
+        polyShapely = shapely.Polygon(arr if len(arr) > 0 else None)
+        shapely.prepare(polyShapely)
+    if (_polyShapelyCacheSize > 0):
+        while (len(_polyShapelyCache) >= _polyShapelyCacheSize):
+            del _polyShapelyCache[next(iter(_polyShapelyCache))]
+        _polyShapelyCache[key] = polyShapely
+    return polyShapely
+
+def configSetPolyShapelyCache(size: int) -> None:
+    """
+    Set the maximum number of polygons kept by :func:`~cachedPolyShapely()`, 0 to disable the cache. The cache is cleared.
+    """
+    global _polyShapelyCacheSize
+    if (size < 0):
+        raise OutOfRangeError("ERROR: `size` should be non-negative.")
+    _polyShapelyCacheSize = size
+    _polyShapelyCache.clear()
+    return
+
 # Relation between Pts ========================================================
 def is2PtsSame(pt1: pt, pt2: pt) -> bool:
     """
@@ -248,7 +297,7 @@ def subSegFromPoly(seg: line, poly: poly=None, polyShapely: shapely.Polygon=None
 
     # get shapely objects =====================================================
     if (polyShapely == None):
-        polyShapely = shapely.Polygon(poly)
+        polyShapely = cachedPolyShapely(poly)
     if (_isDegenerateSeg(seg)):
         ptShapely = shapely.Point(seg[0])
         intShape = shapely.difference(ptShapely, polyShapely)
@@ -1860,7 +1909,7 @@ def intSeg2Poly(seg: line, poly: poly=None, polyShapely: shapely.Polygon=None, r
 
     # get shapely objects =====================================================
     if (polyShapely == None):
-        polyShapely = shapely.Polygon(poly)
+        polyShapely = cachedPolyShapely(poly)
     if (_isDegenerateSeg(seg)):
         ptShapely = shapely.Point(seg[0])
         intShape = shapely.intersection(ptShapely, polyShapely)
@@ -2322,9 +2371,9 @@ def intPoly2Poly(poly1: poly=None, poly2: poly=None, poly1Shapely: shapely.Polyg
     """
 
     if (poly1Shapely == None):
-        poly1Shapely = shapely.Polygon([p for p in poly1])
+        poly1Shapely = cachedPolyShapely(poly1)
     if (poly2Shapely == None):
-        poly2Shapely = shapely.Polygon([p for p in poly2])
+        poly2Shapely = cachedPolyShapely(poly2)
 
     intShape = shapely.intersection(poly1Shapely, poly2Shapely)
     intType = shapely.get_type_id(intShape)
@@ -2417,6 +2466,14 @@ def isPolyIntPoly(poly1: poly=None, poly2: poly=None, poly1Shapely: shapely.Poly
         ... }
     """
 
+    # NOTE: 不要求内部相交时，直接用prepared geometry判断是否相交，不需要计算交集
+    if (not interiorOnly):
+        if (poly1Shapely == None):
+            poly1Shapely = cachedPolyShapely(poly1)
+        if (poly2Shapely == None):
+            poly2Shapely = cachedPolyShapely(poly2)
+        return bool(shapely.intersects(poly1Shapely, poly2Shapely))
+
     intSp = intPoly2Poly(poly1, poly2, poly1Shapely, poly2Shapely)
     # 若只输出了一个字典，按字典判断
     if (isinstance(intSp, dict)):
@@ -2687,7 +2744,7 @@ def distPt2Poly(pt: pt, poly: poly=None, polyShapely: shapely.Polygon=None) -> f
         raise MissingParameterError("ERROR: Missing required field `poly` or `polyShapely`")
 
     if (polyShapely == None):
-        polyShapely = shapely.Polygon([p for p in poly])
+        polyShapely = cachedPolyShapely(poly)
     ptShapely = shapely.Point(pt)
     return shapely.distance(ptShapely, polyShapely)
 
@@ -2719,9 +2776,9 @@ def distPoly2Poly(poly1: poly=None, poly2: poly=None, poly1Shapely: shapely.Poly
         raise MissingParameterError("ERROR: Missing required field `poly2` or `poly2Shapely`")
 
     if (poly1Shapely == None):
-        poly1Shapely = shapely.Polygon([p for p in poly1])
+        poly1Shapely = cachedPolyShapely(poly1)
     if (poly2Shapely == None):
-        poly2Shapely = shapely.Polygon([p for p in poly2])
+        poly2Shapely = cachedPolyShapely(poly2)
     return shapely.distance(poly1Shapely, poly2Shapely)
 
 def distPoly2Seq(poly: poly, seq: list[pt], closedFlag: bool = False, detailFlag: bool = False) -> float: 
@@ -2765,7 +2822,7 @@ def nearestPtLine2Poly(line: line, poly: poly=None, polyShapely: shapely.Polygon
         raise MissingParameterError("ERROR: Missing required field `poly` or `polyShapely`")
 
     if (polyShapely == None):
-        polyShapely = shapely.Polygon([p for p in poly])
+        polyShapely = cachedPolyShapely(poly)
     lineShapely = shapely.LineString(line)
     nearestPts = nearest_points(lineShapely, polyShapely)
     
@@ -3047,7 +3104,7 @@ def ptPolyCenter(poly: poly=None, polyShapely: shapely.Polygon=None) -> pt:
     if (poly == None and polyShapely == None):
         raise MissingParameterError("ERROR: Missing required field 'poly' or 'polyShapely'.")
     if (polyShapely == None):
-        polyShapely = shapely.Polygon(poly)
+        polyShapely = cachedPolyShapely(poly)
 
     ptShapely = shapely.centroid(polyShapely)
     center = (ptShapely.x, ptShapely.y)
@@ -3166,7 +3223,7 @@ def polysUnion(polys:polys=None, polysShapely:list[shapely.Polygon]=None, return
     if (polysShapely == None):
         polysShapely = []
         for p in polys:
-            polysShapely.append(shapely.Polygon(p))
+            polysShapely.append(cachedPolyShapely(p))
     unionAll = shapely.union_all(polysShapely)
     if (returnShaplelyObj):
         return unionAll
@@ -3216,17 +3273,17 @@ def polysSubtract(polys:polys=None, polysShapely:list[shapely.Polygon]=None, sub
         polysShapely = []
         for p in polys:
             if (unionAll == None):
-                unionAll = shapely.Polygon(p)
+                unionAll = cachedPolyShapely(p)
                 unionAll = unionAll.buffer(0.01)
             else:
-                unionAll = shapely.union(unionAll, shapely.Polygon(p))
+                unionAll = shapely.union(unionAll, cachedPolyShapely(p))
                 unionAll = unionAll.buffer(0.01)
     
     diffShapely = unionAll
     if (subPolysShapely == None):
         subPolysShapely = []
         for p in subPolys:
-            diffShapely = shapely.difference(unionAll, shapely.Polygon(p))
+            diffShapely = shapely.difference(unionAll, cachedPolyShapely(p))
             diffShapely = diffShapely.buffer(0.01)
 
     if (returnShaplelyObj):
@@ -3268,7 +3325,7 @@ def polysIntersect(polys: polys=None, polysShapely:list[shapely.Polygon]=None, r
     if (polysShapely == None):
         polysShapely = []
         for p in polys:
-            polysShapely.append(shapely.Polygon(p))
+            polysShapely.append(cachedPolyShapely(p))
     intersectionAll = shapely.intersection_all(polysShapely)
 
     if (returnShaplelyObj):
@@ -3349,8 +3406,235 @@ def polyConvexHull(pts: list[pt]) -> poly:
             noRepeatCvx.append(i)
     return noRepeatCvx
 
+# Batch predicates ============================================================
+# NOTE: 以下函数与对应的单点函数使用相同的ERRTOL，输入为np.ndarray，支持广播
+def _is2PtsSameArr(pts1: np.ndarray, pts2: np.ndarray) -> np.ndarray:
+    return np.all(np.abs(pts1 - pts2) < ERRTOL['distPt2Pt'], axis = -1)
+
+def _is3PtsClockWiseArr(pts1: np.ndarray, pts2: np.ndarray, pts3: np.ndarray) -> np.ndarray:
+    # NOTE: 1为顺时针，-1为逆时针，0为共线(即is3PtsClockWise()返回None)
+    ori = ((pts2[..., 0] - pts1[..., 0]) * (pts3[..., 1] - pts1[..., 1]) 
+        - (pts2[..., 1] - pts1[..., 1]) * (pts3[..., 0] - pts1[..., 0]))
+    res = np.where(ori < 0, 1, -1)
+    res[(np.abs(ori) <= ERRTOL['collinear']) 
+        | _is2PtsSameArr(pts1, pts2) | _is2PtsSameArr(pts2, pts3) | _is2PtsSameArr(pts1, pts3)] = 0
+    return res
+
+def _isPtsOnSegArr(pts: np.ndarray, segStart: np.ndarray, segEnd: np.ndarray, interiorOnly: bool=False) -> np.ndarray:
+    pts, segStart, segEnd = np.broadcast_arrays(pts, segStart, segEnd)
+    onLine = _is3PtsClockWiseArr(pts, segStart, segEnd) == 0
+    onSeg = onLine & (np.abs(
+        np.hypot(pts[..., 0] - segStart[..., 0], pts[..., 1] - segStart[..., 1])
+        + np.hypot(pts[..., 0] - segEnd[..., 0], pts[..., 1] - segEnd[..., 1])
+        - np.hypot(segStart[..., 0] - segEnd[..., 0], segStart[..., 1] - segEnd[..., 1])) <= ERRTOL['distPt2Pt'])
+    if (interiorOnly):
+        onSeg = onSeg & ~_is2PtsSameArr(pts, segStart) & ~_is2PtsSameArr(pts, segEnd)
+    # 退化的线段视为点
+    degenerate = _is2PtsSameArr(segStart, segEnd)
+    return np.where(degenerate, _is2PtsSameArr(pts, segStart) & (not interiorOnly), onSeg)
+
+def isPtsInPoly(pts: np.ndarray|list[pt], poly: poly, interiorOnly: bool=False) -> np.ndarray:
+    """
+    Are the pts in the polygon? The batch version of :func:`~isPtInPoly()`
+
+    Parameters
+    ----------
+    pts: np.ndarray|list[pt], required
+        A (N, 2) array of coordinates
+    poly: poly, required
+        The polygon
+    interiorOnly: bool, optional, default as False
+        True if only consider intersecting in the interior
+
+    Return
+    ------
+    np.ndarray
+        A (N, ) array of bool, True if the point is in the polygon
+
+    """
+
+    pts = np.asarray(pts, dtype = float).reshape(-1, 2)
+    polyArr = np.asarray(poly, dtype = float).reshape(-1, 2)
+    x = pts[:, 1]
+    y = pts[:, 0]
+    inPoly = np.zeros(len(pts), dtype = bool)
+    j = len(polyArr) - 1
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        for i in range(len(polyArr)):
+            xi = polyArr[i, 1]
+            yi = polyArr[i, 0]
+            xj = polyArr[j, 1]
+            yj = polyArr[j, 0]
+            intersect = (yi > y) != (yj > y)
+            intersect &= x < (xj - xi) * (y - yi) / (yj - yi) + xi
+            inPoly ^= intersect
+            j = i
+    # Check if the intertion is in the interior ===============================
+    if (interiorOnly and len(polyArr) > 0):
+        onEdge = _isPtsOnSegArr(pts[:, None, :], np.roll(polyArr, 1, axis = 0)[None, :, :], polyArr[None, :, :]).any(axis = 1)
+        return inPoly & ~onEdge
+    else:
+        return inPoly
+
+def isSegsIntSeg(segs: np.ndarray|list[line], seg: line, interiorOnly: bool=False) -> np.ndarray:
+    """
+    Are the line segments intersect with another line segment? The batch version of :func:`~isSegIntSeg()`
+
+    Parameters
+    ----------
+    segs: np.ndarray|list[line], required
+        A (N, 2, 2) array of line segments
+    seg: line, required
+        The other line segment
+    interiorOnly: bool, optional, default as False
+        True if only consider intersecting in the interior
+        
+    Return
+    ------
+    np.ndarray
+        A (N, ) array of bool, True if intersects
+    """ 
+
+    segs = np.asarray(segs, dtype = float).reshape(-1, 2, 2)
+    A = segs[:, 0, :]
+    B = segs[:, 1, :]
+    C = np.asarray(seg[0], dtype = float)
+    D = np.asarray(seg[1], dtype = float)
+    seg1Degenerate = _is2PtsSameArr(A, B)
+    seg2Degenerate = bool(_is2PtsSameArr(C, D))
+
+    # Bounding box ============================================================
+    overlap = ~((max(C[0], D[0]) < np.minimum(A[:, 0], B[:, 0]))
+        | (np.maximum(A[:, 0], B[:, 0]) < min(C[0], D[0]))
+        | (max(C[1], D[1]) < np.minimum(A[:, 1], B[:, 1]))
+        | (np.maximum(A[:, 1], B[:, 1]) < min(C[1], D[1])))
+
+    # 判断是否相互跨立
+    d1 = _is3PtsClockWiseArr(A, B, C)
+    d2 = _is3PtsClockWiseArr(A, B, D)
+    d3 = _is3PtsClockWiseArr(C, D, A)
+    d4 = _is3PtsClockWiseArr(C, D, B)
+    touch = (d1 == 0) | (d2 == 0) | (d3 == 0) | (d4 == 0)
+    res = overlap & np.where(touch, not interiorOnly, (d1 * d2 < 0) & (d3 * d4 < 0))
+
+    # Degenerated segments ====================================================
+    if (seg2Degenerate):
+        res = np.where(seg1Degenerate, _is2PtsSameArr(A, C) & (not interiorOnly), _isPtsOnSegArr(C, A, B, interiorOnly))
+    elif (seg1Degenerate.any()):
+        res = np.where(seg1Degenerate, _isPtsOnSegArr(A, C, D, interiorOnly), res)
+    return res
+
+def distPts2Seg(pts: np.ndarray|list[pt], seg: line) -> np.ndarray:
+    """
+    The distances between the points and a line segment. The batch version of :func:`~distPt2Seg()`
+
+    Parameters
+    ----------
+    pts: np.ndarray|list[pt], required
+        A (N, 2) array of coordinates
+    seg: line, required
+        The line segment
+
+    Return
+    ------
+    np.ndarray
+        A (N, ) array of distances
+
+    """
+
+    return distPts2Segs(pts, [seg])[:, 0]
+
+def distPts2Segs(pts: np.ndarray|list[pt], segs: np.ndarray|list[line]) -> np.ndarray:
+    """
+    The distances between each point and each line segment. The batch version of :func:`~distPt2Seg()`
+
+    Parameters
+    ----------
+    pts: np.ndarray|list[pt], required
+        A (N, 2) array of coordinates
+    segs: np.ndarray|list[line], required
+        A (M, 2, 2) array of line segments
+
+    Return
+    ------
+    np.ndarray
+        A (N, M) array, the distance between the i-th point and the j-th segment in entry [i, j]
+
+    """
+
+    pts = np.asarray(pts, dtype = float).reshape(-1, 1, 2)
+    segs = np.asarray(segs, dtype = float).reshape(1, -1, 2, 2)
+    A = segs[:, :, 0, :]
+    B = segs[:, :, 1, :]
+    AP = pts - A
+    AB = B - A
+    distA = np.hypot(AP[..., 0], AP[..., 1])
+    distB = np.hypot(pts[..., 0] - B[..., 0], pts[..., 1] - B[..., 1])
+    l = np.hypot(AB[..., 0], AB[..., 1])
+    # r = (A->P A->B) / (|AB|^2)
+    degenerate = _is2PtsSameArr(A, B)
+    with np.errstate(divide = 'ignore', invalid = 'ignore'):
+        r = (AP[..., 0] * AB[..., 0] + AP[..., 1] * AB[..., 1]) / (l ** 2)
+        inner = np.abs(AB[..., 0] * AP[..., 1] - AB[..., 1] * AP[..., 0]) / l
+    dist = np.where(r <= 0, distA, np.where(r >= 1, distB, inner))
+    return np.where(degenerate, distA, dist)
+
+# Spatial index ===============================================================
+class PolysSpatialIndex(object):
+    """
+    A spatial index (STRtree of bounding boxes) of a set of polygons, to find the candidate polygons near a point, a segment or a polygon
+
+    Parameters
+    ----------
+
+    polys: list of poly|dict, required
+        The polygons, either a list of polygons or a dictionary with the polygon in `polyFieldName`
+    polyFieldName: str, optional, default as 'poly'
+        The field name of polygon if `polys` is a dictionary
+    tol: float, optional, default as None
+        The bounding boxes are enlarged by `tol`, by default the largest distance tolerance in ERRTOL, so that the candidates include every polygon that the predicates with tolerance may consider as intersected
+
+    Note
+    ----
+    The queries only compare bounding boxes, the candidates still need to be tested exactly. The candidates are returned in the same order as in `polys`, i.e., the indices if `polys` is a list, the keys if `polys` is a dictionary.
+
+    """
+
+    def __init__(self, polys: list[poly]|dict, polyFieldName: str = 'poly', tol: float|None = None):
+        if (polys == None):
+            raise MissingParameterError("ERROR: Missing required field `polys`.")
+        self.keys = []
+        bounds = []
+        for p in (polys if type(polys) == dict else range(len(polys))):
+            poly = polys[p][polyFieldName] if type(polys) == dict else polys[p]
+            if (len(poly) == 0):
+                continue
+            self.keys.append(p)
+            bounds.append([min(pt[0] for pt in poly), min(pt[1] for pt in poly), max(pt[0] for pt in poly), max(pt[1] for pt in poly)])
+        self.tol = max(ERRTOL['distPt2Pt'], ERRTOL['distPt2Seg'], ERRTOL['distPt2Poly']) if tol == None else tol
+        self.bounds = np.array(bounds, dtype = float).reshape(-1, 4)
+        self.bounds[:, :2] -= self.tol
+        self.bounds[:, 2:] += self.tol
+        self.tree = shapely.STRtree(shapely.box(self.bounds[:, 0], self.bounds[:, 1], self.bounds[:, 2], self.bounds[:, 3]))
+
+    def query(self, pts: list[pt]) -> list:
+        # NOTE: 查询pts的外接矩形，返回外接矩形相交的多边形，按原来的顺序
+        xs = [pt[0] for pt in pts]
+        ys = [pt[1] for pt in pts]
+        idx = self.tree.query(shapely.box(min(xs), min(ys), max(xs), max(ys)))
+        return [self.keys[k] for k in sorted(idx.tolist())]
+
+    def queryPt(self, pt: pt) -> list:
+        return self.query([pt])
+
+    def querySeg(self, seg: line) -> list:
+        return self.query(seg)
+
+    def queryPoly(self, poly: poly) -> list:
+        return self.query(poly)
+
 # Visibility check ============================================================
-def polysVisibleGraph(polys:polys) -> dict:
+def polysVisibleGraph(polys:polys, reducedFlag:bool=False) -> dict:
     """
     Create a visual graph for given polys.
 
@@ -3358,197 +3642,427 @@ def polysVisibleGraph(polys:polys) -> dict:
     ----------
     polys: polys, required
         The polys to create visual graph
+    reducedFlag: bool, optional, default as False
+        If True, only keeps the edges that are tangent to the polygons at both ends (the reduced visibility graph). Shortest paths among the polygons only use these edges, so the distances are the same while the graph is much sparser
 
     Return
     ------
     dict
         Each polygon has a index p, each point in the polygon has a index e, therefore, a (p, e) pair defines a location. The visual graph returns use (p, e) as keys, collects the location of (p, e) in 'pt', and finds the set of visible (p, e) in 'visible'
 
+    Note
+    ----
+    Uses a rotational sweep around each vertex (de Berg et al., Computational Geometry, Chapter 15). Sorting the vertices is O(n^2 log n) for n vertices in total. The edges crossing the sweeping ray are kept in a sorted list, each insertion or deletion is O(m) for m edges on the ray, so the worst case is O(n^3), but m is usually much smaller than n, and shifting a list is faster than a balanced tree in Python at this size.
+
     """
 
+    geo = _visPolysGeo(polys)
     vg = {}
-    for p in range(len(polys)):
-        for e in range(len(polys[p])):
-            vg[(p, e)] = {'pt': polys[p][e], 'visible': []}
-            W = _visPtAmongPolys((p, e), polys, knownVG=vg)
-            # print(p, e, W)
-            for w in W:
-                vg[(p, e)]['visible'].append(w)
+    for i in range(len(geo['keys'])):
+        vg[geo['keys'][i]] = {'pt': polys[geo['keys'][i][0]][geo['keys'][i][1]], 'visible': []}
+    for i in range(len(geo['keys'])):
+        # NOTE: 精简模式下凹顶点不会出现在最短路上，跳过
+        if (reducedFlag and geo['reflex'][i]):
+            continue
+        W = _visSweep(geo, geo['x'][i], geo['y'][i], i, reducedFlag)
+        vg[geo['keys'][i]]['visible'] = [geo['keys'][w] for w in W]
     return vg
 
-def _visPtAmongPolys(v:int|str|tuple, polys:polys, standalonePts:dict|None=None, knownVG:dict={}) -> list:
+def _visPtAmongPolys(v:int|str|tuple, polys:polys, standalonePts:dict|None=None, reducedFlag:bool=False) -> list:
     # NOTE: 该函数不需要使用shapely
-    vertices = {}
-    polyVertices = []
-    for p in range(len(polys)):
-        for e in range(len(polys[p])):
-            vertices[(p, e)] = {
-                'pt': polys[p][e],
-                'visible': []
-            }
-            polyVertices.append((p, e))
+    geo = _visPolysGeo(polys)
     if (standalonePts != None):
         if (v not in standalonePts):
             raise MissingParameterError("ERROR: Cannot find `v` in `polys` or `standalonePts`")
+        W = _visSweep(geo, float(standalonePts[v]['pt'][0]), float(standalonePts[v]['pt'][1]), None, reducedFlag)
+    else:
+        if (v not in geo['index']):
+            raise MissingParameterError("ERROR: Cannot find `v` in `polys` or `standalonePts`")
+        i = geo['index'][v]
+        W = _visSweep(geo, geo['x'][i], geo['y'][i], i, reducedFlag)
+    return [geo['keys'][w] for w in W]
+
+def _visPolysGeo(polys:polys) -> dict:
+    # NOTE: 把所有多边形的顶点展开编号，边k为顶点k到其下一个顶点，同时记录每个顶点处内角的范围
+    keys = []
+    x = []
+    y = []
+    prv = []
+    nxt = []
+    for p in range(len(polys)):
+        m = len(polys[p])
+        base = len(keys)
+        for e in range(m):
+            keys.append((p, e))
+            x.append(float(polys[p][e][0]))
+            y.append(float(polys[p][e][1]))
+            prv.append(base + (e - 1) % m)
+            nxt.append(base + (e + 1) % m)
+
+    # 内角从指向后一个顶点的方向逆时针转到指向前一个顶点的方向（逆时针的多边形）
+    coneStart = []
+    coneSize = []
+    reflex = []
+    for p in range(len(polys)):
+        m = len(polys[p])
+        area = sum(polys[p][e][0] * polys[p][(e + 1) % m][1] - polys[p][(e + 1) % m][0] * polys[p][e][1] for e in range(m))
+        for e in range(m):
+            i = len(coneStart)
+            a = (x[prv[i]] - x[i], y[prv[i]] - y[i])
+            b = (x[nxt[i]] - x[i], y[nxt[i]] - y[i])
+            if (area < 0):
+                a, b = b, a
+            angB = math.atan2(b[1], b[0])
+            size = (math.atan2(a[1], a[0]) - angB) % (2 * math.pi)
+            coneStart.append(angB)
+            coneSize.append(size)
+            reflex.append(size > math.pi)
+
+    return {
+        'keys': keys,
+        'index': {keys[i]: i for i in range(len(keys))},
+        'x': x,
+        'y': y,
+        'prv': prv,
+        'nxt': nxt,
+        'coneStart': coneStart,
+        'coneSize': coneSize,
+        'reflex': reflex
+    }
+
+def _visSweep(geo:dict, px:float, py:float, selfIdx:int|None=None, reducedFlag:bool=False) -> list:
+    # NOTE: 以(px, py)为中心逆时针扫描所有顶点，状态结构是与当前射线相交的边，按到(px, py)的距离排序
+    #       因为多边形的边互不相交，所以插入时按当前射线比较的先后顺序在扫描过程中保持不变，判断可视只需要查最近的边
+    #       状态用有序列表，插入删除是O(m)，m为射线上的边数
+    prv = geo['prv']
+    nxt = geo['nxt']
+    n = len(prv)
+    if (n == 0):
+        return []
+    angTol = 1e-9
+
+    # 顶点按极角排序，极角相同的按距离排序
+    dxArr = np.array(geo['x']) - px
+    dyArr = np.array(geo['y']) - py
+    distArr = np.hypot(dxArr, dyArr)
+    angArr = np.mod(np.arctan2(dyArr, dxArr), 2 * math.pi)
+    order = np.lexsort((distArr, angArr)).tolist()
+    distTol = 1e-9 * (1 + distArr.max())
+
+    # 边k为顶点k到nxt[k]，射线与边的交点距离为cross(a, e) / cross(u, e)
+    exArr = dxArr[nxt] - dxArr
+    eyArr = dyArr[nxt] - dyArr
+    numArr = dxArr * eyArr - dyArr * exArr
+    # 线段从w处进入w所在的多边形内部时不可视，即方向w -> (px, py)严格在w处的内角之内
+    t = np.mod(np.arctan2(-dyArr, -dxArr) - np.array(geo['coneStart']), 2 * math.pi)
+    intoPoly = ((t > angTol) & (t < np.array(geo['coneSize']) - angTol)).tolist()
+
+    dx = dxArr.tolist()
+    dy = dyArr.tolist()
+    dist = distArr.tolist()
+    ex = exArr.tolist()
+    ey = eyArr.tolist()
+    num = numArr.tolist()
+    elen = np.hypot(exArr, eyArr).tolist()
+
+    # 与(px, py)相连的边不会阻挡
+    incident = [False] * n
+    if (selfIdx != None):
+        incident[selfIdx] = True
+        incident[prv[selfIdx]] = True
+
+    # 边k与方向(ux, uy)的射线的交点到(px, py)的距离
+    def rayDist(k, ux, uy):
+        denom = ux * ey[k] - uy * ex[k]
+        if (abs(denom) <= angTol * elen[k]):
+            return min(dist[k], dist[nxt[k]])
+        return num[k] / denom
+
+    # 距离相同时(共用一个端点)，比较射线稍微逆时针转动后的距离
+    def rayCot(k, ux, uy):
+        cx = ex[k]
+        cy = ey[k]
+        c = ux * cy - uy * cx
+        if (c < 0):
+            cx = -cx
+            cy = -cy
+            c = -c
+        if (c == 0):
+            return float('inf')
+        return (ux * cx + uy * cy) / c
+
+    def insert(k, rk, ux, uy):
+        lo = 0
+        hi = len(status)
+        cotK = None
+        while (lo < hi):
+            mid = (lo + hi) // 2
+            r = rayDist(status[mid], ux, uy)
+            if (abs(r - rk) > distTol):
+                nearerFlag = r < rk
+            else:
+                if (cotK == None):
+                    cotK = rayCot(k, ux, uy)
+                nearerFlag = rayCot(status[mid], ux, uy) < cotK
+            if (nearerFlag):
+                lo = mid + 1
+            else:
+                hi = mid
+        status.insert(lo, k)
+        inStatus[k] = True
+
+    # 方向(ux, uy)是否严格在顶点i处多边形的内角之内
+    def interior(i, ux, uy):
+        t = (math.atan2(uy, ux) - geo['coneStart'][i]) % (2 * math.pi)
+        return angTol < t < geo['coneSize'][i] - angTol
+
+    # 直线(px, py) - i是否在顶点i处与多边形相切，即前后两个顶点不在直线的两侧
+    def tangent(i, ux, uy):
+        sa = ux * (dy[prv[i]] - dy[i]) - uy * (dx[prv[i]] - dx[i])
+        sb = ux * ey[i] - uy * ex[i]
+        la = elen[prv[i]]
+        lb = elen[i]
+        return not ((sa > angTol * la and sb < -angTol * lb) or (sa < -angTol * la and sb > angTol * lb))
+
+    # Initialize the status with edges crossing the ray along x-axis ==========
+    status = []
+    inStatus = [False] * n
+    crossing = np.nonzero(((dyArr > 0) & (dyArr[nxt] < 0)) | ((dyArr < 0) & (dyArr[nxt] > 0)))[0].tolist()
+    for k in crossing:
+        if (not incident[k]):
+            rk = rayDist(k, 1.0, 0.0)
+            if (rk > distTol):
+                insert(k, rk, 1.0, 0.0)
+
+    # Sweep ===================================================================
+    W = []
+    prevW = None
+    prevVisible = False
+    for w in order:
+        if (w == selfIdx or dist[w] <= distTol):
+            prevW = None
+            continue
+        ux = dx[w] / dist[w]
+        uy = dy[w] / dist[w]
+
+        # Is w visible from (px, py)
+        visible = True
+        # 线段不能从w处进入w所在的多边形内部
+        if (intoPoly[w]):
+            visible = False
+        # 也不能从(px, py)处进入其所在的多边形内部
+        elif (selfIdx != None and interior(selfIdx, ux, uy)):
+            visible = False
+        # 上一个顶点不在线段上时，只要检查最近的边
+        elif (prevW == None or abs(dx[prevW] * uy - dy[prevW] * ux) > angTol * dist[prevW] or dist[prevW] >= dist[w]):
+            if (len(status) > 0 and rayDist(status[0], ux, uy) < dist[w] - distTol):
+                visible = False
+        # 上一个顶点在线段上，需要上一个顶点可视，且两个顶点之间没有边
+        elif (not prevVisible or interior(prevW, ux, uy)):
+            visible = False
         else:
-            vertices[v] = {
-                'pt': standalonePts[v]['pt'],
-                'visible': []
-            }
+            for k in status:
+                r = rayDist(k, ux, uy)
+                if (r <= dist[prevW] + distTol):
+                    continue
+                if (r < dist[w] - distTol):
+                    visible = False
+                break
+        prevW = w
+        prevVisible = visible
+
+        if (visible and (not reducedFlag 
+                or (tangent(w, ux, uy) and (selfIdx == None or tangent(selfIdx, ux, uy))))):
+            W.append(w)
+
+        # Update the status, remove edges on the clockwise side, insert edges on the counter-clockwise side
+        kPrev = prv[w]
+        sidePrev = ux * dy[kPrev] - uy * dx[kPrev]
+        sideNext = ux * dy[nxt[w]] - uy * dx[nxt[w]]
+        if (inStatus[kPrev] and sidePrev <= 0):
+            status.remove(kPrev)
+            inStatus[kPrev] = False
+        if (inStatus[w] and sideNext <= 0):
+            status.remove(w)
+            inStatus[w] = False
+        if (not incident[kPrev] and not inStatus[kPrev] and sidePrev > 0):
+            insert(kPrev, dist[w], ux, uy)
+        if (not incident[w] and not inStatus[w] and sideNext > 0):
+            insert(w, dist[w], ux, uy)
+    return W
 
-    # 把所有的poly vertices按到v的距离排序，从而给每个点得到一个可排序的唯一编码
-    verticeDistIndex = {}
-    sortedSeq = nodeSeqByDist(
-        nodes = vertices,
-        refPt = vertices[v]['pt'],
-        nodeIDs = polyVertices)
-    for i in range(len(sortedSeq)):
-        verticeDistIndex[sortedSeq[i]] = i
-    # 把所有的poly vertices按到v的角度排序，从x轴正方向开始，从而得到后续可视性检查的顺序
-    sweepSeq = nodeSeqBySweeping(
-        nodes = vertices,
-        nodeIDs = polyVertices,
-        refPt = vertices[v]['pt'],
-        initDeg = 90)
-
-    # 用一个红黑树来维护射线通过的边，边的键值用(closer-index, further-index)，这样排序的时候无论如何都能保持距离关系
-    def rayIntersectPolyEdges(ray, polys) -> RedBlackTree:
-        T = RedBlackTree()
-        # FIXME: 这个显然需要用线段树来优化，在这里就先实现再说吧
-        for p in range(len(polys)):
-            for i in range(-1, len(polys[p]) - 1):
-                edge = [polys[p][i], polys[p][i + 1]]
-                # NOTE: 注意，这里射线可以与线段交于端点上
-                if (isSegIntRay(edge, ray, interiorOnly=True)):
-                    # NOTE: 防止数组溢出
-                    k = i
-                    if (i == -1):
-                        k = len(polys[p]) - 1
-                    vIdx1 = verticeDistIndex[(p, k)]
-                    vIdx2 = verticeDistIndex[(p, i + 1)]
-                    T.insert(RedBlackTreeNode(
-                        key = (min(vIdx1, vIdx2), max(vIdx1, vIdx2)), 
-                        value = [(p, k), (p, i + 1)]))
-        return T
-
-    # 初始射线方向为x-轴正方向
-    xAxisRay = [vertices[v]['pt'], (vertices[v]['pt'][0] + 1, vertices[v]['pt'][1])]
-    T = rayIntersectPolyEdges(xAxisRay, polys)
-
-    # 给定一个障碍物的顶点w_i，确定v是否可以见到w_i
-    # NOTE: 这里的wi, wim（也就是w_{i-1})得是polys的顶点
-    def visible(wi, wim, polys):
-        # 如果wiv已经确定可视，直接返回True
-        if (wi in knownVG and v in knownVG[wi]['visible']):
-            # print("Time saved")
-            return True
+class VisibilityGraph(object):
+    """
+    A visibility graph among polygons, which answers shortest path queries between points avoiding the polygons
 
-        # 所在的polygon的编号
-        polyV = polys[v[0]] if len(v) == 2 else None
-        polyW = polys[wi[0]]
-        vwi = [vertices[v]['pt'], vertices[wi]['pt']]
-
-        vNext = None
-        vPrev = None
-        if (len(v) == 2):
-            vNext = (v[0], v[1] + 1 if v[1] < len(polys[v[0]]) - 1 else 0)
-            vPrev = (v[0], v[1] - 1 if v[1] > 0 else len(polys[v[0]]) - 1)
-        wiNext = (wi[0], wi[1] + 1 if wi[1] < len(polys[wi[0]]) - 1 else 0)
-        wiPrev = (wi[0], wi[1] - 1 if wi[1] > 0 else len(polys[wi[0]]) - 1)        
-
-        # 判断是否是相邻节点，相邻节点直接返回可见
-        if (polyV == polyW and (wi == vNext or wi == vPrev)):
-            # print("Visible by neighboring: ", v, wi)
-            return True
+    Parameters
+    ----------
 
-        # 需要w_{i-1}不存在，或者w_{i-1}不在线段vwi上
-        notOnlineFlag = False
-        if (wim == None or not isPtOnSeg(wim, vwi)):
-            notOnlineFlag = True
-
-        # 若T非空，查有没有阻拦线段
-        noSegBlockFlag = True
-        if (notOnlineFlag and not T.isEmpty and not T.min(T.root).isNil):
-            for edge in T.traverse():
-                if (isSegIntSeg(
-                        seg1 = [vertices[edge.value[0]]['pt'], vertices[edge.value[1]]['pt']], 
-                        seg2 = vwi, 
-                        interiorOnly = True)):
-                    noSegBlockFlag = False
-                    break
+    polys: polys, required
+        The polygons as barriers
+    reducedFlag: bool, optional, default as True
+        If True, only keeps the edges that are tangent to the polygons at both ends, see :func:`~polysVisibleGraph()`
+    polyVG: dict, optional, default as None
+        The pre-calculated visual-graph using :func:`~polysVisibleGraph()`. If provided, the edges are taken from it instead of sweeping again
+    cacheSize: int, optional, default as 1000
+        The maximum number of start/end points whose visible vertices are kept
 
-        # 如果visibleFlag，查交点上是否相切
-        int2PolyVTangenFlag = False
-        int2PolyWTangenFlag = False
-        if (noSegBlockFlag):
-            # Check point V
-            if (polyV == None):
-                int2PolyVTangenFlag = True
-            else:
-                segV = [vertices[vNext]['pt'], vertices[vPrev]['pt']]
-                int2PolyVTangenFlag = not isLineIntSeg(vwi, segV, interiorOnly=True)
-        if (int2PolyVTangenFlag):
-            # Check point W
-            segW = [vertices[wiNext]['pt'], vertices[wiPrev]['pt']]
-            int2PolyWTangenFlag = not isLineIntSeg(vwi, segW, interiorOnly=True)
-        bothEndTangenFlag = int2PolyVTangenFlag and int2PolyWTangenFlag
-
-        # 如果没有阻挡线段，查是不是在多边形内部
-        # NOTE: 似乎可以通过查中点确定是不是在多边形内部
-        visibleFlag = False
-        if (noSegBlockFlag and bothEndTangenFlag and not isSegIntPoly(
-                seg = vwi,
-                poly = polyW,
-                interiorOnly = True)):
-            # print("No blocking: ", v, wi)
-            visibleFlag = True        
-
-        if (visibleFlag):
-            return True
+    Note
+    ----
+    The edges are stored once in CSR arrays, i.e., the neighbors of vertex k are `indices[indptr[k]: indptr[k + 1]]` with distances in `weights`. For each query, the start and end points are linked to the vertices they can see without modifying the graph, these links are cached by coordinates, so that repeated queries on the same points do not sweep again.
 
-        # 前面任何一关不通过，则不可视
-        return False
+    """
 
-    W = []
-    for i in range(len(sweepSeq)):
-        wi = sweepSeq[i]
-        wim = sweepSeq[i - 1] if i > 1 else None
-        # print(T)
-        if (not is2PtsSame(vertices[v]['pt'], vertices[wi]['pt']) and visible(wi, wim, polys)):
-            W.append(wi)
-
-        # 将wi的边加入/移出平衡树T
-        # wi所在的poly编号
-        polyIdx = wi[0]
-        # wi在poly内的编号
-        idInPoly = wi[1]
-
-        # Edge 1: wi -> wi.next
-        wiNext = (wi[0], wi[1] + 1 if wi[1] < len(polys[wi[0]]) - 1 else 0)
-        # Edge 2: wi.prev -> wi
-        wiPrev = (wi[0], wi[1] - 1 if wi[1] > 0 else len(polys[wi[0]]) - 1)
-
-        # 判断edgeNext
-        vIdxWi = verticeDistIndex[wi]
-        vIdxWiNext = verticeDistIndex[wiNext]
-        vIdxWiPrev = verticeDistIndex[wiPrev]
-        if (is3PtsClockWise(vertices[v]['pt'], vertices[wi]['pt'], vertices[wiNext]['pt'])):
-            if (T.query((min(vIdxWi, vIdxWiNext), max(vIdxWi, vIdxWiNext))).isNil):
-                T.insert(RedBlackTreeNode(
-                    key = (min(vIdxWi, vIdxWiNext), max(vIdxWi, vIdxWiNext)), 
-                    value = [wi, wiNext]))
-        else:
-            if (not T.query((min(vIdxWi, vIdxWiNext), max(vIdxWi, vIdxWiNext))).isNil):
-                T.delete((min(vIdxWi, vIdxWiNext), max(vIdxWi, vIdxWiNext)))        
-        if (is3PtsClockWise(vertices[v]['pt'], vertices[wi]['pt'], vertices[wiPrev]['pt'])):
-            if (T.query((min(vIdxWiPrev, vIdxWi), max(vIdxWiPrev, vIdxWi))).isNil):
-                T.insert(RedBlackTreeNode(
-                    key = (min(vIdxWiPrev, vIdxWi), max(vIdxWiPrev, vIdxWi)), 
-                    value = [wiPrev, wi]))
+    def __init__(self, polys: polys, reducedFlag: bool = True, polyVG: dict|None = None, cacheSize: int = 1000):
+        # NOTE: 去掉重合的顶点，不修改输入的polys，给定polyVG时顶点的编号要与polyVG一致，不能去掉
+        self.polys = []
+        for p in range(len(polys)):
+            if (polyVG != None):
+                self.polys.append([pt for pt in polys[p]])
+            else:
+                self.polys.append([polys[p][i] for i in range(len(polys[p])) if distEuclideanXY(polys[p][i], polys[p][i - 1]) > ERRTOL['distPt2Pt']])
+        self.reducedFlag = reducedFlag
+        self.cacheSize = cacheSize
+        self._index = PolysSpatialIndex(self.polys)
+        self._geo = _visPolysGeo(self.polys)
+        self.keys = self._geo['keys']
+        self.pts = np.column_stack([self._geo['x'], self._geo['y']]) if len(self.keys) > 0 else np.zeros((0, 2))
+        n = len(self.keys)
+
+        # Visible edges, in both directions =====================================
+        rows = []
+        cols = []
+        for i in range(n):
+            if (polyVG != None):
+                if (self.keys[i] not in polyVG):
+                    continue
+                W = [self._geo['index'][w] for w in polyVG[self.keys[i]]['visible'] if w in self._geo['index']]
+            elif (reducedFlag and self._geo['reflex'][i]):
+                continue
+            else:
+                W = _visSweep(self._geo, self._geo['x'][i], self._geo['y'][i], i, reducedFlag)
+            rows.extend([i] * len(W))
+            cols.extend(W)
+        pairs = np.unique(np.array(rows + cols + cols + rows, dtype = int).reshape(2, -1).T, axis = 0) if len(rows) > 0 else np.zeros((0, 2), dtype = int)
+
+        # CSR arrays ==========================================================
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(pairs[:, 0], minlength = n))]).astype(int)
+        self.indices = pairs[:, 1].copy()
+        self.weights = np.hypot(self.pts[pairs[:, 0], 0] - self.pts[pairs[:, 1], 0], self.pts[pairs[:, 0], 1] - self.pts[pairs[:, 1], 1])
+        self._indptr = self.indptr.tolist()
+        self._indices = self.indices.tolist()
+        self._weights = self.weights.tolist()
+        self._links = {}
+
+    @property
+    def count(self):
+        return len(self.keys)
+
+    def neighbors(self, k: int) -> list:
+        return self._indices[self._indptr[k]: self._indptr[k + 1]]
+
+    def _link(self, pt: pt) -> dict:
+        # NOTE: 按坐标缓存点可视的顶点及距离，超过cacheSize时删除最早加入的
+        key = (float(pt[0]), float(pt[1]))
+        if (key in self._links):
+            return self._links[key]
+        for p in self._index.queryPt(pt):
+            if (isPtInPoly(pt, self.polys[p], interiorOnly = True)):
+                raise OutOfRangeError("Point (%s, %s) is inside `polys` when it is not suppose to." % (pt[0], pt[1]))
+        # NOTE: 最短路上起点和终点连接的顶点一定是切点，只需要精简的可视边
+        W = _visSweep(self._geo, key[0], key[1], None, True)
+        link = {}
+        for w in W:
+            link[w] = math.sqrt((self._geo['x'][w] - key[0]) ** 2 + (self._geo['y'][w] - key[1]) ** 2)
+        if (self.cacheSize > 0):
+            if (len(self._links) >= self.cacheSize):
+                del self._links[next(iter(self._links))]
+            self._links[key] = link
+        return link
+
+    def shortestPath(self, pt1: pt, pt2: pt, detailFlag: bool = False) -> dict|float|None:
+        """
+        The shortest path between two points avoiding the polygons
+
+        Parameters
+        ----------
+        pt1: pt, required
+            The first location
+        pt2: pt, required
+            The second location
+        detailFlag: bool, optional, default as False
+            If True, also returns the path
+
+        Returns
+        -------
+        dict|float
+            The distance, or a dictionary with the distance in 'dist' and the path in 'path' if `detailFlag` is True. None if there is no path
+
+        """
+
+        # Quick checkout ======================================================
+        linkS = self._link(pt1)
+        linkE = self._link(pt2)
+        visibleDirectly = True
+        for p in self._index.querySeg([pt1, pt2]):
+            if (isSegIntPoly([pt1, pt2], self.polys[p], interiorOnly = True)):
+                visibleDirectly = False
+                break
+        if (visibleDirectly):
+            if (detailFlag):
+                return {
+                    'dist': distEuclideanXY(pt1, pt2),
+                    'path': [pt1, pt2]
+                }
+            else:
+                return distEuclideanXY(pt1, pt2)
+
+        # A* with straight-line distance to pt2 ===============================
+        # NOTE: 起点编号为-1，终点编号为-2，不修改图本身
+        x = self._geo['x']
+        y = self._geo['y']
+        ex = float(pt2[0])
+        ey = float(pt2[1])
+        g = {-1: 0}
+        pred = {-1: None}
+        closed = set()
+        heap = [(distEuclideanXY(pt1, pt2), 0, -1)]
+        while (len(heap) > 0):
+            _, gv, v = heapq.heappop(heap)
+            if (v in closed):
+                continue
+            if (v == -2):
+                break
+            closed.add(v)
+            if (v == -1):
+                adj = linkS.items()
+            else:
+                adj = list(zip(self._indices[self._indptr[v]: self._indptr[v + 1]], self._weights[self._indptr[v]: self._indptr[v + 1]]))
+                if (v in linkE):
+                    adj.append((-2, linkE[v]))
+            for (w, d) in adj:
+                gw = gv + d
+                if (w not in closed and (w not in g or gw < g[w])):
+                    g[w] = gw
+                    pred[w] = v
+                    h = 0 if w == -2 else math.sqrt((x[w] - ex) ** 2 + (y[w] - ey) ** 2)
+                    heapq.heappush(heap, (gw + h, gw, w))
+        if (-2 not in g):
+            print("ERROR: No path.")
+            return None
+
+        if (detailFlag):
+            sp = []
+            v = pred[-2]
+            while (v != -1):
+                sp.append(self.polys[self.keys[v][0]][self.keys[v][1]])
+                v = pred[v]
+            return {
+                'dist': g[-2],
+                'path': [pt1] + sp[::-1] + [pt2]
+            }
         else:
-            if (not T.query((min(vIdxWiPrev, vIdxWi), max(vIdxWiPrev, vIdxWi))).isNil):
-                T.delete((min(vIdxWiPrev, vIdxWi), max(vIdxWiPrev, vIdxWi)))
-    return W
+            return g[-2]
 
 # Time seq related ============================================================
 def snapInTimedPoly(timedPoly: timedPoly, t: float) -> poly | None:
@@ -4132,6 +4646,62 @@ def nodeSeqBySweeping(nodes: dict, nodeIDs: list|str = 'All', ptFieldName = 'pt'
 
     return sweepSeq
 
+def nodeSeqByHilbertCurve(nodes: dict, nodeIDs: list|str = 'All', ptFieldName = 'pt', order: int = 16) -> list:
+    """Given a set of locations, gets the sequence along a Hilbert curve covering the bounding box of locations, nearby locations are likely to be close in the sequence
+
+    Parameters
+    ----------
+
+    nodes: dict, required
+        The `nodes` dictionary, with coordinates of given nodes. See :ref:`nodes`
+    nodeIDs: string 'All' or a list of node IDs, optional, default as 'All'
+        The nodes to be sequenced
+    ptFieldName: str, optional, default as 'pt'
+        The key value in `nodes` indicating the location of each node.
+    order: int, optional, default as 16
+        The order of the Hilbert curve, i.e., the bounding box is divided into 2^order by 2^order cells
+
+    Returns
+    -------
+
+    list
+        A list of node IDs
+
+    """
+    # Define nodeIDs
+    if (type(nodeIDs) is not list):
+        if (nodeIDs == 'All'):
+            nodeIDs = []
+            for i in nodes:
+                nodeIDs.append(i)
+    if (len(nodeIDs) <= 1):
+        return [i for i in nodeIDs]
+
+    # Map locations into cells ================================================
+    pts = np.array([nodes[n][ptFieldName] for n in nodeIDs], dtype = float)
+    side = 2 ** order
+    lower = pts.min(axis = 0)
+    span = max(float((pts.max(axis = 0) - lower).max()), ERRTOL['distPt2Pt'])
+    x = np.minimum(((pts[:, 0] - lower[0]) / span * side).astype(np.int64), side - 1)
+    y = np.minimum(((pts[:, 1] - lower[1]) / span * side).astype(np.int64), side - 1)
+
+    # Distance along the Hilbert curve ========================================
+    d = np.zeros(len(nodeIDs), dtype = np.int64)
+    s = side // 2
+    while (s > 0):
+        rx = ((x & s) > 0).astype(np.int64)
+        ry = ((y & s) > 0).astype(np.int64)
+        d += s * s * ((3 * rx) ^ ry)
+        # Rotate the quadrant
+        flip = (ry == 0) & (rx == 1)
+        x = np.where(flip, side - 1 - x, x)
+        y = np.where(flip, side - 1 - y, y)
+        swap = (ry == 0)
+        x, y = np.where(swap, y, x), np.where(swap, x, y)
+        s //= 2
+
+    return [nodeIDs[k] for k in np.argsort(d, kind = 'stable').tolist()]
+
 def nodesInIsochrone(nodes: dict, nodeIDs: list|str = 'All', ptFieldName = 'pt', refPt: pt|None = None, refNodeID: int|str|None = None, isoRange: float = None, sortFlag: bool = False) -> list: 
     # FIXME: Need an algorithm to filter out locations that are clearly too far from refPt
     # Define nodeIDs
@@ -4226,9 +4796,9 @@ def distManhattenXY(pt1: pt, pt2: pt, detailFlag: bool=False) -> dict:
     else:
         return dist
 
-def distBtwPolysXY(pt1:pt, pt2:pt, polys:polys, polyVG: dict = None, detailFlag: bool=False) -> dict:
+def distBtwPolysXY(pt1:pt, pt2:pt, polys:polys, polyVG: dict|VisibilityGraph|None = None, detailFlag: bool=False) -> dict:
     """
-    Gives a Manhatten distance based on two coords.
+    Gives the shortest distance between two coords avoiding the polygons.
 
     Parameters
     ----------
@@ -4238,86 +4808,27 @@ def distBtwPolysXY(pt1:pt, pt2:pt, polys:polys, polyVG: dict = None, detailFlag:
         The second location
     polys: polys, required
         The polygons as barriers.
-    polyVG: dict, optional, default as None
-        The pre-calculated visual-graph using :func:`~polysVisibleGraph()`. To avoid repeated calculation
+    polyVG: dict|VisibilityGraph, optional, default as None
+        The pre-calculated :class:`VisibilityGraph` of `polys`, or the visual-graph using :func:`~polysVisibleGraph()`. To avoid repeated calculation
 
     Returns
     -------
     dict
         A dictionary, with the distance in 'dist', and the path in 'path'
+
+    Note
+    ----
+    For repeated queries among the same polygons, create a :class:`VisibilityGraph` once and pass it as `polyVG`, or call :meth:`VisibilityGraph.shortestPath()` directly.
+
     """
 
     # Reference: Computational Geometry: Algorithms and Applications Third Edition
     # By Mark de Berg et al. Page 326 - 330
     # With some modifications
 
-    # First check if start pt or end pt is in one of the polygons =============
-    for poly in polys:
-        if (isPtInPoly(pt1, poly, interiorOnly = True)):
-            raise OutOfRangeError("Point (%s, %s) is inside `polys` when it is not suppose to." % (pt1[0], pt1[1]))
-        if (isPtInPoly(pt2, poly, interiorOnly = True)):
-            raise OutOfRangeError("Point (%s, %s) is inside `polys` when it is not suppose to." % (pt2[0], pt2[1]))
-
-    # Quick checkout ==========================================================
-    visibleDirectly = True
-    for poly in polys:
-        if (isSegIntPoly([pt1, pt2], poly, interiorOnly=True)):
-            visibleDirectly = False
-            break
-    if (visibleDirectly):
-        if (detailFlag):
-            return {
-                'dist': distEuclideanXY(pt1, pt2),
-                'path': [pt1, pt2]
-            }
-        else:
-            return distEuclideanXY(pt1, pt2)
-
-    # Create visible graph for polys ==========================================
-    if (polyVG == None):      
-        for p in range(len(polys)):
-            polys[p] = [polys[p][i] for i in range(len(polys[p])) if distEuclideanXY(polys[p][i], polys[p][i - 1]) > ERRTOL['distPt2Pt']]
-        polyVG = polysVisibleGraph(polys)
-
-    # Create a visible graph ==================================================
-    # NOTE: startPt可视的vertices将不需要测试是不是相互之间可视，同样地，可视endPt的vertices之间也不需要可视
-    vertices = {}
-    for p in polyVG:
-        vertices[p] = {
-            'pt': polyVG[p]['pt'],
-            'visible': [i for i in polyVG[p]['visible']]
-        }
-    vertices['s'] = {'pt': pt1, 'visible': []}
-    Ws = _visPtAmongPolys('s', polys, {'s': {'pt': pt1, 'visible': []}})
-    vertices['s']['visible'] = Ws
-    vertices['e'] = {'pt': pt2, 'visible': []}
-    We = _visPtAmongPolys('e', polys, {'e': {'pt': pt2, 'visible': []}})
-    vertices['e']['visible'] = We
-
-    # Find shortest path ======================================================
-    vg = nx.Graph()
-    for v in vertices:
-        vg.add_node(v)
-    for v in vertices:
-        for e in vertices[v]['visible']:
-            vg.add_edge(v, e, weight=distEuclideanXY(vertices[v]['pt'], vertices[e]['pt']))
-    try:
-        sp = nx.dijkstra_path(vg, 's', 'e')
-    except:
-        print("ERROR: No path.")
-        return None
-
-    dist = 0
-    for i in range(len(sp) - 1):
-        dist += distEuclideanXY(vertices[sp[i]]['pt'], vertices[sp[i + 1]]['pt'])
-
-    if (detailFlag):
-        return {
-            'dist': dist,
-            'path': [vertices[wp]['pt'] for wp in sp]
-        }
-    else:
-        return dist
+    if (not isinstance(polyVG, VisibilityGraph)):
+        polyVG = VisibilityGraph(polys, reducedFlag = True, polyVG = polyVG)
+    return polyVG.shortestPath(pt1, pt2, detailFlag = detailFlag)
 
 def distLatLon(pt1: pt, pt2: pt, distUnit: str = 'meter') -> dict:
     """
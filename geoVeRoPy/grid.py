@@ -76,11 +76,13 @@ def gridIntPolys(
     if (boundingBox == None):
         boundingBox = defaultBoundingBox(polys = polys)
 
+    # NOTE: 只检查外接矩形与格子相交的多边形
+    polysIndex = PolysSpatialIndex(polys)
     for g in grid:
         if (grid[g]['label'] == None):
-            for p in polys:
-                # print(p)
-                if (isPolyIntPoly(grid[g]['poly'], p)):
+            for p in polysIndex.queryPoly(grid[g]['poly']):
+                if (isPolyIntPoly(grid[g]['poly'], polys[p])):
                     grid[g]['label'] = True
+                    break
 
     return grid
@@ -1,6 +1,7 @@
 import math
 import random
 import warnings
+import numpy as np
 import shapely
 
 from .common import *
@@ -130,25 +131,19 @@ def rndPts(N: int, distr = 'UniformSquareXY', seed = None, **kwargs) -> list:
 
         return [x, y]
 
-    def _rndPtUniformAvoidPolyXY(poly: poly, xRange: list[int]|list[float], yRange: list[int]|list[float]) -> pt:
-        # Use the low efficient accept-denial approach
-        while (True):
-            x = random.uniform(xRange[0], xRange[1])
-            y = random.uniform(yRange[0], yRange[1])
-            if (not isPtInPoly([x, y], poly)):
-                return [x, y]
-
-    def _rndPtUniformAvoidPolyXYs(polys: polys, xRange: list[int]|list[float], yRange: list[int]|list[float]) -> pt:
-        while (True):
-            x = random.uniform(xRange[0], xRange[1])
-            y = random.uniform(yRange[0], yRange[1])
-            notInPolys = True
+    def _rndPtsUniformAvoidPolyXYs(N: int, polys: polys, xRange: list[int]|list[float], yRange: list[int]|list[float]) -> list[pt]:
+        # Use the accept-denial approach, test a batch of samples at a time
+        # NOTE: 按顺序接受样本，与逐个采样得到的点相同
+        pts = []
+        while (len(pts) < N):
+            batch = []
+            for k in range(N - len(pts)):
+                batch.append([random.uniform(xRange[0], xRange[1]), random.uniform(yRange[0], yRange[1])])
+            inPolys = np.zeros(len(batch), dtype = bool)
             for p in polys:
-                if (isPtInPoly([x, y], p)):
-                    notInPolys = False
-                    break
-            if (notInPolys):
-                return [x, y]
+                inPolys |= isPtsInPoly(batch, p)
+            pts.extend([batch[k] for k in range(len(batch)) if not inPolys[k]])
+        return pts
 
     def _rndPtUniformCircleXY(radius: float, center: pt) -> pt:
         theta = random.uniform(0, 2 * math.pi)
@@ -345,11 +340,9 @@ def rndPts(N: int, distr = 'UniformSquareXY', seed = None, **kwargs) -> list:
             xRange = [float(kwargs['xRange'][0]), float(kwargs['xRange'][1])]
             yRange = [float(kwargs['yRange'][0]), float(kwargs['yRange'][1])]
         if ('polyXY' in kwargs):
-            for n in range(N):
-                nodePts.append(_rndPtUniformAvoidPolyXY(kwargs['polyXY'], xRange, yRange))
+            nodePts.extend(_rndPtsUniformAvoidPolyXYs(N, [kwargs['polyXY']], xRange, yRange))
         elif ('polyXYs' in kwargs):
-            for n in range(N):
-                nodePts.append(_rndPtUniformAvoidPolyXYs(kwargs['polyXYs'], xRange, yRange))
+            nodePts.extend(_rndPtsUniformAvoidPolyXYs(N, kwargs['polyXYs'], xRange, yRange))
 
     # Uniformly sample from a circle on the Euclidean space
     elif (distr == 'UniformCircleXY'):
@@ -1024,7 +1017,7 @@ def rndNodeNeighbors(nodes: dict, nodeIDs: list[int|str]|str = 'All', shape: str
         corner = [min(allX) - outerRadius, min(allY) - outerRadius]
 
         # Check accessibility
-        polyVG = polysVisibleGraph(noFlyShell)
+        polyVG = VisibilityGraph(noFlyShell)
         for n in nodes:
             reachable = False
             for k in range(len(nodes[n]['neiShell'])):
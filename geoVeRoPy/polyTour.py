@@ -259,14 +259,14 @@ def ptSetPath2Poly(path, polygons:dict, polyFieldName = 'polygon', pathDegenedFl
     # First, for each leg in the path, find the individual polygons intersect with the leg
     actions = []
     accMileage = 0
+    polysIndex = PolysSpatialIndex(polygons, polyFieldName = polyFieldName)
 
     for i in range(len(path) - 1):
         # seg[0]的mileage更小
         seg = [path[i], path[i + 1]]
 
-        # NOTE: 准备用segment tree
-        # NOTE: For now use the naive way - checking the bounding box
-        for pID in polygons:
+        # NOTE: 只检查外接矩形与seg相交的多边形
+        for pID in polysIndex.querySeg(seg):
             # 根据Seg和poly的相交情况做判断
             segIntPoly = intSeg2Poly(seg = seg, poly = polygons[pID][polyFieldName], detailFlag = True)
             # 如果相交得到多个部分，则分别进行处理
@@ -1,3 +1,6 @@
+import collections
+import numpy as np
+
 from .common import *
 
 # Basic ring objects
@@ -38,6 +41,8 @@ class Ring(object):
     def __init__(self):
         self.head = RingNilNode()
         self._count = 0
+        # NOTE: key => node的索引，由insert/append/remove维护，query为O(1)
+        self._idx = {}
 
     @property
     def isEmpty(self):
@@ -59,21 +64,9 @@ class Ring(object):
     def query(self, key) -> "RingNode":
         if (self.head.isNil):
             raise EmptyError("ERROR: The ring is empty.")
-        cur = self.head
-        trvFlag = False
-        queried = 0
-        while (not trvFlag):
-            if (cur.key == key):
-                return cur
-            else:
-                cur = cur.next
-                queried += 1
-                if (queried > self._count):
-                    raise OutOfRangeError("ERROR: Unexpected loop")
-                if (cur.key == self.head.key):
-                    trvFlag = True
-        if (trvFlag):
-            return RingNilNode()
+        if (key in self._idx):
+            return self._idx[key]
+        return RingNilNode()
 
     def traverse(self, closeFlag=False) -> list:
         route = []
@@ -103,6 +96,7 @@ class Ring(object):
             n.next = m.next
             m.next = n
             self._count += 1
+        self._idx[n.key] = n
 
     def append(self, n):
         if (n.isNil):
@@ -112,6 +106,7 @@ class Ring(object):
             n.next = n
             n.prev = n
             self._count += 1
+            self._idx[n.key] = n
         else:
             return self.insert(self.head.prev, n)
 
@@ -119,6 +114,7 @@ class Ring(object):
         n.prev.next = n.next
         n.next.prev = n.prev
         self._count -= 1
+        self._idx.pop(n.key, None)
 
 # Route objects
 class RouteNode(RingNode):
@@ -150,6 +146,7 @@ class Route(Ring):
         self._revDist = 0
         self.asymFlag = asymFlag
         self._count = 0
+        self._idx = {}
 
     def clone(self):
         newRoute = Route(self.tau, self.asymFlag)
@@ -220,17 +217,9 @@ class Route(Ring):
     def query(self, key) -> "RouteNode":
         if (self.head.isNil):
             raise EmptyError("ERROR: The route is empty.")
-        cur = self.head
-        trvFlag = False
-        while (not trvFlag):
-            if (cur.key == key):
-                return cur
-            else:
-                cur = cur.next
-                if (cur.key == self.head.key):
-                    trvFlag = True
-        if (trvFlag):
-            return RouteNilNode()
+        if (key in self._idx):
+            return self._idx[key]
+        return RouteNilNode()
 
     def insert(self, m, n):
         if (n.isNil):
@@ -252,6 +241,7 @@ class Route(Ring):
             n.next = m.next
             m.next = n            
             self._count += 1
+        self._idx[n.key] = n
         return
 
     def append(self, n):
@@ -263,6 +253,7 @@ class Route(Ring):
             if (self.asymFlag):
                 self._revDist = 0
             self._count = 1
+            self._idx[n.key] = n
         else:
             return self.insert(self.head.prev, n)
 
@@ -275,8 +266,10 @@ class Route(Ring):
         if (self.head.key == n.key):
             self.head = n.next
         self._count -= 1
+        self._idx.pop(n.key, None)
 
     def swap(self, n):
+        deltaDist, deltaRevDist = self.deltaSwap(n)
         nPrev = n.prev
         nNext = n.next
         nNNext = n.next.next
@@ -288,11 +281,9 @@ class Route(Ring):
         nNext.next = n
         nNNext.prev = n
         # Calculate dist
-        self.dist += (self.tau[nPrev.key, nNext.key] + self.tau[nNext.key, n.key] + self.tau[n.key, nNNext.key]
-                    - self.tau[nPrev.key, n.key] - self.tau[n.key, nNext.key] - self.tau[nNext.key, nNNext.key])
+        self.dist += deltaDist
         if (self.asymFlag):
-            self._revDist += (self.tau[nNNext.key, n.key] + self.tau[n.key, nNext.key] + self.tau[nNext.key, nPrev.key]
-                            - self.tau[nNNext.key, nNext.key] + self.tau[nNext.key, n.key] - self.tau[n.key, nPrev.key])
+            self._revDist += deltaRevDist
 
     def exchange(self, nI, nJ):
         if (nI == nJ):
@@ -301,6 +292,11 @@ class Route(Ring):
         # New: = = = i m k l j n = = =
         if (nI.next.key == nJ.key):
             self.swap(nI)
+            return
+        if (nJ.next.key == nI.key):
+            self.swap(nJ)
+            return
+        deltaDist, deltaRevDist = self.deltaExchange(nI, nJ)
         if (nI.next.next.key == nJ.key):
             # Old: = = pI nI nX nJ sJ = =
             # New: = = pI nJ nX nI sJ = =
@@ -315,11 +311,6 @@ class Route(Ring):
             nI.prev = nX
             nI.next = sJ
             sJ.prev = nI
-            self.dist += (self.tau[pI.key, nJ.key] + self.tau[nJ.key, nX.key] + self.tau[nX.key, nI.key] + self.tau[nI.key, sJ.key]
-                - self.tau[pI.key, nI.key] - self.tau[nI.key, nX.key] - self.tau[nX.key, nJ.key] - self.tau[nJ.key, sJ.key])
-            if (self.asymFlag):
-                self._revDist += (self.tau[sJ.key, nI.key] + self.tau[nI.key, nX.key] + self.tau[nX.key, nJ.key] + self.tau[nJ.key, pI.key]
-                    - self.tau[sJ.key, nJ.key] - self.tau[nJ.key, nX.key] - self.tau[nX.key, nI.key] - self.tau[nI.key, pI.key])
 
         else:
             # Old: = = pI nI sI x x x pJ nJ sJ = =
@@ -336,33 +327,50 @@ class Route(Ring):
             nI.prev = pJ
             nI.next = sJ
             sJ.prev = nI
-            self.dist += (self.tau[pI.key, nJ.key] + self.tau[nJ.key, sI.key] + self.tau[pJ.key, nI.key] + self.tau[nI.key, sJ.key]
-                - self.tau[pI.key, nI.key] - self.tau[nI.key, sI.key] - self.tau[pJ.key, nJ.key] - self.tau[nJ.key, sJ.key])
-            if (self.asymFlag):
-                self._revDist += (self.tau[sJ.key, nI.key] + self.tau[nI.key, pJ.key] + self.tau[sI.key, nJ.key] + self.tau[nJ.key, pI.key]
-                    - self.tau[sJ.key, nJ.key] - self.tau[nJ.key, pJ.key] - self.tau[sI.key, nI.key] - self.tau[nI.key, pI.key])
+        self.dist += deltaDist
+        if (self.asymFlag):
+            self._revDist += deltaRevDist
+
+    def relocateSegment(self, s, e, after):
+        # Old: = = p s = = e q = = a b = = | -> relocateSegment(s, e, a)
+        # New: = = p q = = a s = = e b = =
+        # NOTE: 片段s => e的方向不变，只修改片段两端的指针，`after`不能在片段中
+        if (after.key == s.prev.key or after.key == e.key or e.next.key == s.prev.key):
+            return
+        deltaDist, deltaRevDist = self.deltaOrOpt(s, e, after)
+        p = s.prev
+        q = e.next
+        b = after.next
+        p.next = q
+        q.prev = p
+        after.next = s
+        s.prev = after
+        e.next = b
+        b.prev = e
+        self.dist += deltaDist
+        if (self.asymFlag):
+            self._revDist += deltaRevDist
 
     def cheapestInsert(self, n):
-        # First, insert it after self.head
-        # Before: ... --> head -> xxx -> head.next --> ...
-        # After:  ... --> head ->  n  -> head.next --> ...
-        self.insert(self.head, n)
-        sofarCheapestCost = self.dist if not self.asymFlag else min(self.dist, self._revDist)
-        sofarCheapestKey = self.head
-        if (self._count <= 2):
+        if (self.head.isNil or self._count == 1):
+            self.insert(self.head, n)
             return
+        # NOTE: 先用deltaInsert()评估每条边，最后只插入一次
+        # Before: ... --> cur ->     cur.next --> ...
+        # After:  ... --> cur -> n -> cur.next --> ...
+        sofarCheapestCost = None
+        sofarCheapestKey = None
         cur = self.head
         trvFlag = True
         while (trvFlag):
-            self.swap(n)
-            cur = cur.next
-            newCost = self.dist if not self.asymFlag else min(self.dist, self._revDist)
-            if (newCost < sofarCheapestCost):
+            deltaDist, deltaRevDist = self.deltaInsert(n, cur)
+            newCost = self.dist + deltaDist if not self.asymFlag else min(self.dist + deltaDist, self._revDist + deltaRevDist)
+            if (sofarCheapestCost == None or newCost < sofarCheapestCost):
                 sofarCheapestCost = newCost
                 sofarCheapestKey = cur
+            cur = cur.next
             if (cur.key == self.head.key):
                 trvFlag = False
-        self.remove(n)
         self.insert(sofarCheapestKey, n)
         if (self.asymFlag and self.dist > self._revDist):
             self.reverse()
@@ -393,9 +401,101 @@ class Route(Ring):
             'bestRemovalCost': bestRemovalCost
         }
 
+    # Delta evaluation ========================================================
+    # NOTE: 以下函数只根据tau计算移动后dist和revDist的变化量，不修改route
+    def _deltaEdges(self, addEdges: list, removeEdges: list) -> tuple:
+        deltaDist = 0
+        deltaRevDist = 0
+        for (a, b) in addEdges:
+            deltaDist += self.tau[a.key, b.key]
+            if (self.asymFlag):
+                deltaRevDist += self.tau[b.key, a.key]
+        for (a, b) in removeEdges:
+            deltaDist -= self.tau[a.key, b.key]
+            if (self.asymFlag):
+                deltaRevDist -= self.tau[b.key, a.key]
+        if (not self.asymFlag):
+            deltaRevDist = deltaDist
+        return deltaDist, deltaRevDist
+
+    def deltaInsert(self, n, after) -> tuple:
+        # Returns (change of `dist`, change of `revDist`) of insert(after, n)
+        if (after.next.key == after.key):
+            return self._deltaEdges([(after, n), (n, after)], [])
+        return self._deltaEdges(
+            [(after, n), (n, after.next)], 
+            [(after, after.next)])
+
+    def deltaSwap(self, n) -> tuple:
+        # Returns (change of `dist`, change of `revDist`) of swap(n)
+        # Old: = = nPrev n nNext nNNext = =
+        # New: = = nPrev nNext n nNNext = =
+        if (self._count <= 2):
+            return 0, 0
+        nPrev = n.prev
+        nNext = n.next
+        nNNext = n.next.next
+        return self._deltaEdges(
+            [(nPrev, nNext), (nNext, n), (n, nNNext)], 
+            [(nPrev, n), (n, nNext), (nNext, nNNext)])
+
+    def deltaExchange(self, nI, nJ) -> tuple:
+        # Returns (change of `dist`, change of `revDist`) of exchange(nI, nJ)
+        if (nI.key == nJ.key):
+            return 0, 0
+        if (nI.next.key == nJ.key):
+            return self.deltaSwap(nI)
+        if (nJ.next.key == nI.key):
+            return self.deltaSwap(nJ)
+        # Old: = = pI nI sI x x x pJ nJ sJ = =
+        # New: = = pI nJ sI x x x pJ nI sJ = =
+        # NOTE: sI和pJ是同一个点时同样成立
+        return self._deltaEdges(
+            [(nI.prev, nJ), (nJ, nI.next), (nJ.prev, nI), (nI, nJ.next)],
+            [(nI.prev, nI), (nI, nI.next), (nJ.prev, nJ), (nJ, nJ.next)])
+
+    def _delta2Opt(self, nI, nJ, distS2E: float = 0, distE2S: float = 0) -> tuple:
+        # distS2E/distE2S: distance of nI.next => nJ, and of nJ => nI.next, only needed if asymmetric
+        deltaDist, deltaRevDist = self._deltaEdges(
+            [(nI, nJ), (nI.next, nJ.next)],
+            [(nI, nI.next), (nJ, nJ.next)])
+        if (self.asymFlag):
+            deltaDist += distE2S - distS2E
+            deltaRevDist += distS2E - distE2S
+        return deltaDist, deltaRevDist
+
+    def delta2Opt(self, nI, nJ) -> tuple:
+        # Returns (change of `dist`, change of `revDist`) of replacing (nI, nI.next) and (nJ, nJ.next) by (nI, nJ) and (nI.next, nJ.next), i.e., rotate(nI.next, nJ)
+        if (nI.key == nJ.key or nI.next.key == nJ.key):
+            return 0, 0
+        distS2E = 0
+        distE2S = 0
+        if (self.asymFlag):
+            k = nI.next
+            while (k.key != nJ.key):
+                distS2E += self.tau[k.key, k.next.key]
+                distE2S += self.tau[k.next.key, k.key]
+                k = k.next
+        return self._delta2Opt(nI, nJ, distS2E, distE2S)
+
+    def deltaOrOpt(self, s, e, after) -> tuple:
+        # Returns (change of `dist`, change of `revDist`) of moving the segment s => e (in the same direction) to between `after` and `after.next`
+        # NOTE: `after` should not be in the segment
+        # Old: = = p s = = e q = = a b = =
+        # New: = = p q = = a s = = e b = =
+        if (after.key == s.prev.key or after.key == e.key or e.next.key == s.prev.key):
+            return 0, 0
+        return self._deltaEdges(
+            [(s.prev, e.next), (after, s), (e, after.next)],
+            [(s.prev, s), (e, e.next), (after, after.next)])
+
     def impv2Opt(self):
-        # NOTE: Now its better.
+        # NOTE: 对每个nI，依次评估翻转nI.next => nJ，找到改进时才调用rotate()
+        # = = = nI nINext = = = nJ nJNext = = = | -> rotate(nINext, nJ)
+        # = = = nI nJ = = = nINext nJNext = = = 
         oriHeadKey = self.head.key
+        if (self._count < 4):
+            return False
         nI = self.head.next
         sofarBestDist = self.dist if not self.asymFlag else min(self.dist, self._revDist)
         improvedFlag = False
@@ -405,44 +505,22 @@ class Route(Ring):
 
             endKey = nI.prev.key
             while (nI.key != endKey):
-                # 1. First attempt
-                # Old: = = = nI nINext nJ nJNext nJ2Next nJ3Next nJ4Next = = = | -> exchange(nINext, nJ)        | -> exchange(nINext, nJ)
-                # 2. Follow-up attempts
-                # New: = = = nI nJ nINext nJNext nJ2Next nJ3Next nJ4Next = = = | -> exchange(nINext, nJNext)    | -> remove(nJNext)
-                #                                                                -> exchange(nJ, nJNext)          -> insert(nI, nJNext)
-                # New: = = = nI nJNext nJ nINext nJ2Next nJ3Next nJ4Next = = = | -> exchange(nINext, n2JNext)   | -> remove(nJ2Next)
-                #                                                                -> exchange(nJ, nJ2Next)         -> insert(nI, nJ2Next)
-                #                                                                -> exchange(nJNext, nJ2Next)
-                # New: = = = nI nJ2Next nJNext nJ nINext nJ3Next nJ4Next = = = | -> exchange(nINext, n3JNext)   | -> remove(nJ3Next)
-                #                                                                -> exchange(nJ, nJ3Next)         -> insert(nI, nJ3Next)
-                #                                                                -> exchange(nJNext, nJ3Next) 
-                #                                                                -> exchange(nJ2Next, nJ3Next)
-                # New: = = = nI nJ3Next nJ2Next nJNext nJ nINext nJ4Next = = =
-                # ...
-                # 3. Recover to initial status (Until: nJXNext == nIPrev)
-                # Old: nI nJ = = = nINext nJNext (nIPrev) | -> exchange(nJNext, nI)
-                # New: nI nJNext nJ = = = nINext
-                # self.reverse()
-
-                # 1. First attempt
-                nJ = nI.next.next
-                nINext = nI.next
-                self.swap(nINext)
-                newDist = self.dist if not self.asymFlag else min(self.dist, self._revDist)
-                if (newDist < sofarBestDist):
-                    sofarBestDist = newDist
-                    self.rehead(oriHeadKey)
-                    canImpvFlag = True
-                    improvedFlag = True
-                    break
-
-                # 2. Follow-up attempts
-                for _ in range(self._count - 4):
-                    nJXNext = nINext.next
-                    self.remove(nJXNext)
-                    self.insert(nI, nJXNext)
-                    newDist = self.dist if not self.asymFlag else min(self.dist, self._revDist)
-                    if (newDist < sofarBestDist):
+                nJ = nI.next
+                distS2E = 0
+                distE2S = 0
+                # NOTE: 翻转nI.next到nI.prev.prev之间的片段，再长就等价于整个route反向
+                for _ in range(self._count - 3):
+                    if (self.asymFlag):
+                        distS2E += self.tau[nJ.key, nJ.next.key]
+                        distE2S += self.tau[nJ.next.key, nJ.key]
+                    nJ = nJ.next
+                    deltaDist, deltaRevDist = self._delta2Opt(nI, nJ, distS2E, distE2S)
+                    newDist = self.dist + deltaDist if not self.asymFlag else min(self.dist + deltaDist, self._revDist + deltaRevDist)
+                    # NOTE: 浮点误差内的改进不接受，避免来回翻转
+                    if (newDist < sofarBestDist - 1e-9):
+                        self.rotate(nI.next, nJ)
+                        if (self.asymFlag and self.dist > self._revDist):
+                            self.reverse()
                         sofarBestDist = newDist
                         self.rehead(oriHeadKey)
                         canImpvFlag = True
@@ -450,12 +528,476 @@ class Route(Ring):
                         break
                 if (canImpvFlag):
                     break
-
-                # 3. Recover to initial status
-                nJXNext = nINext.next
-                self.swap(nJXNext)
-                self.reverse()
-                self.rehead(oriHeadKey)
-                
                 nI = nI.next
         return improvedFlag
+
+    def impvRelocate(self, maxLength=3):
+        # NOTE: 对每个点s，评估把s开始的1到maxLength个点移动到其他位置，找到改进时才调用relocateSegment()
+        # = = p s = = e q = = a b = = | -> relocateSegment(s, e, a)
+        # = = p q = = a s = = e b = =
+        oriHeadKey = self.head.key
+        if (self._count < 5):
+            return False
+        sofarBestDist = self.dist if not self.asymFlag else min(self.dist, self._revDist)
+        improvedFlag = False
+        canImpvFlag = True
+        while (canImpvFlag):
+            canImpvFlag = False
+            for key in [n.key for n in self.traverse()]:
+                s = self._idx[key]
+                e = s
+                movedFlag = False
+                for l in range(min(maxLength, self._count - 3)):
+                    if (l > 0):
+                        e = e.next
+                    after = e.next
+                    while (after.key != s.prev.key):
+                        deltaDist, deltaRevDist = self.deltaOrOpt(s, e, after)
+                        newDist = self.dist + deltaDist if not self.asymFlag else min(self.dist + deltaDist, self._revDist + deltaRevDist)
+                        if (newDist < sofarBestDist - 1e-9):
+                            self.relocateSegment(s, e, after)
+                            if (self.asymFlag and self.dist > self._revDist):
+                                self.reverse()
+                            sofarBestDist = newDist
+                            canImpvFlag = True
+                            improvedFlag = True
+                            movedFlag = True
+                            break
+                        after = after.next
+                    if (movedFlag):
+                        break
+        self.rehead(oriHeadKey)
+        return improvedFlag
+
+# Array-based route objects
+class ArrayRouteNode(object):
+    """
+    A view of a node in :class:`ArrayRoute`, `prev` and `next` are looked up from the arrays of the route when needed
+    """
+
+    def __init__(self, route: 'ArrayRoute', key):
+        self.route = route
+        self.key = key
+
+    @property
+    def value(self):
+        return self.route._reg['values'][self.route._reg['idx'][self.key]]
+
+    @property
+    def next(self) -> 'ArrayRouteNode':
+        return ArrayRouteNode(self.route, self.route._key(self.route._succ(self.route._reg['idx'][self.key])))
+
+    @property
+    def prev(self) -> 'ArrayRouteNode':
+        return ArrayRouteNode(self.route, self.route._key(self.route._pred(self.route._reg['idx'][self.key])))
+
+    @property
+    def isNil(self):
+        return False
+
+    def __eq__(self, other):
+        return isinstance(other, ArrayRouteNode) and other.route is self.route and other.key == self.key
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return "{key: " + str(self.key) + ", value: " + str(self.value) + "} "
+
+class ArrayRoute(object):
+    """
+    An array-based alternative of :class:`Route`, with the same public operations. The route is stored in an integer array of node indices, together with the position of each node and the traversing direction.
+
+    Parameters
+    ----------
+
+    tau: dict, required
+        The travel matrix, indexed by (key1, key2)
+    asymFlag: bool, optional, default as False
+        True if `tau` is asymmetric, the distance of the reversed route is maintained in `revDist`
+
+    Note
+    ----
+    `swap()` and `exchange()` are O(1). `rotate()` reverses the shorter side of the route by numpy slicing (flipping the traversing direction if the complement is reversed), `reverse()` is O(1), `clone()` copies two integer arrays. `insert()` and `remove()` shift the arrays, O(N). `impv2Opt()` only tries the K nearest neighbors of each node as new edges, taken from `tau.neighbors()` if available (e.g., :class:`KNNDistMatrix`), so that the full travel matrix is not needed.
+
+    """
+
+    def __init__(self, tau, asymFlag=False):
+        self.tau = tau
+        self.asymFlag = asymFlag
+        self.dist = 0
+        self._revDist = 0
+        # NOTE: key => 整数编号，clone之间共享，编号一旦分配不再改变
+        self._reg = {'idx': {}, 'keys': [], 'values': []}
+        # Node indices in array order
+        self._order = np.zeros(0, dtype = int)
+        # Position of each node index in `_order`, -1 if not in the route
+        self._pos = np.zeros(0, dtype = int)
+        # 1 if next of `_order[p]` is `_order[p + 1]`, -1 if it is `_order[p - 1]`
+        self._dir = 1
+        self._headIdx = -1
+
+    @classmethod
+    def fromRoute(cls, route) -> "ArrayRoute":
+        # NOTE: 直接写入数组，避免逐个insert()的O(N^2)
+        arrRoute = cls(route.tau, route.asymFlag)
+        idxs = [arrRoute._index(n) for n in route.traverse()]
+        arrRoute._order = np.array(idxs, dtype = int)
+        arrRoute._pos[arrRoute._order] = np.arange(len(idxs))
+        arrRoute._headIdx = idxs[0] if len(idxs) > 0 else -1
+        arrRoute.dist = route.dist
+        arrRoute._revDist = route.revDist
+        return arrRoute
+
+    # Internal helpers ========================================================
+    def _index(self, n) -> int:
+        if (n.key not in self._reg['idx']):
+            self._reg['idx'][n.key] = len(self._reg['keys'])
+            self._reg['keys'].append(n.key)
+            self._reg['values'].append(n.value if hasattr(n, 'value') else n.key)
+        i = self._reg['idx'][n.key]
+        if (i >= len(self._pos)):
+            self._pos = np.concatenate([self._pos, np.full(max(i + 1, 2 * len(self._pos)) - len(self._pos), -1, dtype = int)])
+        return i
+
+    def _key(self, i: int):
+        return self._reg['keys'][i]
+
+    def _d(self, i: int, j: int) -> float:
+        return self.tau[self._reg['keys'][i], self._reg['keys'][j]]
+
+    def _succ(self, i: int) -> int:
+        return int(self._order[(self._pos[i] + self._dir) % len(self._order)])
+
+    def _pred(self, i: int) -> int:
+        return int(self._order[(self._pos[i] - self._dir) % len(self._order)])
+
+    def _has(self, key) -> bool:
+        return (key in self._reg['idx'] 
+            and self._reg['idx'][key] < len(self._pos) 
+            and self._pos[self._reg['idx'][key]] >= 0)
+
+    def _localCost(self, positions: list) -> tuple:
+        # NOTE: 与给定位置相连的边(按位置去重)的正向和反向距离之和
+        n = len(self._order)
+        pairs = set()
+        for p in positions:
+            pairs.add(((p - self._dir) % n, p))
+            pairs.add((p, (p + self._dir) % n))
+        fwd = 0
+        bwd = 0
+        for (p, q) in pairs:
+            i = int(self._order[p])
+            j = int(self._order[q])
+            fwd += self._d(i, j)
+            if (self.asymFlag):
+                bwd += self._d(j, i)
+        return fwd, bwd
+
+    def _reversePositions(self, start: int, length: int):
+        idxs = (start + self._dir * np.arange(length)) % len(self._order)
+        self._order[idxs] = self._order[idxs[::-1]]
+        self._pos[self._order[idxs]] = idxs
+
+    # Same interface as Route =================================================
+    @property
+    def isEmpty(self):
+        return len(self._order) == 0
+
+    @property
+    def count(self):
+        return len(self._order)
+
+    @property
+    def head(self):
+        if (len(self._order) == 0):
+            return RouteNilNode()
+        return ArrayRouteNode(self, self._key(self._headIdx))
+
+    @property
+    def revDist(self):
+        if (self.asymFlag):
+            return self._revDist
+        else:
+            return self.dist
+
+    def __repr__(self):
+        return self.traverse().__repr__()
+
+    def clone(self):
+        newRoute = ArrayRoute.__new__(ArrayRoute)
+        newRoute.tau = self.tau
+        newRoute.asymFlag = self.asymFlag
+        newRoute.dist = self.dist
+        newRoute._revDist = self._revDist
+        newRoute._reg = self._reg
+        newRoute._order = self._order.copy()
+        newRoute._pos = self._pos.copy()
+        newRoute._dir = self._dir
+        newRoute._headIdx = self._headIdx
+        return newRoute
+
+    def rehead(self, key):
+        if (not self._has(key)):
+            raise KeyNotExistError("ERROR: %s is not in the route." % str(key))
+        self._headIdx = self._reg['idx'][key]
+
+    def query(self, key):
+        if (len(self._order) == 0):
+            raise EmptyError("ERROR: The route is empty.")
+        if (self._has(key)):
+            return ArrayRouteNode(self, key)
+        return RouteNilNode()
+
+    def traverse(self, closeFlag=False) -> list:
+        if (len(self._order) == 0):
+            return []
+        idxs = (self._pos[self._headIdx] + self._dir * np.arange(len(self._order))) % len(self._order)
+        route = [ArrayRouteNode(self, self._key(i)) for i in self._order[idxs].tolist()]
+        if (closeFlag):
+            route.append(route[0])
+        return route
+
+    def reverse(self):
+        self._dir = -self._dir
+        if (self.asymFlag):
+            self.dist, self._revDist = self._revDist, self.dist
+
+    def insert(self, m, n):
+        if (n.isNil):
+            raise EmptyError("ERROR: Cannot insert an empty node.")
+        i = self._index(n)
+        if (self._has(n.key)):
+            raise KeyExistError("ERROR: %s is already in the route." % str(n.key))
+        if (len(self._order) == 0):
+            self._order = np.array([i], dtype = int)
+            self._pos[i] = 0
+            self._headIdx = i
+            self._dir = 1
+            self.dist = 0
+            self._revDist = 0
+            return
+        a = self._reg['idx'][m.key]
+        b = self._succ(a)
+        self.dist += self._d(a, i) + self._d(i, b) - self._d(a, b)
+        if (self.asymFlag):
+            self._revDist += self._d(b, i) + self._d(i, a) - self._d(b, a)
+        # NOTE: 反向时，a的next在数组中a的前一位，所以插在a的位置上
+        p = int(self._pos[a]) + 1 if self._dir == 1 else int(self._pos[a])
+        self._order = np.insert(self._order, p, i)
+        self._pos[self._order[p:]] = np.arange(p, len(self._order))
+
+    def append(self, n):
+        if (len(self._order) == 0):
+            return self.insert(None, n)
+        return self.insert(self.head.prev, n)
+
+    def remove(self, n):
+        i = self._reg['idx'][n.key]
+        a = self._pred(i)
+        b = self._succ(i)
+        self.dist += self._d(a, b) - self._d(a, i) - self._d(i, b)
+        if (self.asymFlag):
+            self._revDist += self._d(b, a) - self._d(i, a) - self._d(b, i)
+        if (self._headIdx == i):
+            self._headIdx = b
+        p = int(self._pos[i])
+        self._order = np.delete(self._order, p)
+        self._pos[i] = -1
+        self._pos[self._order[p:]] = np.arange(p, len(self._order))
+        if (len(self._order) == 0):
+            self._headIdx = -1
+            self.dist = 0
+            self._revDist = 0
+
+    def swap(self, n):
+        i = self._reg['idx'][n.key]
+        self._exchangeByIndex(i, self._succ(i))
+
+    def exchange(self, nI, nJ):
+        if (nI.key == nJ.key):
+            raise KeyExistError("ERROR: Cannot swap itself")
+        self._exchangeByIndex(self._reg['idx'][nI.key], self._reg['idx'][nJ.key])
+
+    def _exchangeByIndex(self, i: int, j: int):
+        if (len(self._order) < 3 or i == j):
+            return
+        positions = [int(self._pos[i]), int(self._pos[j])]
+        oldFwd, oldBwd = self._localCost(positions)
+        self._order[positions[0]] = j
+        self._order[positions[1]] = i
+        self._pos[i] = positions[1]
+        self._pos[j] = positions[0]
+        newFwd, newBwd = self._localCost(positions)
+        self.dist += newFwd - oldFwd
+        if (self.asymFlag):
+            self._revDist += newBwd - oldBwd
+
+    def rotate(self, s, e):
+        # = = s.prev s s.next = = = e.prev e e.next = = 
+        # = = s.prev e e.prev = = = s.next s e.next = = 
+        n = len(self._order)
+        si = self._reg['idx'][s.key]
+        ei = self._reg['idx'][e.key]
+        ps = int(self._pos[si])
+        pe = int(self._pos[ei])
+        length = ((pe - ps) * self._dir) % n + 1
+        if (length >= n - 1):
+            # NOTE: 翻转n - 1个以上的点等价于整个route反向
+            self.reverse()
+            return
+        sPrev = self._pred(si)
+        eNext = self._succ(ei)
+
+        # Distance of the segment in both directions, only needed if asymmetric
+        distS2E = 0
+        distE2S = 0
+        if (self.asymFlag):
+            seg = self._order[(ps + self._dir * np.arange(length)) % n].tolist()
+            for k in range(length - 1):
+                distS2E += self._d(seg[k], seg[k + 1])
+                distE2S += self._d(seg[k + 1], seg[k])
+
+        self.dist += (self._d(sPrev, ei) + self._d(si, eNext) - self._d(sPrev, si) - self._d(ei, eNext)
+            - distS2E + distE2S)
+        if (self.asymFlag):
+            self._revDist += (self._d(ei, sPrev) + self._d(eNext, si) - self._d(si, sPrev) - self._d(eNext, ei)
+                - distE2S + distS2E)
+
+        # Reverse the shorter side
+        if (length <= n - length):
+            self._reversePositions(ps, length)
+        else:
+            self._reversePositions((pe + self._dir) % n, n - length)
+            self._dir = -self._dir
+
+    def cheapestInsert(self, n):
+        if (len(self._order) <= 1):
+            if (len(self._order) == 0):
+                self.insert(None, n)
+            else:
+                self.insert(self.head, n)
+            return
+        i = self._index(n)
+        # NOTE: 从head开始，按顺序检查每条边，与Route.cheapestInsert的顺序一致
+        seq = [a.key for a in self.traverse()]
+        bestCost = None
+        bestKey = None
+        for k in range(len(seq)):
+            a = self._reg['idx'][seq[k]]
+            b = self._reg['idx'][seq[(k + 1) % len(seq)]]
+            newCost = self.dist + self._d(a, i) + self._d(i, b) - self._d(a, b)
+            if (self.asymFlag):
+                newCost = min(newCost, self._revDist + self._d(b, i) + self._d(i, a) - self._d(b, a))
+            if (bestCost == None or newCost < bestCost):
+                bestCost = newCost
+                bestKey = seq[k]
+        self.insert(ArrayRouteNode(self, bestKey), n)
+        if (self.asymFlag and self.dist > self._revDist):
+            self.reverse()
+
+    def findLargestRemoval(self, noRemoval=None) -> dict:
+        if (noRemoval == None):
+            noRemoval = [self.head.key]
+        bestRemovalCost = self.dist if not self.asymFlag else max(self.dist, self._revDist)
+        bestRemovalKey = None
+        for k in [a.key for a in self.traverse()[1:]] + [self.head.key]:
+            if (k not in noRemoval):
+                i = self._reg['idx'][k]
+                a = self._pred(i)
+                b = self._succ(i)
+                newDist = self.dist + self._d(a, b) - self._d(a, i) - self._d(i, b)
+                if (self.asymFlag):
+                    newRevDist = self._revDist + self._d(b, a) - self._d(b, i) - self._d(i, a)
+                    newDist = min(newDist, newRevDist)
+                if (newDist < bestRemovalCost):
+                    bestRemovalCost = newDist
+                    bestRemovalKey = k
+        return {
+            'bestRemovalKey': bestRemovalKey,
+            'bestRemovalCost': bestRemovalCost
+        }
+
+    def _neighborList(self, numNeighbors: int) -> dict:
+        # NOTE: 每个点在route中的K近邻(按距离从小到大)，不构造N x N的矩阵
+        idxs = self._order.tolist()
+        keys = [self._key(i) for i in idxs]
+        K = max(0, min(numNeighbors, len(idxs) - 1))
+        if (hasattr(self.tau, 'neighbors')):
+            # KNNDistMatrix中已有的近邻，不在route中的点略去
+            return {i: [self._reg['idx'][l] for l in self.tau.neighbors(self._key(i)) if self._has(l)][:K] for i in idxs}
+        nbr = {}
+        if (K == 0):
+            return {i: [] for i in idxs}
+        if (hasattr(self.tau, 'row') and hasattr(self.tau, 'index')):
+            # DistMatrix按行读取
+            loc = np.array([self.tau.index(k) for k in keys], dtype = int)
+        for a in range(len(idxs)):
+            if (hasattr(self.tau, 'row') and hasattr(self.tau, 'index')):
+                r = np.array(self.tau.row(keys[a])[loc], dtype = float)
+            else:
+                r = np.array([self.tau[keys[a], l] if l != keys[a] else 0 for l in keys], dtype = float)
+            r[a] = np.inf
+            part = np.argpartition(r, K - 1)[:K]
+            part = part[np.argsort(r[part])]
+            nbr[idxs[a]] = [idxs[p] for p in part.tolist()]
+        return nbr
+
+    def impv2Opt(self, numNeighbors=10):
+        # NOTE: 只考虑每个点的K近邻作为新边，用don't-look bits跳过没有变化的点，首次改进即执行rotate()
+        # = = a b = = c e = = | -> rotate(b, c)
+        # = = a c = = b e = = 
+        n = len(self._order)
+        if (n < 4):
+            return False
+        nbr = self._neighborList(numNeighbors)
+        sofarBestDist = self.dist if not self.asymFlag else min(self.dist, self._revDist)
+
+        queue = collections.deque(self._order.tolist())
+        inQueue = set(queue)
+        def activate(nodes):
+            for a in nodes:
+                if (a not in inQueue):
+                    inQueue.add(a)
+                    queue.append(a)
+
+        improvedFlag = False
+        while (len(queue) > 0):
+            a = queue.popleft()
+            inQueue.discard(a)
+            movedFlag = False
+            for succFlag in [True, False]:
+                b = self._succ(a) if succFlag else self._pred(a)
+                dAB = self._d(a, b) if succFlag else self._d(b, a)
+                for c in nbr[a]:
+                    dAC = self._d(a, c) if succFlag else self._d(c, a)
+                    if (dAC >= dAB):
+                        break
+                    e = self._succ(c) if succFlag else self._pred(c)
+                    if (c == b or e == a):
+                        continue
+                    # The segment to be reversed, in the traversing direction
+                    s, t = (b, c) if succFlag else (c, b)
+                    if (not self.asymFlag):
+                        newDist = self.dist + dAC + self._d(b, e) - dAB - self._d(c, e)
+                        # NOTE: 浮点误差内的改进不接受，避免来回翻转
+                        if (newDist < sofarBestDist - 1e-9):
+                            self.rotate(ArrayRouteNode(self, self._key(s)), ArrayRouteNode(self, self._key(t)))
+                            movedFlag = True
+                    else:
+                        # NOTE: 非对称时片段反向的距离需要逐段计算，直接翻转，没有改进再翻转回来
+                        self.rotate(ArrayRouteNode(self, self._key(s)), ArrayRouteNode(self, self._key(t)))
+                        if (min(self.dist, self._revDist) < sofarBestDist - 1e-9):
+                            if (self.dist > self._revDist):
+                                self.reverse()
+                            movedFlag = True
+                        else:
+                            self.rotate(ArrayRouteNode(self, self._key(t)), ArrayRouteNode(self, self._key(s)))
+                    if (movedFlag):
+                        sofarBestDist = self.dist if not self.asymFlag else min(self.dist, self._revDist)
+                        activate([a, b, c, e])
+                        improvedFlag = True
+                        break
+                if (movedFlag):
+                    break
+        return improvedFlag
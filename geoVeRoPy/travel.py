@@ -1,5 +1,15 @@
+import os
 import time
 import random
+import pickle
+import hashlib
+import itertools
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import cdist, pdist, squareform
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
 try:
     import requests
 except ImportError:
@@ -7,8 +17,417 @@ except ImportError:
 
 from .common import *
 from .geometry import *
+from .geometry import _visPtAmongPolys
 
-def matrixDist(nodes: dict, ptFieldName: str = 'pt', nodeIDs: list|str = 'All', edges: str = 'Euclidean', detailFlag: bool = False, **kwargs) -> dict:
+class DistMatrix(object):
+    """
+    A travel matrix stored in a contiguous float64 numpy array, with a dictionary-like interface
+
+    Parameters
+    ----------
+
+    nodeIDs: list of int|str, required
+        The node IDs, the k-th node in `nodeIDs` corresponds to the k-th row/column of the array
+    arr: np.ndarray, optional, default as None
+        A (N, N) array of travel distances. If not provided, all entries are missing (NaN)
+
+    Note
+    ----
+    `tau[i, j]`, `(i, j) in tau`, `for (i, j) in tau` and `tau.items()` behave the same as the `tau` dictionary, so that the object can be passed to the solvers directly. Missing entries are stored as NaN and are skipped by `in` and iteration. Code that works on integer indices can use `tau.arr` and `tau.index()` directly.
+
+    """
+
+    def __init__(self, nodeIDs: list, arr: np.ndarray = None):
+        self.nodeIDs = [i for i in nodeIDs]
+        self.idx = {}
+        for k in range(len(self.nodeIDs)):
+            self.idx[self.nodeIDs[k]] = k
+        if (arr is None):
+            arr = np.full((len(self.nodeIDs), len(self.nodeIDs)), np.nan)
+        else:
+            arr = np.ascontiguousarray(arr, dtype = float)
+            if (arr.shape != (len(self.nodeIDs), len(self.nodeIDs))):
+                raise UnsupportedInputError("ERROR: The shape of `arr` does not match `nodeIDs`")
+        self.arr = arr
+
+    @classmethod
+    def fromDict(cls, tau: dict, nodeIDs: list|None = None) -> "DistMatrix":
+        if (nodeIDs == None):
+            nodeIDs = []
+            for (i, j) in tau:
+                if (i not in nodeIDs):
+                    nodeIDs.append(i)
+                if (j not in nodeIDs):
+                    nodeIDs.append(j)
+        m = cls(nodeIDs)
+        for (i, j) in tau:
+            if (i in m.idx and j in m.idx):
+                m[i, j] = tau[i, j]
+        return m
+
+    @property
+    def count(self):
+        return len(self.nodeIDs)
+
+    def index(self, key) -> int:
+        return self.idx[key]
+
+    def __getitem__(self, key):
+        return self.arr.item(self.idx[key[0]], self.idx[key[1]])
+
+    def __setitem__(self, key, value):
+        (i, j) = key
+        if (i not in self.idx or j not in self.idx):
+            raise KeyNotExistError("ERROR: Cannot find (%s, %s) in the matrix, nodes cannot be added by assignment" % (i, j))
+        self.arr[self.idx[i], self.idx[j]] = value
+
+    def __contains__(self, key):
+        if (type(key) is not tuple or len(key) != 2):
+            return False
+        if (key[0] not in self.idx or key[1] not in self.idx):
+            return False
+        return not math.isnan(self.arr.item(self.idx[key[0]], self.idx[key[1]]))
+
+    def __iter__(self):
+        for (i, j, _) in self._entries():
+            yield (i, j)
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self.arr)))
+
+    def __repr__(self):
+        return "DistMatrix(%s nodes)" % len(self.nodeIDs)
+
+    def _rowByIndex(self, k: int) -> np.ndarray:
+        return self.arr[k]
+
+    def _entries(self):
+        for k in range(len(self.nodeIDs)):
+            row = self._rowByIndex(k).tolist()
+            for l in range(len(self.nodeIDs)):
+                if (not math.isnan(row[l])):
+                    yield (self.nodeIDs[k], self.nodeIDs[l], row[l])
+
+    def get(self, key, default = None):
+        if (key in self):
+            return self[key]
+        return default
+
+    def keys(self):
+        return [(i, j) for (i, j, _) in self._entries()]
+
+    def values(self):
+        return [d for (_, _, d) in self._entries()]
+
+    def items(self):
+        return [((i, j), d) for (i, j, d) in self._entries()]
+
+    def row(self, key) -> np.ndarray:
+        return self._rowByIndex(self.idx[key])
+
+    def col(self, key) -> np.ndarray:
+        return self.arr[:, self.idx[key]]
+
+    def isSymmetric(self) -> bool:
+        return bool(np.array_equal(self.arr, self.arr.T, equal_nan = True))
+
+    def clone(self) -> "DistMatrix":
+        return type(self)(self.nodeIDs, self.arr.copy())
+
+    def toArray(self) -> np.ndarray:
+        return self.arr
+
+    def toDict(self) -> dict:
+        return {(i, j): d for (i, j, d) in self._entries()}
+
+class SymDistMatrix(DistMatrix):
+    """
+    A symmetric travel matrix, only the upper triangle is stored, in the condensed layout of `scipy.spatial.distance.pdist()`
+
+    Parameters
+    ----------
+
+    nodeIDs: list of int|str, required
+        The node IDs, the k-th node in `nodeIDs` corresponds to the k-th row/column of the matrix
+    arr: np.ndarray, optional, default as None
+        A 1D array of length N * (N - 1) / 2, the distance between the k-th and l-th node (k < l) is stored at N * k - k * (k + 1) / 2 + (l - k - 1). If not provided, all entries are missing (NaN)
+
+    Note
+    ----
+    The lookup interface is the same as :class:`DistMatrix`, `tau[i, j]` and `tau[j, i]` read the same entry, assigning one of them changes both. The diagonal is always 0.
+
+    """
+
+    def __init__(self, nodeIDs: list, arr: np.ndarray = None):
+        self.nodeIDs = [i for i in nodeIDs]
+        self.idx = {}
+        for k in range(len(self.nodeIDs)):
+            self.idx[self.nodeIDs[k]] = k
+        n = len(self.nodeIDs)
+        if (arr is None):
+            arr = np.full(n * (n - 1) // 2, np.nan)
+        else:
+            arr = np.ascontiguousarray(arr, dtype = float)
+            if (arr.shape != (n * (n - 1) // 2, )):
+                raise UnsupportedInputError("ERROR: The length of `arr` does not match `nodeIDs`")
+        self.arr = arr
+
+    @classmethod
+    def fromDict(cls, tau: dict, nodeIDs: list|None = None) -> "SymDistMatrix":
+        for (i, j) in tau:
+            if ((j, i) in tau and tau[i, j] != tau[j, i]):
+                raise UnsupportedInputError("ERROR: The travel matrix is asymmetric, cannot be stored as `SymDistMatrix`")
+        return super().fromDict(tau, nodeIDs)
+
+    def _pos(self, k: int, l: int) -> int:
+        if (k > l):
+            k, l = l, k
+        return len(self.nodeIDs) * k - k * (k + 1) // 2 + (l - k - 1)
+
+    def __getitem__(self, key):
+        k = self.idx[key[0]]
+        l = self.idx[key[1]]
+        if (k == l):
+            return 0.0
+        return self.arr.item(self._pos(k, l))
+
+    def __setitem__(self, key, value):
+        (i, j) = key
+        if (i not in self.idx or j not in self.idx):
+            raise KeyNotExistError("ERROR: Cannot find (%s, %s) in the matrix, nodes cannot be added by assignment" % (i, j))
+        if (self.idx[i] == self.idx[j]):
+            if (value != 0):
+                raise UnsupportedInputError("ERROR: The diagonal of `SymDistMatrix` is always 0")
+            return
+        self.arr[self._pos(self.idx[i], self.idx[j])] = value
+
+    def __contains__(self, key):
+        if (type(key) is not tuple or len(key) != 2):
+            return False
+        if (key[0] not in self.idx or key[1] not in self.idx):
+            return False
+        return not math.isnan(self[key])
+
+    def __len__(self):
+        return 2 * int(np.count_nonzero(~np.isnan(self.arr))) + len(self.nodeIDs)
+
+    def __repr__(self):
+        return "SymDistMatrix(%s nodes)" % len(self.nodeIDs)
+
+    def _rowByIndex(self, k: int) -> np.ndarray:
+        n = len(self.nodeIDs)
+        row = np.empty(n)
+        # Entries above the diagonal in column k
+        a = np.arange(k)
+        row[:k] = self.arr[n * a - a * (a + 1) // 2 + (k - a - 1)]
+        row[k] = 0
+        # Entries at row k are contiguous
+        if (k < n - 1):
+            start = self._pos(k, k + 1)
+            row[k + 1:] = self.arr[start: start + n - k - 1]
+        return row
+
+    def col(self, key) -> np.ndarray:
+        return self.row(key)
+
+    def isSymmetric(self) -> bool:
+        return True
+
+    def toArray(self) -> np.ndarray:
+        return squareform(self.arr, checks = False)
+
+class KNNDistMatrix(DistMatrix):
+    """
+    A sparse travel matrix, which stores the K nearest neighbors of each node, distances of other pairs are calculated on demand
+
+    Parameters
+    ----------
+
+    nodeIDs: list of int|str, required
+        The node IDs, the k-th node in `nodeIDs` corresponds to the k-th row of `pts`
+    pts: np.ndarray, required
+        A (N, 2) array of locations
+    numNeighbors: int, optional, default as 10
+        Number of nearest neighbors stored for each node
+    edges: str, optional, default as 'Euclidean'
+        The distance measurement, options are 'Euclidean' and 'LatLon'
+    distUnit: str, optional, default as 'meter'
+        The unit of distance, for 'LatLon' only
+
+    Note
+    ----
+    `tau[i, j]` is available for every pair of nodes, and `(i, j) in tau` is True for every pair. Iteration, `items()`, `keys()` and `values()` only go through the stored (node, neighbor) pairs. Use `neighbors()` to get the candidate list of a node.
+
+    """
+
+    def __init__(self, nodeIDs: list, pts: np.ndarray, numNeighbors: int = 10, edges: str = 'Euclidean', distUnit: str = 'meter'):
+        if (edges not in ['Euclidean', 'LatLon']):
+            raise UnsupportedInputError("ERROR: `KNNDistMatrix` supports 'Euclidean' and 'LatLon'")
+        self.nodeIDs = [i for i in nodeIDs]
+        self.idx = {}
+        for k in range(len(self.nodeIDs)):
+            self.idx[self.nodeIDs[k]] = k
+        self.pts = np.ascontiguousarray(pts, dtype = float)
+        self.edges = edges
+        self.distUnit = distUnit
+        self.arr = None
+        # Pairs that are assigned manually, e.g., tau[startID, endID] = 0 for open TSP
+        self._assigned = {}
+        self._ptList = self.pts.tolist()
+        self._R = None
+        if (edges == 'LatLon'):
+            self._R = _earthRadius(distUnit)
+
+        # Find K nearest neighbors ============================================
+        n = len(self.nodeIDs)
+        numNeighbors = max(0, min(numNeighbors, n - 1))
+        self.numNeighbors = numNeighbors
+        self.nbr = np.zeros((n, numNeighbors), dtype = int)
+        self.nbrDist = np.zeros((n, numNeighbors), dtype = float)
+        if (numNeighbors > 0):
+            # NOTE: LatLon的点映射到单位球面上，弦长与球面距离单调，可以直接用KD-tree
+            tree = cKDTree(self._treePts())
+            _, nbrIdx = tree.query(self._treePts(), k = numNeighbors + 1)
+            for k in range(n):
+                # NOTE: 重合的点可能排在自己前面，所以不能直接去掉第一列
+                cand = [l for l in nbrIdx[k].tolist() if l != k and l < n][:numNeighbors]
+                self.nbr[k] = cand
+            self.nbrDist = self._pairDist(np.repeat(np.arange(n), numNeighbors), self.nbr.ravel()).reshape(n, numNeighbors)
+
+    def _treePts(self) -> np.ndarray:
+        if (self.edges == 'Euclidean'):
+            return self.pts
+        lat = np.radians(self.pts[:, 0])
+        lon = np.radians(self.pts[:, 1])
+        return np.column_stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)])
+
+    def _pairDist(self, ks: np.ndarray, ls: np.ndarray) -> np.ndarray:
+        if (self.edges == 'Euclidean'):
+            return np.sqrt(np.sum((self.pts[ks] - self.pts[ls]) ** 2, axis = 1))
+        phi1 = np.radians(self.pts[ks, 0])
+        phi2 = np.radians(self.pts[ls, 0])
+        dlambda = np.radians(self.pts[ls, 1] - self.pts[ks, 1])
+        a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+        a = np.clip(a, 0, 1)
+        return 2 * self._R * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+    def __getitem__(self, key):
+        k = self.idx[key[0]]
+        l = self.idx[key[1]]
+        if (self._assigned and (k, l) in self._assigned):
+            return self._assigned[k, l]
+        pt1 = self._ptList[k]
+        pt2 = self._ptList[l]
+        if (self.edges == 'Euclidean'):
+            return math.sqrt((pt1[0] - pt2[0]) ** 2 + (pt1[1] - pt2[1]) ** 2)
+        phi1, phi2 = math.radians(pt1[0]), math.radians(pt2[0])
+        dphi = math.radians(pt2[0] - pt1[0])
+        dlambda = math.radians(pt2[1] - pt1[1])
+        a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+        return 2 * self._R * math.atan2(math.sqrt(a), math.sqrt(1 - a))
+
+    def __setitem__(self, key, value):
+        (i, j) = key
+        if (i not in self.idx or j not in self.idx):
+            raise KeyNotExistError("ERROR: Cannot find (%s, %s) in the matrix, nodes cannot be added by assignment" % (i, j))
+        self._assigned[self.idx[i], self.idx[j]] = value
+
+    def __contains__(self, key):
+        if (type(key) is not tuple or len(key) != 2):
+            return False
+        return key[0] in self.idx and key[1] in self.idx
+
+    def __len__(self):
+        return len(self.nodeIDs) * self.numNeighbors
+
+    def __repr__(self):
+        return "KNNDistMatrix(%s nodes, %s neighbors)" % (len(self.nodeIDs), self.numNeighbors)
+
+    def _rowByIndex(self, k: int) -> np.ndarray:
+        return self._pairDist(np.full(len(self.nodeIDs), k), np.arange(len(self.nodeIDs)))
+
+    def _entries(self):
+        for k in range(len(self.nodeIDs)):
+            nbr = self.nbr[k].tolist()
+            for l in range(self.numNeighbors):
+                yield (self.nodeIDs[k], self.nodeIDs[nbr[l]], self[self.nodeIDs[k], self.nodeIDs[nbr[l]]])
+
+    def neighbors(self, key) -> list:
+        return [self.nodeIDs[l] for l in self.nbr[self.idx[key]].tolist()]
+
+    def neighborDist(self, key) -> list:
+        return self.nbrDist[self.idx[key]].tolist()
+
+    def col(self, key) -> np.ndarray:
+        return self.row(key)
+
+    def isSymmetric(self) -> bool:
+        return len(self._assigned) == 0 or all(self._assigned[k, l] == self._assigned.get((l, k)) for (k, l) in self._assigned)
+
+    def clone(self) -> "KNNDistMatrix":
+        newObj = KNNDistMatrix.__new__(KNNDistMatrix)
+        newObj.__dict__.update(self.__dict__)
+        newObj._assigned = dict(self._assigned)
+        return newObj
+
+    def toArray(self) -> np.ndarray:
+        arr = np.empty((len(self.nodeIDs), len(self.nodeIDs)))
+        for k in range(len(self.nodeIDs)):
+            arr[k] = self._rowByIndex(k)
+        for (k, l) in self._assigned:
+            arr[k, l] = self._assigned[k, l]
+        return arr
+
+class StraightPathPt(object):
+    """
+    The paths between nodes as straight lines, created on demand, returned as 'pathPt' by :func:`matrixDist()` for 'EuclideanKNN' and 'LatLonKNN'
+
+    Parameters
+    ----------
+
+    nodes: dict, required
+        The `nodes` dictionary, with coordinates in given field
+    nodeIDs: list of int|str, required
+        The node IDs
+    ptFieldName: str, optional, default as 'pt'
+        The key in nodes dictionary to indicate the locations
+
+    Note
+    ----
+    `pathPt[i, j]` is `[pt_i, pt_j]` for i != j and `[]` for i == j, same as the 'pathPt' of 'Euclidean', but the N x N dictionary is not stored.
+
+    """
+
+    def __init__(self, nodes: dict, nodeIDs: list, ptFieldName = 'pt'):
+        self.pts = {}
+        for i in nodeIDs:
+            self.pts[i] = nodes[i][ptFieldName]
+
+    def __getitem__(self, key):
+        (i, j) = key
+        if (i not in self.pts or j not in self.pts):
+            raise KeyError(key)
+        return [self.pts[i], self.pts[j]] if i != j else []
+
+    def __contains__(self, key):
+        return type(key) == tuple and len(key) == 2 and key[0] in self.pts and key[1] in self.pts
+
+    def __len__(self):
+        return len(self.pts) ** 2
+
+    def __iter__(self):
+        for i in self.pts:
+            for j in self.pts:
+                yield (i, j)
+
+    def keys(self):
+        return iter(self)
+
+    def items(self):
+        for (i, j) in self:
+            yield ((i, j), self[i, j])
+
+def matrixDist(nodes: dict, ptFieldName: str = 'pt', nodeIDs: list|str = 'All', edges: str = 'Euclidean', detailFlag: bool = False, tauType: str = 'Dictionary', **kwargs) -> dict:
     """
     Given a `nodes` dictionary, returns the traveling matrix between nodes
 
@@ -27,6 +446,7 @@ def matrixDist(nodes: dict, ptFieldName: str = 'pt', nodeIDs: list|str = 'All',
         1) (default) 'Euclidean', using Euclidean distance, no additional information needed
         2) 'EuclideanBarrier', using Euclidean distance, if `polys` is provided, the path between nodes will consider them as barriers and by pass those areas.
             - polys: list of poly, the polygons to be considered as barriers
+            - workers: int, number of processes to calculate the pairs in parallel, default as 1
         3) 'LatLon', calculate distances by lat/lon, no additional information needed
             - distUnit: str, the unit of distance, default as 'meter'
         4) 'ManhattenXY', calculate distance by Manhatten distance            
@@ -36,8 +456,30 @@ def matrixDist(nodes: dict, ptFieldName: str = 'pt', nodeIDs: list|str = 'All',
             - column: number of columns
             - row: number of rows
             - barrier: a list of coordinates on the grid indicating no-entrance
+            - workers: int, number of processes to calculate the pairs in parallel, default as 1
+        7) 'EuclideanKNN', same as 'Euclidean', but only the K nearest neighbors of each node are stored using a KD-tree, returns a :class:`KNNDistMatrix`, `tauType` is ignored, distances between other pairs are calculated when needed, if `detailFlag` is True, 'pathPt' is a :class:`StraightPathPt`
+            - numNeighbors: int, number of nearest neighbors for each node, default as 10
+        8) 'LatLonKNN', same as 'EuclideanKNN', but using lat/lon
+            - numNeighbors: int, number of nearest neighbors for each node, default as 10
+            - distUnit: str, the unit of distance, default as 'meter'
+        9) 'RoadNetworkLocal', travel on a local road network without network access, nodes are snapped to the nearest road segment, returns the travel time (or length) on roads, asymmetric if there are one-way roads
+            - roadNetwork: dict, the road network dictionary created by :func:`createRoadNetworkFromGeoJSON()`
+            - roadWeight: str, 'Time' (in seconds) or 'Distance' (in meters), default as 'Time'
+            - roadGraph: dict, the pre-calculated graph using :func:`createRoadGraph()`, to avoid repeated calculation, if provided, `roadNetwork` and `roadWeight` are ignored
+    detailFlag: bool, optional, default as False
+        True if the path between each pair of nodes is needed
+    tauType: str, optional, default as 'Dictionary'
+        The data type of the returned travel matrix. Options are as follows:
+
+        1) (default) 'Dictionary', a dictionary indexed by (nodeID1, nodeID2)
+        2) 'Array', a 2D numpy array, the i-th row/column corresponds to the i-th node in `nodeIDs`
+        3) 'DistMatrix', a :class:`DistMatrix` object, which can be used as the dictionary but stored in an array
+        4) 'SymDistMatrix', a :class:`SymDistMatrix` object, same as 'DistMatrix' but only stores the upper triangle, for symmetric `edges` only
     **kwargs: optional
-        Provide additional inputs for different `edges` options
+        Provide additional inputs for different `edges` options. In addition, the following options are available for all `edges` except 'Dictionary', 'EuclideanKNN' and 'LatLonKNN'
+
+            - cacheDir: str, a directory to cache the travel matrix on disk, the cache is keyed by a fingerprint of node IDs, coordinates, `edges`, `detailFlag` and 'polys'/'grid'/'distUnit'/'source'. Cached matrices are memory-mapped when loaded. Default as None (no cache)
+            - cacheMaxSize: float, the maximum size of `cacheDir` in MB, the least recently used matrices are deleted when exceeded, default as 1024
 
     Returns
     -------
@@ -45,6 +487,10 @@ def matrixDist(nodes: dict, ptFieldName: str = 'pt', nodeIDs: list|str = 'All',
     tuple
         Two dictionaries, the first one is the travel matrix, index by (nodeID1, nodeID2), the second one is the dictionary for path between start and end locations (useful for 'EuclideanBarrier').
 
+    Note
+    ----
+    For 'Euclidean', 'LatLon' and 'Manhatten', the whole matrix is calculated at once using numpy, the dictionary (if needed) is created afterwards.
+
     """
 
     # Define tau
@@ -57,12 +503,27 @@ def matrixDist(nodes: dict, ptFieldName: str = 'pt', nodeIDs: list|str = 'All',
             for i in nodes:
                 nodeIDs.append(i)
 
+    if (tauType not in ['Dictionary', 'Array', 'DistMatrix', 'SymDistMatrix']):
+        raise UnsupportedInputError("ERROR: `tauType` supports 'Dictionary', 'Array', 'DistMatrix' and 'SymDistMatrix'")
+    if (tauType == 'SymDistMatrix' and edges in ['RoadNetwork', 'RoadNetworkLocal']):
+        raise UnsupportedInputError("ERROR: '%s' is asymmetric, cannot use 'SymDistMatrix'" % edges)
+
+    # Look up the on-disk cache ===============================================
+    cacheDir = None if 'cacheDir' not in kwargs else kwargs['cacheDir']
+    cacheKey = None
+    if (cacheDir != None and edges not in ['Dictionary', 'EuclideanKNN', 'LatLonKNN']):
+        cacheKey = _matrixCacheKey(nodes, nodeIDs, ptFieldName, edges, detailFlag, **kwargs)
+        res = _matrixCacheLoad(cacheDir, cacheKey, nodeIDs, detailFlag, tauType)
+        if (res is not None):
+            return res
+
     if (edges == 'Euclidean'):
         res = _matrixDistEuclideanXY(
             nodes = nodes, 
             nodeIDs = nodeIDs, 
             ptFieldName = ptFieldName,
-            detailFlag = detailFlag)
+            detailFlag = detailFlag,
+            tauType = tauType)
     elif (edges == 'EuclideanBarrier'):
         if ('polys' not in kwargs or kwargs['polys'] == None):
             warnings.warning("WARNING: No barrier provided.")
@@ -70,14 +531,16 @@ def matrixDist(nodes: dict, ptFieldName: str = 'pt', nodeIDs: list|str = 'All',
                 nodes = nodes, 
                 nodeIDs = nodeIDs, 
                 ptFieldName = ptFieldName,
-                detailFlag = detailFlag)
+                detailFlag = detailFlag,
+                tauType = tauType)
         else:
             res = _matrixDistBtwPolysXY(
                 nodes = nodes, 
                 nodeIDs = nodeIDs, 
                 polys = kwargs['polys'], 
                 ptFieldName = ptFieldName,
-                detailFlag = detailFlag)
+                detailFlag = detailFlag,
+                workers = 1 if 'workers' not in kwargs else kwargs['workers'])
     elif (edges == 'LatLon'):
         distUnit = 'meter' if 'distUnit' not in kwargs else kwargs['distUnit']
         res = _matrixDistLatLon(
@@ -85,13 +548,31 @@ def matrixDist(nodes: dict, ptFieldName: str = 'pt', nodeIDs: list|str = 'All',
             nodeIDs = nodeIDs, 
             distUnit = distUnit,
             ptFieldName = ptFieldName,
-            detailFlag = detailFlag)
+            detailFlag = detailFlag,
+            tauType = tauType)
     elif (edges == 'Manhatten'):
         res = _matrixDistManhattenXY(
             nodes = nodes, 
             nodeIDs = nodeIDs, 
             ptFieldName = ptFieldName,
-            detailFlag = detailFlag)
+            detailFlag = detailFlag,
+            tauType = tauType)
+    elif (edges == 'EuclideanKNN' or edges == 'LatLonKNN'):
+        numNeighbors = 10 if 'numNeighbors' not in kwargs else kwargs['numNeighbors']
+        distUnit = 'meter' if 'distUnit' not in kwargs else kwargs['distUnit']
+        knnTau = KNNDistMatrix(
+            nodeIDs = nodeIDs, 
+            pts = _nodesPtArray(nodes, nodeIDs, ptFieldName), 
+            numNeighbors = numNeighbors, 
+            edges = 'Euclidean' if edges == 'EuclideanKNN' else 'LatLon', 
+            distUnit = distUnit)
+        if (detailFlag):
+            # NOTE: 路径都是直线，不存储N x N的字典
+            return {
+                'tau': knnTau,
+                'pathPt': StraightPathPt(nodes, nodeIDs, ptFieldName)
+            }
+        return knnTau
     elif (edges == 'Dictionary'):
         checkRequiredKeys(kwargs, 'tau')
         if (kwargs['tau'] == None):
@@ -114,9 +595,18 @@ def matrixDist(nodes: dict, ptFieldName: str = 'pt', nodeIDs: list|str = 'All',
         res = _matrixDistGrid(
             nodes = nodes, 
             nodeIDs = nodeIDs, 
-            grids = kwargs['grid'], 
+            grid = kwargs['grid'], 
             ptFieldName = ptFieldName,
-            detailFlag = detailFlag)
+            detailFlag = detailFlag,
+            workers = 1 if 'workers' not in kwargs else kwargs['workers'])
+    elif (edges == 'RoadNetworkLocal'):
+        res = _matrixDistRoadNetworkLocal(
+            nodes = nodes, 
+            nodeIDs = nodeIDs, 
+            roadGraph = _roadGraphFromKwargs(**kwargs), 
+            ptFieldName = ptFieldName,
+            detailFlag = detailFlag,
+            tauType = tauType)
     elif (edges == 'RoadNetwork'):
         checkRequiredKeys(kwargs, 'source')
         if (kwargs['source'] == None):
@@ -137,8 +627,210 @@ def matrixDist(nodes: dict, ptFieldName: str = 'pt', nodeIDs: list|str = 'All',
     else:
         raise UnsupportedInputError(ERROR_MISSING_EDGES)        
 
+    # For the options that are not calculated by array, convert afterwards ===
+    if (tauType != 'Dictionary'):
+        if (detailFlag):
+            res['tau'] = _formatTau(res['tau'], nodeIDs, tauType)
+        else:
+            res = _formatTau(res, nodeIDs, tauType)
+
+    # Save to the on-disk cache ===============================================
+    if (cacheKey != None):
+        cacheMaxSize = 1024 if 'cacheMaxSize' not in kwargs else kwargs['cacheMaxSize']
+        _matrixCacheSave(cacheDir, cacheKey, res, nodeIDs, detailFlag, tauType)
+        _matrixCacheEvict(cacheDir, cacheMaxSize)
+
     return res
 
+def _matrixCacheKey(nodes: dict, nodeIDs: list, ptFieldName: str, edges: str, detailFlag: bool, **kwargs) -> str:
+    # NOTE: 指纹包括节点ID、坐标、edges以及影响距离的参数，APIKey不参与
+    h = hashlib.sha1()
+    h.update(repr(nodeIDs).encode())
+    h.update(_nodesPtArray(nodes, nodeIDs, ptFieldName).tobytes())
+    h.update(repr((edges, bool(detailFlag))).encode())
+    for k in ['polys', 'grid', 'distUnit', 'source', 'roadNetwork', 'roadWeight']:
+        if (k in kwargs):
+            h.update(repr((k, kwargs[k])).encode())
+    if ('roadGraph' in kwargs and kwargs['roadGraph'] != None):
+        for k in ['vertices', 'edgeU', 'edgeV', 'edgeW', 'segU', 'segV']:
+            h.update(kwargs['roadGraph'][k].tobytes())
+    return h.hexdigest()
+
+def _matrixCacheLoad(cacheDir: str, cacheKey: str, nodeIDs: list, detailFlag: bool, tauType: str):
+    denseFile = os.path.join(cacheDir, "tau_%s.npy" % cacheKey)
+    symFile = os.path.join(cacheDir, "symTau_%s.npy" % cacheKey)
+    pathFile = os.path.join(cacheDir, "pathPt_%s.pkl" % cacheKey)
+    if (detailFlag and not os.path.exists(pathFile)):
+        return None
+
+    # Memory-mapped as copy-on-write, modifying the matrix does not touch the file
+    try:
+        if (os.path.exists(symFile) and (tauType == 'SymDistMatrix' or not os.path.exists(denseFile))):
+            arr = np.load(symFile, mmap_mode = 'c')
+            os.utime(symFile)
+            if (tauType == 'SymDistMatrix'):
+                tau = SymDistMatrix(nodeIDs, arr)
+            else:
+                tau = _formatTau(squareform(arr, checks = False), nodeIDs, tauType)
+        elif (os.path.exists(denseFile)):
+            arr = np.load(denseFile, mmap_mode = 'c')
+            os.utime(denseFile)
+            tau = _formatTau(arr, nodeIDs, tauType)
+        else:
+            return None
+        if (detailFlag):
+            with open(pathFile, 'rb') as f:
+                pathPt = pickle.load(f)
+            os.utime(pathFile)
+    except (OSError, ValueError, pickle.UnpicklingError):
+        return None
+
+    if (detailFlag):
+        return {
+            'tau': tau,
+            'pathPt': pathPt
+        }
+    return tau
+
+def _matrixCacheSave(cacheDir: str, cacheKey: str, res, nodeIDs: list, detailFlag: bool, tauType: str):
+    os.makedirs(cacheDir, exist_ok = True)
+    tau = res['tau'] if detailFlag else res
+    if (tauType == 'SymDistMatrix'):
+        fileName = "symTau_%s.npy" % cacheKey
+        arr = tau.arr
+    else:
+        fileName = "tau_%s.npy" % cacheKey
+        arr = _formatTau(tau, nodeIDs, 'Array')
+
+    # Write to a temporary file first, so that a half-written file is never loaded
+    tmpFile = os.path.join(cacheDir, fileName + ".tmp")
+    with open(tmpFile, 'wb') as f:
+        np.save(f, np.ascontiguousarray(arr, dtype = float))
+    os.replace(tmpFile, os.path.join(cacheDir, fileName))
+    if (detailFlag):
+        tmpFile = os.path.join(cacheDir, "pathPt_%s.pkl.tmp" % cacheKey)
+        with open(tmpFile, 'wb') as f:
+            pickle.dump(res['pathPt'], f, pickle.HIGHEST_PROTOCOL)
+        os.replace(tmpFile, os.path.join(cacheDir, "pathPt_%s.pkl" % cacheKey))
+
+def _matrixCacheEvict(cacheDir: str, cacheMaxSize: float):
+    # Group the files by fingerprint, the group least recently used goes first
+    groups = {}
+    for fileName in os.listdir(cacheDir):
+        if (not (fileName.endswith('.npy') or fileName.endswith('.pkl'))):
+            continue
+        cacheKey = fileName.split('_')[-1].split('.')[0]
+        stat = os.stat(os.path.join(cacheDir, fileName))
+        if (cacheKey not in groups):
+            groups[cacheKey] = {'size': 0, 'mtime': 0, 'files': []}
+        groups[cacheKey]['size'] += stat.st_size
+        groups[cacheKey]['mtime'] = max(groups[cacheKey]['mtime'], stat.st_mtime)
+        groups[cacheKey]['files'].append(fileName)
+
+    totalSize = sum([groups[k]['size'] for k in groups])
+    for cacheKey in sorted(groups, key = lambda k: groups[k]['mtime']):
+        if (totalSize <= cacheMaxSize * 1024 * 1024):
+            break
+        for fileName in groups[cacheKey]['files']:
+            try:
+                os.remove(os.path.join(cacheDir, fileName))
+            except OSError:
+                pass
+        totalSize -= groups[cacheKey]['size']
+
+def _formatTau(tau: dict|np.ndarray, nodeIDs: list, tauType: str = 'Dictionary'):
+    if (isinstance(tau, DistMatrix)):
+        if (tauType == 'Array'):
+            return tau.toArray()
+        elif (tauType == 'Dictionary'):
+            return tau.toDict()
+        elif (tauType == 'DistMatrix' and type(tau) is not DistMatrix):
+            return DistMatrix(tau.nodeIDs, tau.toArray())
+        elif (tauType == 'SymDistMatrix' and type(tau) is not SymDistMatrix):
+            return SymDistMatrix.fromDict(tau.toDict(), tau.nodeIDs)
+        return tau
+    if (tauType == 'Dictionary'):
+        if (type(tau) is dict):
+            return tau
+        return _array2Tau(tau, nodeIDs)
+    elif (tauType == 'Array'):
+        if (type(tau) is dict):
+            return _tau2Array(tau, nodeIDs)
+        return tau
+    elif (tauType == 'DistMatrix'):
+        if (type(tau) is dict):
+            return DistMatrix.fromDict(tau, nodeIDs)
+        return DistMatrix(nodeIDs, tau)
+    elif (tauType == 'SymDistMatrix'):
+        if (type(tau) is dict):
+            return SymDistMatrix.fromDict(tau, nodeIDs)
+        return SymDistMatrix(nodeIDs, squareform(tau, checks = False))
+    else:
+        raise UnsupportedInputError("ERROR: `tauType` supports 'Dictionary', 'Array', 'DistMatrix' and 'SymDistMatrix'")
+
+def _nodesPtArray(nodes: dict, nodeIDs: list, ptFieldName = 'pt') -> np.ndarray:
+    # NOTE: 所有节点的坐标一次性堆成(N, 2)的数组
+    return np.array([nodes[i][ptFieldName] for i in nodeIDs], dtype = float)
+
+def _arrayDistEuclideanXY(pts1: np.ndarray, pts2: np.ndarray) -> np.ndarray:
+    return cdist(pts1, pts2, metric = 'euclidean')
+
+def _arrayDistManhattenXY(pts1: np.ndarray, pts2: np.ndarray) -> np.ndarray:
+    return cdist(pts1, pts2, metric = 'cityblock')
+
+def _earthRadius(distUnit: str = 'meter') -> float:
+    if (distUnit in ['mile', 'mi']):
+        return CONST_EARTH_RADIUS_MILES
+    elif (distUnit in ['meter', 'm']):
+        return CONST_EARTH_RADIUS_METERS
+    elif (distUnit in ['kilometer', 'km']):
+        return CONST_EARTH_RADIUS_METERS / 1000
+    else:
+        raise UnsupportedInputError("ERROR: Unrecognized distance unit, options are 'mile', 'meter', 'kilometer'")
+
+def _arrayDistLatLon(pts1: np.ndarray, pts2: np.ndarray, distUnit: str = 'meter') -> np.ndarray:
+    R = _earthRadius(distUnit)
+
+    # Haversine by broadcasting, same as distLatLon() =========================
+    phi1 = np.radians(pts1[:, 0])[:, None]
+    phi2 = np.radians(pts2[:, 0])[None, :]
+    dphi = phi2 - phi1
+    dlambda = np.radians(pts2[:, 1])[None, :] - np.radians(pts1[:, 1])[:, None]
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    a = np.clip(a, 0, 1)
+    return 2 * R * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+def _pairwiseDistLatLon(pts1: np.ndarray, pts2: np.ndarray, distUnit: str = 'meter') -> np.ndarray:
+    # NOTE: 逐元素计算，pts1[k]到pts2[k]的距离
+    R = _earthRadius(distUnit)
+    phi1 = np.radians(pts1[:, 0])
+    phi2 = np.radians(pts2[:, 0])
+    dlambda = np.radians(pts2[:, 1] - pts1[:, 1])
+    a = np.sin((phi2 - phi1) / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlambda / 2) ** 2
+    a = np.clip(a, 0, 1)
+    return 2 * R * np.arctan2(np.sqrt(a), np.sqrt(1 - a))
+
+def _array2Tau(arr: np.ndarray, nodeIDs: list) -> dict:
+    return dict(zip(itertools.product(nodeIDs, nodeIDs), arr.ravel().tolist()))
+
+def _tau2Array(tau: dict, nodeIDs: list) -> np.ndarray:
+    arr = np.zeros((len(nodeIDs), len(nodeIDs)), dtype = float)
+    for k in range(len(nodeIDs)):
+        for l in range(len(nodeIDs)):
+            if ((nodeIDs[k], nodeIDs[l]) in tau):
+                arr[k, l] = tau[nodeIDs[k], nodeIDs[l]]
+    return arr
+
+def _straightPathPt(nodes: dict, nodeIDs: list, ptFieldName = 'pt') -> dict:
+    pathPt = {}
+    for i in nodeIDs:
+        for j in nodeIDs:
+            if (i != j):
+                pathPt[i, j] = [nodes[i][ptFieldName], nodes[j][ptFieldName]]
+            else:
+                pathPt[i, j] = []
+    return pathPt
+
 def _matrixBaidu(nodes, nodeIDs, API, ptFieldName = 'pt'):
     # 分解成block
     subList = None
@@ -253,85 +945,95 @@ def _shapepointBaiduSeq(startPt, endPt, API, waypoints=None):
 
     return path
 
-def _matrixDistEuclideanXY(nodes: dict, nodeIDs: list, ptFieldName = 'pt', detailFlag: bool = False):
-    tau = {}
-    pathPt = {}
-    for i in nodeIDs:
-        for j in nodeIDs:
-            if (i != j):
-                d = distEuclideanXY(nodes[i][ptFieldName], nodes[j][ptFieldName])
-                if (detailFlag):
-                    tau[i, j] = d['dist']
-                    tau[j, i] = d['dist']
-                    pathPt[i, j] = [nodes[i][ptFieldName], nodes[j][ptFieldName]]
-                    pathPt[j, i] = [nodes[j][ptFieldName], nodes[i][ptFieldName]]
-                else:
-                    tau[i, j] = d
-                    tau[j, i] = d
-            else:
-                tau[i, j] = 0
-                tau[j, i] = 0
-                pathPt[i, j] = []
-                pathPt[j, i] = []
+def _matrixDistEuclideanXY(nodes: dict, nodeIDs: list, ptFieldName = 'pt', detailFlag: bool = False, tauType: str = 'Dictionary'):
+    pts = _nodesPtArray(nodes, nodeIDs, ptFieldName)
+    if (tauType == 'SymDistMatrix'):
+        tau = SymDistMatrix(nodeIDs, pdist(pts, metric = 'euclidean'))
+    else:
+        tau = _formatTau(_arrayDistEuclideanXY(pts, pts), nodeIDs, tauType)
 
     if (detailFlag):
         return {
             'tau': tau,
-            'pathPt': pathPt
+            'pathPt': _straightPathPt(nodes, nodeIDs, ptFieldName)
         }
     else:
         return tau
 
-def _matrixDistManhattenXY(nodes: dict, nodeIDs: list, ptFieldName = 'pt', detailFlag: bool = False):
-    tau = {}
-    pathPt = {}
-    for i in nodeIDs:
-        for j in nodeIDs:
-            if (i != j):
-                d = distManhattenXY(nodes[i][ptFieldName], nodes[j][ptFieldName])                
-                if (detailFlag):
-                    tau[i, j] = d['dist']
-                    tau[j, i] = d['dist']
-                    pathPt[i, j] = d['path']
-                    pathPt[j, i] = [d['path'][len(d['path']) - 1 - i] for i in range(len(d['path']))]
+def _matrixDistManhattenXY(nodes: dict, nodeIDs: list, ptFieldName = 'pt', detailFlag: bool = False, tauType: str = 'Dictionary'):
+    pts = _nodesPtArray(nodes, nodeIDs, ptFieldName)
+    if (tauType == 'SymDistMatrix'):
+        tau = SymDistMatrix(nodeIDs, pdist(pts, metric = 'cityblock'))
+    else:
+        tau = _formatTau(_arrayDistManhattenXY(pts, pts), nodeIDs, tauType)
+
+    if (detailFlag):
+        pathPt = {}
+        for i in nodeIDs:
+            for j in nodeIDs:
+                if (i != j):
+                    pt1 = nodes[i][ptFieldName]
+                    pt2 = nodes[j][ptFieldName]
+                    pathPt[i, j] = [pt1, (pt1[0], pt2[1]), pt2]
                 else:
-                    tau[i, j] = d
-                    tau[j, i] = d
-            else:
-                tau[i, j] = 0
-                tau[j, i] = 0
-                if (detailFlag):
                     pathPt[i, j] = []
-                    pathPt[j, i] = []
+        return {
+            'tau': tau,
+            'pathPt': pathPt
+        }
+    else:
+        return tau
+
+def _matrixDistLatLon(nodes: dict, nodeIDs: list, distUnit = 'meter', ptFieldName = 'pt', detailFlag: bool = False, tauType: str = 'Dictionary'):
+    pts = _nodesPtArray(nodes, nodeIDs, ptFieldName)
+    if (tauType == 'SymDistMatrix'):
+        # NOTE: 逐行计算上三角部分，避免生成(N, N)的数组
+        condensed = np.empty(len(nodeIDs) * (len(nodeIDs) - 1) // 2)
+        start = 0
+        for k in range(len(nodeIDs) - 1):
+            condensed[start: start + len(nodeIDs) - k - 1] = _arrayDistLatLon(pts[k: k + 1], pts[k + 1:], distUnit)[0]
+            start += len(nodeIDs) - k - 1
+        tau = SymDistMatrix(nodeIDs, condensed)
+    else:
+        tau = _formatTau(_arrayDistLatLon(pts, pts, distUnit), nodeIDs, tauType)
 
     if (detailFlag):
         return {
             'tau': tau,
-            'pathPt': pathPt
+            'pathPt': _straightPathPt(nodes, nodeIDs, ptFieldName)
         }
     else:
         return tau
 
-def _matrixDistLatLon(nodes: dict, nodeIDs: list, distUnit = 'meter', ptFieldName = 'pt', detailFlag: bool = False):
+def _matrixDistGrid(nodes: dict, nodeIDs: list, grid: dict, ptFieldName = 'pt', detailFlag: bool = False, workers: int = 1):
     tau = {}
     pathPt = {}
+    # NOTE: 对称的，每一对节点只算一次
+    pairs = [(k, l) for k in range(len(nodeIDs)) for l in range(k + 1, len(nodeIDs))]
+    pts = [nodes[i][ptFieldName] for i in nodeIDs]
+    pairRes = _parallelMap(
+        func = distOnGrid, 
+        argsList = [(pts[k], pts[l]) for (k, l) in pairs], 
+        workers = workers, 
+        column = grid['column'], 
+        row = grid['row'], 
+        barriers = grid['barrier'] if 'barrier' in grid else [], 
+        detailFlag = detailFlag)
     for i in nodeIDs:
-        for j in nodeIDs:
-            if (i != j):
-                d = distLatLon(nodes[i][ptFieldName], nodes[j][ptFieldName], distUnit)
-                if (detailFlag):
-                    tau[i, j] = d['dist']
-                    tau[j, i] = d['dist']
-                    pathPt[i, j] = [nodes[i][ptFieldName], nodes[j][ptFieldName]]
-                    pathPt[j, i] = [nodes[j][ptFieldName], nodes[i][ptFieldName]]
-                else:
-                    tau[i, j] = d
-                    tau[j, i] = d
-            else:
-                tau[i, j] = 0
-                tau[j, i] = 0
-                pathPt[i, j] = []
-                pathPt[j, i] = []
+        tau[i, i] = 0
+        pathPt[i, i] = []
+    for p in range(len(pairs)):
+        i = nodeIDs[pairs[p][0]]
+        j = nodeIDs[pairs[p][1]]
+        d = pairRes[p]
+        if (detailFlag):
+            tau[i, j] = d['dist']
+            tau[j, i] = d['dist']
+            pathPt[i, j] = d['path']
+            pathPt[j, i] = [d['path'][len(d['path']) - 1 - i] for i in range(len(d['path']))]
+        else:
+            tau[i, j] = d
+            tau[j, i] = d
 
     if (detailFlag):
         return {
@@ -341,26 +1043,86 @@ def _matrixDistLatLon(nodes: dict, nodeIDs: list, distUnit = 'meter', ptFieldNam
     else:
         return tau
 
-def _matrixDistGrid(nodes: dict, nodeIDs: list, grid: dict, ptFieldName = 'pt', detailFlag: bool = False):
+def _matrixDistBtwPolysXY(nodes: dict, nodeIDs: list, polys: polys, polyVG = None, ptFieldName = 'pt', detailFlag: bool = False, workers: int = 1):
     tau = {}
     pathPt = {}
-    for i in nodeIDs:
-        for j in nodeIDs:
-            if (i != j):
-                d = distOnGrid(pt1 = nodes[i][ptFieldName], pt2 = nodes[j][ptFieldName], grid = grid, detailFlag = detailFlag)
+    
+    if (polyVG == None):
+        polyVG = polysVisibleGraph(polys, reducedFlag = True)
+
+    pts = [nodes[i][ptFieldName] for i in nodeIDs]
+    polysIndex = PolysSpatialIndex(polys)
+    for k in range(len(pts)):
+        for p in polysIndex.queryPt(pts[k]):
+            if (isPtInPoly(pts[k], polys[p], interiorOnly = True)):
+                raise OutOfRangeError("Point (%s, %s) is inside `polys` when it is not suppose to." % (pts[k][0], pts[k][1]))
+
+    # Visibility from each node to polygon vertices, one sweep per node =======
+    nodeVis = _parallelMap(
+        func = _visPtAmongPolysXY, 
+        argsList = [(pt, ) for pt in pts], 
+        workers = workers, 
+        polys = polys)
+
+    # Insert all nodes into one visible graph =================================
+    # NOTE: 每个节点拆成出点('o', k)和入点('i', k)，这样最短路不会途经其他节点
+    vg = nx.DiGraph()
+    for v in polyVG:
+        vg.add_node(v)
+        for w in polyVG[v]['visible']:
+            d = distEuclideanXY(polyVG[v]['pt'], polyVG[w]['pt'])
+            vg.add_edge(v, w, weight = d)
+            vg.add_edge(w, v, weight = d)
+    for k in range(len(pts)):
+        vg.add_node(('o', k))
+        vg.add_node(('i', k))
+        for v in nodeVis[k]:
+            d = distEuclideanXY(pts[k], polyVG[v]['pt'])
+            vg.add_edge(('o', k), v, weight = d)
+            vg.add_edge(v, ('i', k), weight = d)
+
+    # One single-source Dijkstra per node =====================================
+    # NOTE: 对称的，第k个节点的最短路只用于l > k的节点
+    for k in range(len(nodeIDs)):
+        i = nodeIDs[k]
+        tau[i, i] = 0
+        pathPt[i, i] = []
+        indirect = []
+        for l in range(k + 1, len(nodeIDs)):
+            visibleDirectly = True
+            for p in polysIndex.querySeg([pts[k], pts[l]]):
+                if (isSegIntPoly([pts[k], pts[l]], polys[p], interiorOnly = True)):
+                    visibleDirectly = False
+                    break
+            if (visibleDirectly):
+                j = nodeIDs[l]
+                tau[i, j] = distEuclideanXY(pts[k], pts[l])
+                tau[j, i] = tau[i, j]
                 if (detailFlag):
-                    tau[i, j] = d['dist']
-                    tau[j, i] = d['dist']
-                    pathPt[i, j] = d['path']
-                    pathPt[j, i] = [d['path'][len(d['path']) - 1 - i] for i in range(len(d['path']))]
-                else:
-                    tau[i, j] = d
-                    tau[j, i] = d
+                    pathPt[i, j] = [pts[k], pts[l]]
+                    pathPt[j, i] = [pts[l], pts[k]]
             else:
-                tau[i, j] = 0
-                tau[j, i] = 0
-                pathPt[i, j] = []
-                pathPt[j, i] = []
+                indirect.append(l)
+        if (len(indirect) == 0):
+            continue
+
+        if (detailFlag):
+            spDist, sp = nx.single_source_dijkstra(vg, ('o', k))
+        else:
+            spDist = nx.single_source_dijkstra_path_length(vg, ('o', k))
+        for l in indirect:
+            j = nodeIDs[l]
+            if (('i', l) not in spDist):
+                print("ERROR: No path.")
+                tau[i, j] = None
+                tau[j, i] = None
+                continue
+            tau[i, j] = spDist['i', l]
+            tau[j, i] = spDist['i', l]
+            if (detailFlag):
+                path = [pts[k]] + [polyVG[v]['pt'] for v in sp['i', l][1:-1]] + [pts[l]]
+                pathPt[i, j] = path
+                pathPt[j, i] = [path[len(path) - 1 - m] for m in range(len(path))]
 
     if (detailFlag):
         return {
@@ -370,30 +1132,539 @@ def _matrixDistGrid(nodes: dict, nodeIDs: list, grid: dict, ptFieldName = 'pt',
     else:
         return tau
 
-def _matrixDistBtwPolysXY(nodes: dict, nodeIDs: list, polys: polys, polyVG = None, ptFieldName = 'pt', detailFlag: bool = False):
-    tau = {}
+def createRoadGraph(roadNetwork: dict, weight: str = 'Time') -> dict:
+    """
+    Given a road network dictionary created by :func:`createRoadNetworkFromGeoJSON()`, returns a directed, weighted graph of the roads for 'RoadNetworkLocal' in :func:`matrixDist()`
+
+    Parameters
+    ----------
+
+    roadNetwork: dict, required
+        The road network dictionary, with 'projType' and 'road', each road has 'shape', 'maxspeed' and 'oneway'
+    weight: str, optional, default as 'Time'
+        The weight of edges, 'Time' for the travel time in seconds at 'maxspeed', 'Distance' for the length in meters
+
+    Returns
+    -------
+
+    dict
+        A dictionary with the road vertices in 'vertices', the weighted edges in 'edgeU', 'edgeV' and 'edgeW', and the road segments (with a spatial index) for snapping nodes to roads
+
+    Note
+    ----
+    Numeric 'maxspeed' is in mph, same as the default in :func:`createRoadNetworkFromGeoJSON()`. String 'maxspeed' follows OpenStreetMap, i.e., km/h unless it ends with 'mph'. 'oneway' can be True/'yes'/'1' (along the shape), '-1' (against the shape) or False/'no'.
+
+    """
+
+    if (weight not in ['Time', 'Distance']):
+        raise UnsupportedInputError("ERROR: `weight` supports 'Time' and 'Distance'")
+    if (roadNetwork == None or 'road' not in roadNetwork):
+        raise MissingParameterError("ERROR: Missing required field 'road' in `roadNetwork`")
+    projType = 'LatLon' if 'projType' not in roadNetwork else roadNetwork['projType']
+    roads = roadNetwork['road']
+
+    # Road vertices and segments ==============================================
+    # NOTE: 坐标相同的点视为同一个路口，不同道路在路口处相连
+    vertIdx = {}
+    vertPts = []
+    segU = []
+    segV = []
+    segSpeed = []
+    segOneway = []
+    for r in roads:
+        speed = _roadSpeed(roads[r]['maxspeed'] if 'maxspeed' in roads[r] else 30)
+        oneway = _roadOneway(roads[r]['oneway'] if 'oneway' in roads[r] else False)
+        shape = roads[r]['shape']
+        for m in range(len(shape) - 1):
+            a = (float(shape[m][0]), float(shape[m][1]))
+            b = (float(shape[m + 1][0]), float(shape[m + 1][1]))
+            if (a == b):
+                continue
+            for c in [a, b]:
+                if (c not in vertIdx):
+                    vertIdx[c] = len(vertPts)
+                    vertPts.append(c)
+            segU.append(vertIdx[a])
+            segV.append(vertIdx[b])
+            segSpeed.append(speed)
+            segOneway.append(oneway)
+    if (len(segU) == 0):
+        raise EmptyError("ERROR: No road segment in `roadNetwork`")
+    vertices = np.array(vertPts, dtype = float)
+    segU = np.array(segU, dtype = int)
+    segV = np.array(segV, dtype = int)
+    segOneway = np.array(segOneway, dtype = int)
+
+    # Weights in both directions, inf if the direction is not allowed =========
+    if (projType == 'LatLon'):
+        length = _pairwiseDistLatLon(vertices[segU], vertices[segV])
+    else:
+        length = np.sqrt(np.sum((vertices[segU] - vertices[segV]) ** 2, axis = 1))
+    w = length if weight == 'Distance' else length / np.array(segSpeed, dtype = float)
+    segFwd = np.where(segOneway >= 0, w, np.inf)
+    segBwd = np.where(segOneway <= 0, w, np.inf)
+
+    # NOTE: 两个路口之间可能有多条道路，只保留权重最小的
+    edgeW = {}
+    for k in range(len(segU)):
+        for (u, v, c) in [(segU[k], segV[k], segFwd[k]), (segV[k], segU[k], segBwd[k])]:
+            if (c < np.inf and ((u, v) not in edgeW or c < edgeW[u, v])):
+                edgeW[u, v] = c
+    edges = list(edgeW.keys())
+
+    return {
+        'projType': projType,
+        'weight': weight,
+        'vertices': vertices,
+        'edgeU': np.array([e[0] for e in edges], dtype = int),
+        'edgeV': np.array([e[1] for e in edges], dtype = int),
+        'edgeW': np.array([edgeW[e] for e in edges], dtype = float),
+        'segU': segU,
+        'segV': segV,
+        'segFwd': segFwd,
+        'segBwd': segBwd,
+        'segTree': shapely.STRtree(shapely.linestrings(np.stack([vertices[segU], vertices[segV]], axis = 1)))
+    }
+
+def _roadSpeed(maxspeed) -> float:
+    # NOTE: 返回m/s，数字按mph，字符串按OSM的规则，不带单位的是km/h，无法识别的按30mph
+    default = 30 * 0.44704
+    if (type(maxspeed) in [int, float]):
+        return maxspeed * 0.44704 if maxspeed > 0 else default
+    s = str(maxspeed).strip().lower()
+    try:
+        if (s.endswith('mph')):
+            speed = float(s[:-3]) * 0.44704
+        elif (s.endswith('km/h')):
+            speed = float(s[:-4]) / 3.6
+        else:
+            speed = float(s) / 3.6
+    except ValueError:
+        return default
+    return speed if speed > 0 else default
+
+def _roadOneway(oneway) -> int:
+    # NOTE: 1为只能沿shape的方向，-1为只能逆着shape的方向，0为双向
+    if (oneway == True or str(oneway).strip().lower() in ['yes', 'true', '1']):
+        return 1
+    elif (str(oneway).strip().lower() in ['-1', 'reverse']):
+        return -1
+    return 0
+
+def _roadGraphSnap(roadGraph: dict, pts: np.ndarray) -> dict:
+    # Find the nearest road segment of each point by the spatial index ========
+    nearest = roadGraph['segTree'].query_nearest(shapely.points(pts))
+    seg = np.full(len(pts), -1, dtype = int)
+    for m in range(nearest.shape[1] - 1, -1, -1):
+        # NOTE: 距离相同时query_nearest会返回多条，取第一条
+        seg[nearest[0, m]] = nearest[1, m]
+
+    # Project onto the segment ================================================
+    a = roadGraph['vertices'][roadGraph['segU'][seg]]
+    b = roadGraph['vertices'][roadGraph['segV'][seg]]
+    ab = b - a
+    t = np.clip(np.sum((pts - a) * ab, axis = 1) / np.sum(ab * ab, axis = 1), 0, 1)
+    return {
+        'seg': seg,
+        't': t,
+        'pt': a + t[:, None] * ab
+    }
+
+def _roadGraphDist(roadGraph: dict, pts: np.ndarray, srcIdx: list, dstIdx: list, detailFlag: bool = False, reverseFlag: bool = False):
+    # NOTE: 每个点拆成出点V + k和入点V + n + k，最短路不会途经其他点
+    V = len(roadGraph['vertices'])
+    n = len(pts)
+    snap = _roadGraphSnap(roadGraph, pts)
+    seg = snap['seg']
+    t = snap['t']
+    fwd = roadGraph['segFwd'][seg]
+    bwd = roadGraph['segBwd'][seg]
+    u = roadGraph['segU'][seg]
+    v = roadGraph['segV'][seg]
+    ks = np.arange(n)
+
+    # Connect the points to both ends of their segments =======================
+    rows = [roadGraph['edgeU']]
+    cols = [roadGraph['edgeV']]
+    data = [roadGraph['edgeW']]
+    # NOTE: 单行道反方向的权重为inf，点在线段端点上时0 * inf为NaN，此时应为0
+    with np.errstate(invalid = 'ignore'):
+        connectors = [
+            (V + ks, v, np.where(t == 1, 0, (1 - t) * fwd)),
+            (V + ks, u, np.where(t == 0, 0, t * bwd)),
+            (u, V + n + ks, np.where(t == 0, 0, t * fwd)),
+            (v, V + n + ks, np.where(t == 1, 0, (1 - t) * bwd))]
+    for (r, c, w) in connectors:
+        keep = w < np.inf
+        rows.append(r[keep])
+        cols.append(c[keep])
+        data.append(w[keep])
+    graph = csr_matrix((np.concatenate(data), (np.concatenate(rows), np.concatenate(cols))), shape = (V + 2 * n, V + 2 * n))
+
+    # Multi-source Dijkstra, in blocks to bound the memory ====================
+    # NOTE: reverseFlag为True时在反向图上从dstIdx出发，一次得到所有点到dstIdx的距离
+    srcIdx = np.array(srcIdx, dtype = int)
+    dstIdx = np.array(dstIdx, dtype = int)
+    dist = np.full((len(srcIdx), len(dstIdx)), np.inf)
+    pathIdx = {}
+    origins = dstIdx if reverseFlag else srcIdx
+    targets = V + srcIdx if reverseFlag else V + n + dstIdx
+    searchGraph = graph.T.tocsr() if reverseFlag else graph
+    blockSize = max(1, int(2e7 // (V + 2 * n)))
+    for start in range(0, len(origins), blockSize):
+        block = origins[start: start + blockSize]
+        startIdx = V + n + block if reverseFlag else V + block
+        if (detailFlag):
+            d, pred = dijkstra(searchGraph, directed = True, indices = startIdx, return_predecessors = True)
+        else:
+            d = dijkstra(searchGraph, directed = True, indices = startIdx)
+        if (reverseFlag):
+            dist[:, start: start + len(block)] = d[:, targets].T
+        else:
+            dist[start: start + len(block), :] = d[:, targets]
+        if (detailFlag):
+            for b in range(len(block)):
+                for m in range(len(targets)):
+                    if (d[b, targets[m]] == np.inf):
+                        continue
+                    # Road vertices between the two points
+                    seq = []
+                    x = pred[b, targets[m]]
+                    while (x != startIdx[b]):
+                        seq.append(x)
+                        x = pred[b, x]
+                    if (reverseFlag):
+                        pathIdx[m, start + b] = seq
+                    else:
+                        pathIdx[start + b, m] = seq[::-1]
+
+    # Points on the same segment can also travel directly =====================
+    for a in range(len(srcIdx)):
+        for b in range(len(dstIdx)):
+            k = srcIdx[a]
+            l = dstIdx[b]
+            if (k == l):
+                dist[a, b] = 0
+                pathIdx[a, b] = None
+            elif (seg[k] == seg[l]):
+                if (t[l] == t[k]):
+                    direct = 0
+                else:
+                    direct = (t[l] - t[k]) * fwd[k] if t[l] > t[k] else (t[k] - t[l]) * bwd[k]
+                if (direct < dist[a, b]):
+                    dist[a, b] = direct
+                    pathIdx[a, b] = []
+
+    if (not detailFlag):
+        return dist
     pathPt = {}
-    
-    if (polyVG == None):
-        polyVG = polysVisibleGraph(polys)
+    for (a, b) in pathIdx:
+        k = srcIdx[a]
+        l = dstIdx[b]
+        if (pathIdx[a, b] == None):
+            pathPt[a, b] = []
+        else:
+            pathPt[a, b] = ([tuple(pts[k].tolist()), tuple(snap['pt'][k].tolist())]
+                + [tuple(roadGraph['vertices'][x].tolist()) for x in pathIdx[a, b]]
+                + [tuple(snap['pt'][l].tolist()), tuple(pts[l].tolist())])
+    return {
+        'dist': dist,
+        'pathPt': pathPt
+    }
 
-    for i in nodeIDs:
-        for j in nodeIDs:
-            if (i != j):
-                d = distBtwPolysXY(pt1 = nodes[i][ptFieldName], pt2 = nodes[j][ptFieldName], polys = polys, polyVG = polyVG, detailFlag = detailFlag)
+def _roadGraphFromKwargs(**kwargs) -> dict:
+    if ('roadGraph' in kwargs and kwargs['roadGraph'] != None):
+        return kwargs['roadGraph']
+    checkRequiredKeys(kwargs, 'roadNetwork')
+    if (kwargs['roadNetwork'] == None):
+        raise MissingParameterError("ERROR: 'roadNetwork' is not specified")
+    return createRoadGraph(
+        roadNetwork = kwargs['roadNetwork'], 
+        weight = 'Time' if 'roadWeight' not in kwargs else kwargs['roadWeight'])
+
+def _matrixDistRoadNetworkLocal(nodes: dict, nodeIDs: list, roadGraph: dict, ptFieldName = 'pt', detailFlag: bool = False, tauType: str = 'Dictionary'):
+    pts = _nodesPtArray(nodes, nodeIDs, ptFieldName)
+    res = _roadGraphDist(roadGraph, pts, list(range(len(nodeIDs))), list(range(len(nodeIDs))), detailFlag)
+    if (detailFlag):
+        pathPt = {}
+        for (a, b) in res['pathPt']:
+            pathPt[nodeIDs[a], nodeIDs[b]] = res['pathPt'][a, b]
+        return {
+            'tau': _formatTau(res['dist'], nodeIDs, tauType),
+            'pathPt': pathPt
+        }
+    else:
+        return _formatTau(res, nodeIDs, tauType)
+
+def _visPtAmongPolysXY(pt: pt, polys: polys) -> list:
+    return _visPtAmongPolys('s', polys, {'s': {'pt': pt, 'visible': []}}, reducedFlag = True)
+
+# Shared by all tasks in a worker process, set once by the pool initializer
+_matrixPoolData = {}
+
+def _matrixPoolInit(data: dict):
+    _matrixPoolData.clear()
+    _matrixPoolData.update(data)
+
+def _matrixPoolChunk(chunk: list) -> list:
+    func = _matrixPoolData['func']
+    funcKwargs = _matrixPoolData['funcKwargs']
+    return [func(*args, **funcKwargs) for args in chunk]
+
+def _parallelMap(func, argsList: list, workers: int = 1, **funcKwargs) -> list:
+    # NOTE: 返回结果的顺序与argsList一致，与workers的数量无关
+    if (workers == None or workers <= 1 or len(argsList) < 2):
+        return [func(*args, **funcKwargs) for args in argsList]
+
+    # Shard the tasks into consecutive chunks, a few chunks per worker for load balancing
+    numChunk = min(len(argsList), workers * 4)
+    chunkSize = math.ceil(len(argsList) / numChunk)
+    chunks = [argsList[c: c + chunkSize] for c in range(0, len(argsList), chunkSize)]
+    data = {
+        'func': func,
+        'funcKwargs': funcKwargs
+    }
+    res = []
+    with ProcessPoolExecutor(max_workers = workers, initializer = _matrixPoolInit, initargs = (data, )) as executor:
+        for chunkRes in executor.map(_matrixPoolChunk, chunks):
+            res.extend(chunkRes)
+    return res
+
+def updateMatrixDist(oriTau, nodes: dict, addNodeIDs: list = [], removeNodeIDs: list = [], ptFieldName: str = 'pt', nodeIDs: list|None = None, edges: str = 'Euclidean', detailFlag: bool = False, **kwargs):
+    """
+    Given a travel matrix created by :func:`matrixDist()`, adds and/or removes nodes. Only the rows and columns of the added nodes are calculated.
+
+    Parameters
+    ----------
+
+    oriTau: dict|np.ndarray|DistMatrix, required
+        The travel matrix returned by :func:`matrixDist()` with the same `edges` and `detailFlag`, can be in any `tauType`
+    nodes: dict, required
+        A `nodes`dictionary with location information, including the nodes to be added. See :ref:`nodes` for reference.
+    addNodeIDs: list of int|str, optional, default as []
+        The nodes to be added to the travel matrix, nodes already in the matrix are ignored
+    removeNodeIDs: list of int|str, optional, default as []
+        The nodes to be removed from the travel matrix
+    ptFieldName: str, optional, default as 'pt'
+        The key in nodes dictionary to indicate the locations
+    nodeIDs: list of int|str, optional, default as None
+        The nodes in `oriTau`, in the order of rows/columns. Required if `oriTau` is a np.ndarray. For a dictionary it is derived from the keys if not provided
+    edges: str, optional, default as 'Euclidean'
+        The methods for the calculation of distances between nodes. Options and required additional information are referred to :func:`~vrpSolver.geometry.matrixDist()`.
+    detailFlag: bool, optional, default as False
+        True if `oriTau` is the dictionary with 'tau' and 'pathPt', the paths of the added nodes are calculated as well
+    **kwargs: optional
+        Provide additional inputs for different `edges` options
+
+    Returns
+    -------
+
+    dict|np.ndarray|DistMatrix
+        The travel matrix in the same form as `oriTau`. The nodes are ordered as `nodeIDs` excluding `removeNodeIDs`, followed by `addNodeIDs`.
+
+    Note
+    ----
+    A dictionary (including 'pathPt') is updated in place. For np.ndarray, :class:`DistMatrix` and :class:`SymDistMatrix` a new matrix is created and the remaining entries are copied. For :class:`KNNDistMatrix` the KD-tree is rebuilt.
+
+    """
+
+    tau = oriTau
+    pathPt = None
+    if (detailFlag):
+        if (type(oriTau) is not dict or 'tau' not in oriTau or 'pathPt' not in oriTau):
+            raise UnsupportedInputError("ERROR: `oriTau` should contain 'tau' and 'pathPt' when `detailFlag` is True")
+        tau = oriTau['tau']
+        pathPt = oriTau['pathPt']
+
+    # Nodes before/after update ===============================================
+    if (isinstance(tau, DistMatrix)):
+        oldIDs = tau.nodeIDs
+    elif (nodeIDs != None):
+        oldIDs = [i for i in nodeIDs]
+    elif (type(tau) is dict):
+        oldIDs = list(dict.fromkeys(p[0] for p in tau))
+    else:
+        raise MissingParameterError("ERROR: `nodeIDs` is required when `tau` is an array")
+    removeSet = set(removeNodeIDs)
+    keepIDs = [i for i in oldIDs if i not in removeSet]
+    keepSet = set(keepIDs)
+    addIDs = []
+    for i in addNodeIDs:
+        if (i not in keepSet and i not in addIDs):
+            addIDs.append(i)
+    newIDs = keepIDs + addIDs
+
+    if (isinstance(tau, KNNDistMatrix)):
+        numNeighbors = tau.numNeighbors if 'numNeighbors' not in kwargs else kwargs['numNeighbors']
+        res = KNNDistMatrix(
+            nodeIDs = newIDs, 
+            pts = _nodesPtArray(nodes, newIDs, ptFieldName), 
+            numNeighbors = numNeighbors, 
+            edges = tau.edges, 
+            distUnit = tau.distUnit)
+        # NOTE: _assigned按原矩阵的行列编号存储，需要先换回节点ID
+        for (k, l) in tau._assigned:
+            i = tau.nodeIDs[k]
+            j = tau.nodeIDs[l]
+            if (i in res.idx and j in res.idx):
+                res[i, j] = tau._assigned[k, l]
+        return res
+
+    # Distances between added nodes and all nodes =============================
+    block = _matrixDistBlock(nodes, addIDs, newIDs, ptFieldName, edges, detailFlag, **kwargs)
+    blockTau = block['tau'] if detailFlag else block
+
+    if (type(tau) is dict):
+        for i in removeSet:
+            for j in oldIDs:
+                tau.pop((i, j), None)
+                tau.pop((j, i), None)
                 if (detailFlag):
-                    tau[i, j] = d['dist']
-                    tau[j, i] = d['dist']
-                    pathPt[i, j] = d['path']
-                    pathPt[j, i] = [d['path'][len(d['path']) - 1 - i] for i in range(len(d['path']))]
-                else:
-                    tau[i, j] = d
-                    tau[j, i] = d
+                    pathPt.pop((i, j), None)
+                    pathPt.pop((j, i), None)
+        tau.update(blockTau)
+        if (detailFlag):
+            pathPt.update(block['pathPt'])
+            return {
+                'tau': tau,
+                'pathPt': pathPt
+            }
+        return tau
+
+    # Copy the remaining entries, then fill in the new rows/columns
+    if (isinstance(tau, DistMatrix)):
+        oldIdx = tau.idx
+        oldArr = tau.toArray()
+        arr = np.full((len(newIDs), len(newIDs)), np.nan)
+    else:
+        oldIdx = {oldIDs[k]: k for k in range(len(oldIDs))}
+        oldArr = np.asarray(tau, dtype = float)
+        arr = np.zeros((len(newIDs), len(newIDs)), dtype = float)
+    keepIdx = np.array([oldIdx[i] for i in keepIDs], dtype = int)
+    arr[:len(keepIDs), :len(keepIDs)] = oldArr[np.ix_(keepIdx, keepIdx)]
+    if (len(blockTau) > 0):
+        newIdx = {newIDs[k]: k for k in range(len(newIDs))}
+        pairs = list(blockTau.keys())
+        ks = np.array([newIdx[p[0]] for p in pairs], dtype = int)
+        ls = np.array([newIdx[p[1]] for p in pairs], dtype = int)
+        arr[ks, ls] = [blockTau[p] for p in pairs]
+
+    if (isinstance(tau, SymDistMatrix)):
+        res = SymDistMatrix(newIDs, squareform(arr, checks = False))
+    elif (isinstance(tau, DistMatrix)):
+        res = DistMatrix(newIDs, arr)
+    else:
+        res = arr
+    if (detailFlag):
+        for i in removeSet:
+            for j in oldIDs:
+                pathPt.pop((i, j), None)
+                pathPt.pop((j, i), None)
+        pathPt.update(block['pathPt'])
+        return {
+            'tau': res,
+            'pathPt': pathPt
+        }
+    return res
+
+def _matrixDistBlock(nodes: dict, addIDs: list, nodeIDs: list, ptFieldName = 'pt', edges: str = 'Euclidean', detailFlag: bool = False, **kwargs):
+    # NOTE: 计算addIDs与nodeIDs之间两个方向的距离，nodeIDs包含addIDs
+    tau = {}
+    pathPt = {}
+    if (len(addIDs) == 0):
+        return {'tau': tau, 'pathPt': pathPt} if detailFlag else tau
+
+    # NOTE: 'EuclideanKNN'和'LatLonKNN'的距离就是直线距离，oriTau为字典时按'Euclidean'和'LatLon'计算
+    if (edges == 'EuclideanKNN'):
+        edges = 'Euclidean'
+    elif (edges == 'LatLonKNN'):
+        edges = 'LatLon'
+
+    if (edges in ['Euclidean', 'EuclideanBarrier', 'LatLon', 'Manhatten', 'Grid']):
+        polyVG = None
+        if (edges == 'EuclideanBarrier' and 'polys' in kwargs and kwargs['polys'] != None):
+            polyVG = VisibilityGraph(kwargs['polys'])
+        addSet = set(addIDs)
+        restIDs = [i for i in nodeIDs if i not in addSet]
+        # NOTE: 对称的，每一对节点只算一次，第k个新节点只和已有节点及前k-1个新节点计算
+        for k in range(len(addIDs)):
+            i = addIDs[k]
+            tau[i, i] = 0
+            pathPt[i, i] = []
+            desIDs = restIDs + addIDs[:k]
+            if (len(desIDs) == 0):
+                continue
+            if (polyVG != None):
+                vec = _vectorDistBtwPolysXY(
+                    pt = nodes[i][ptFieldName], 
+                    nodes = nodes, 
+                    nodeIDs = desIDs, 
+                    polys = kwargs['polys'], 
+                    polyVG = polyVG, 
+                    ptFieldName = ptFieldName, 
+                    detailFlag = detailFlag)
             else:
-                tau[i, j] = 0
-                tau[j, i] = 0
-                pathPt[i, j] = []
-                pathPt[j, i] = []
+                vec = vectorDist(
+                    pt = nodes[i][ptFieldName], 
+                    nodes = nodes, 
+                    ptFieldName = ptFieldName, 
+                    nodeIDs = desIDs, 
+                    edges = edges, 
+                    detailFlag = detailFlag, 
+                    **kwargs)
+            for j in desIDs:
+                if (detailFlag):
+                    tau[i, j] = vec['tau'][j]
+                    tau[j, i] = vec['revTau'][j]
+                    pathPt[i, j] = vec['pathPt'][j]
+                    pathPt[j, i] = vec['revPathPt'][j]
+                else:
+                    tau[i, j] = vec[j]
+                    tau[j, i] = vec[j]
+    elif (edges == 'Dictionary'):
+        checkRequiredKeys(kwargs, 'tau')
+        if (kwargs['tau'] == None):
+            raise MissingParameterError("ERROR: 'tau' is not specified")
+        for i in addIDs:
+            for j in nodeIDs:
+                for p in [(i, j), (j, i)]:
+                    if (p in kwargs['tau']):
+                        tau[p] = kwargs['tau'][p]
+                        pathPt[p] = kwargs['path'][p] if 'path' in kwargs else [nodes[p[0]][ptFieldName], nodes[p[1]][ptFieldName]]
+    elif (edges == 'RoadNetworkLocal'):
+        roadGraph = _roadGraphFromKwargs(**kwargs)
+        pts = _nodesPtArray(nodes, nodeIDs, ptFieldName)
+        newIdx = {nodeIDs[k]: k for k in range(len(nodeIDs))}
+        addIdx = [newIdx[i] for i in addIDs]
+        allIdx = list(range(len(nodeIDs)))
+        # NOTE: 反向图上的Dijkstra只从新节点出发，得到所有节点到新节点的距离
+        outRes = _roadGraphDist(roadGraph, pts, addIdx, allIdx, detailFlag)
+        inRes = _roadGraphDist(roadGraph, pts, allIdx, addIdx, detailFlag, reverseFlag = True)
+        outDist = outRes['dist'] if detailFlag else outRes
+        inDist = inRes['dist'] if detailFlag else inRes
+        for a in range(len(addIDs)):
+            for l in allIdx:
+                tau[addIDs[a], nodeIDs[l]] = float(outDist[a, l])
+                tau[nodeIDs[l], addIDs[a]] = float(inDist[l, a])
+        if (detailFlag):
+            for (a, l) in outRes['pathPt']:
+                pathPt[addIDs[a], nodeIDs[l]] = outRes['pathPt'][a, l]
+            for (l, a) in inRes['pathPt']:
+                pathPt[nodeIDs[l], addIDs[a]] = inRes['pathPt'][l, a]
+    elif (edges == 'RoadNetwork'):
+        checkRequiredKeys(kwargs, 'source')
+        checkRequiredKeys(kwargs, 'APIKey')
+        if (kwargs['source'] != 'Baidu'):
+            raise UnsupportedInputError("ERROR: Right now we support 'Baidu'")
+        if (detailFlag):
+            raise UnsupportedInputError("ERROR: Stay tune")
+        try:
+            tau.update(_matrixBaiduBlock(nodes, addIDs, nodeIDs, kwargs['APIKey'], ptFieldName))
+            tau.update(_matrixBaiduBlock(nodes, nodeIDs, addIDs, kwargs['APIKey'], ptFieldName))
+        except:
+            raise UnsupportedInputError("ERROR: Failed to fetch data, check network connection and API key")
+    else:
+        raise UnsupportedInputError("ERROR: `updateMatrixDist()` does not support '%s'" % edges)
 
     if (detailFlag):
         return {
@@ -468,10 +1739,12 @@ def vectorDist(pt: pt, nodes: dict, ptFieldName: str = 'pt', nodeIDs: list|str =
                 ptFieldName = ptFieldName,
                 detailFlag = detailFlag)
     elif (edges == 'LatLon'):
+        distUnit = 'meter' if 'distUnit' not in kwargs else kwargs['distUnit']
         res = _vectorDistLatLon(
             pt = pt,
             nodes = nodes, 
             nodeIDs = nodeIDs, 
+            distUnit = distUnit,
             ptFieldName = ptFieldName,
             detailFlag = detailFlag)
     elif (edges == 'Manhatten'):
@@ -490,7 +1763,7 @@ def vectorDist(pt: pt, nodes: dict, ptFieldName: str = 'pt', nodeIDs: list|str =
             pt = pt,
             nodes = nodes, 
             nodeIDs = nodeIDs, 
-            grids = kwargs['grid'], 
+            grid = kwargs['grid'], 
             ptFieldName = ptFieldName,
             detailFlag = detailFlag)
     else:
@@ -503,11 +1776,11 @@ def _vectorDistEuclideanXY(pt: pt, nodes: dict, nodeIDs: list, ptFieldName = 'pt
     revTau = {}
     pathPt = {}
     revPathPt = {}
-    for i in nodeIDs:
-        d = distEuclideanXY(pt, nodes[i][ptFieldName])
-        tau[i] = d
-        if (detailFlag):
-            revTau[i] = d
+    d = _arrayDistEuclideanXY(np.array([pt], dtype = float), _nodesPtArray(nodes, nodeIDs, ptFieldName))[0].tolist()
+    tau = dict(zip(nodeIDs, d))
+    if (detailFlag):
+        for i in nodeIDs:
+            revTau[i] = tau[i]
             pathPt[i] = [pt, nodes[i][ptFieldName]]
             revPathPt[i] = [nodes[i][ptFieldName], pt]
 
@@ -526,15 +1799,13 @@ def _vectorDistManhattenXY(pt: pt, nodes: dict, nodeIDs: list, ptFieldName = 'pt
     revTau = {}
     pathPt = {}
     revPathPt = {}
-    for i in nodeIDs:
-        d = distManhattenXY(pt, nodes[i][ptFieldName], detailFlag)
-        if (detailFlag):
-            tau[i] = d['dist']
-            revTau[i] = d['dist']
-            pathPt[i] = d['path']
-            revPathPt[i] = [d['path'][len(d['path']) - 1 - i] for i in range(len(d['path']))]
-        else:
-            tau[i] = d
+    d = _arrayDistManhattenXY(np.array([pt], dtype = float), _nodesPtArray(nodes, nodeIDs, ptFieldName))[0].tolist()
+    tau = dict(zip(nodeIDs, d))
+    if (detailFlag):
+        for i in nodeIDs:
+            revTau[i] = tau[i]
+            pathPt[i] = [pt, (pt[0], nodes[i][ptFieldName][1]), nodes[i][ptFieldName]]
+            revPathPt[i] = [nodes[i][ptFieldName], (pt[0], nodes[i][ptFieldName][1]), pt]
 
     if (detailFlag):
         return {
@@ -551,11 +1822,11 @@ def _vectorDistLatLon(pt: pt, nodes: dict, nodeIDs: list, distUnit = 'meter', pt
     revTau = {}
     pathPt = {}
     revPathPt = {}
-    for i in nodeIDs:
-        d = distLatLon(pt, nodes[i][ptFieldName], distUnit)
-        tau[i] = d
-        if (detailFlag):
-            revTau[i] = d
+    d = _arrayDistLatLon(np.array([pt], dtype = float), _nodesPtArray(nodes, nodeIDs, ptFieldName), distUnit)[0].tolist()
+    tau = dict(zip(nodeIDs, d))
+    if (detailFlag):
+        for i in nodeIDs:
+            revTau[i] = tau[i]
             pathPt[i] = [pt, nodes[i][ptFieldName]]
             revPathPt[i] = [nodes[i][ptFieldName], pt]
 
@@ -575,7 +1846,13 @@ def _vectorDistGrid(pt: pt, nodes: dict, nodeIDs: list, grid: dict, ptFieldName
     pathPt = {}
     revPathPt = {}
     for i in nodeIDs:
-        d = distOnGrid(pt1 = pt, pt2 = nodes[i][ptFieldName], grid = grid, detailFlag = detailFlag)
+        d = distOnGrid(
+            pt1 = pt, 
+            pt2 = nodes[i][ptFieldName], 
+            column = grid['column'], 
+            row = grid['row'], 
+            barriers = grid['barrier'] if 'barrier' in grid else [], 
+            detailFlag = detailFlag)
         if (detailFlag):
             tau[i] = d['dist']
             revTau[i] = d['dist']
@@ -601,7 +1878,7 @@ def _vectorDistBtwPolysXY(pt: pt, nodes: dict, nodeIDs: list, polys: polys, poly
     revPathPt = {}
 
     if (polyVG == None):
-        polyVG = polysVisibleGraph(polys)
+        polyVG = VisibilityGraph(polys)
 
     for i in nodeIDs:
         d = distBtwPolysXY(pt1 = pt, pt2 = nodes[i][ptFieldName], polys = polys, polyVG = polyVG, detailFlag = detailFlag)
@@ -623,6 +1900,126 @@ def _vectorDistBtwPolysXY(pt: pt, nodes: dict, nodeIDs: list, polys: polys, poly
     else:
         return tau
 
+def vectorDistBatch(pts: list[pt], nodes: dict, ptFieldName: str = 'pt', nodeIDs: list|str = 'All', edges: str = 'Euclidean', **kwargs) -> np.ndarray:
+    """
+    Given a list of locations and a `nodes` dictionary, returns the traveling distance from each location to each node.
+
+    Parameters
+    ----------
+
+    pts: list of pt, required
+        A list of M origin locations.
+    nodes: dict, required
+        A `nodes`dictionary with location information. See :ref:`nodes` for reference.
+    ptFieldName: str, optional, default as 'pt'
+        The key in nodes dictionary to indicate the locations
+    nodeIDs: list of int|str, or 'All', optional, default as 'All'
+        A list of N nodes in `nodes` that needs to be considered, other nodes will be ignored
+    edges: str, optional, default as 'Euclidean'
+        The methods for the calculation of distances between nodes. Options and required additional information are referred to :func:`~vrpSolver.geometry.matrixDist()`.
+    **kwargs: optional
+        Provide additional inputs for different `edges` options
+
+    Returns
+    -------
+
+    np.ndarray
+        A (M, N) array, the k-th row is the distance from `pts[k]` to each node in `nodeIDs`
+
+    Note
+    ----
+    For 'Euclidean', 'LatLon' and 'Manhatten', the whole block is calculated at once using numpy. Other options are calculated by :func:`vectorDist()` for each location.
+
+    """
+
+    if (type(nodeIDs) is not list):
+        if (nodeIDs == 'All'):
+            nodeIDs = [i for i in nodes]
+
+    # NOTE: 'EuclideanKNN'和'LatLonKNN'的距离和'Euclidean'和'LatLon'一样
+    if (edges in ['Euclidean', 'EuclideanKNN', 'Manhatten', 'LatLon', 'LatLonKNN']
+        or (edges == 'EuclideanBarrier' and ('polys' not in kwargs or kwargs['polys'] == None))):
+        queryPts = np.array([pt for pt in pts], dtype = float).reshape(len(pts), -1)
+        nodePts = _nodesPtArray(nodes, nodeIDs, ptFieldName)
+        if (edges in ['Euclidean', 'EuclideanKNN', 'EuclideanBarrier']):
+            return _arrayDistEuclideanXY(queryPts, nodePts)
+        elif (edges == 'Manhatten'):
+            return _arrayDistManhattenXY(queryPts, nodePts)
+        else:
+            distUnit = 'meter' if 'distUnit' not in kwargs else kwargs['distUnit']
+            return _arrayDistLatLon(queryPts, nodePts, distUnit)
+
+    block = np.zeros((len(pts), len(nodeIDs)), dtype = float)
+    for k in range(len(pts)):
+        vec = vectorDist(
+            pt = pts[k], 
+            nodes = nodes, 
+            ptFieldName = ptFieldName, 
+            nodeIDs = nodeIDs, 
+            edges = edges, 
+            **kwargs)
+        block[k] = [vec[i] for i in nodeIDs]
+    return block
+
+def pairDist(pt1: pt, pt2: pt, edges: str = 'Euclidean', **kwargs) -> float:
+    """
+    Given two locations, returns the traveling distance from `pt1` to `pt2`, without creating paths.
+
+    Parameters
+    ----------
+
+    pt1: pt, required
+        The first location.
+    pt2: pt, required
+        The second location.
+    edges: str, optional, default as 'Euclidean'
+        The methods for the calculation of distances between nodes. Options and required additional information are referred to :func:`~vrpSolver.geometry.matrixDist()`.
+    **kwargs: optional
+        Provide additional inputs for different `edges` options
+
+    Returns
+    -------
+
+    float
+        The traveling distance
+
+    """
+
+    if (edges in ['Euclidean', 'EuclideanKNN']):
+        return distEuclideanXY(pt1, pt2)
+    elif (edges == 'Manhatten'):
+        return distManhattenXY(pt1, pt2)
+    elif (edges in ['LatLon', 'LatLonKNN']):
+        return distLatLon(pt1, pt2, 'meter' if 'distUnit' not in kwargs else kwargs['distUnit'])
+    elif (edges == 'EuclideanBarrier'):
+        if ('polys' not in kwargs or kwargs['polys'] == None):
+            return distEuclideanXY(pt1, pt2)
+        return distBtwPolysXY(pt1, pt2, kwargs['polys'])
+    elif (edges == 'Grid'):
+        checkRequiredKeys(kwargs, 'grid')
+        if (kwargs['grid'] == None):
+            raise MissingParameterError("'grid' is not specified")
+        checkRequiredKeys(kwargs['grid'], ['column', 'row'], 'grid')
+        return distOnGrid(
+            pt1 = pt1, 
+            pt2 = pt2, 
+            column = kwargs['grid']['column'], 
+            row = kwargs['grid']['row'], 
+            barriers = kwargs['grid']['barrier'] if 'barrier' in kwargs['grid'] else [])
+    else:
+        # NOTE: 其他情况（例如'RoadNetwork'）只能建一个两个点的矩阵
+        tmpNodes = {
+            '__from_position__': {'pt': pt1},
+            '__to_position__': {'pt': pt2}
+        }
+        tmpTau = matrixDist(
+            nodes = tmpNodes,
+            nodeIDs = ['__from_position__', '__to_position__'],
+            edges = edges,
+            ptFieldName = 'pt',
+            **kwargs)
+        return tmpTau['__from_position__', '__to_position__']
+
 def scaleDist(pt1: pt, pt2: pt, edges: str = 'Euclidean', detailFlag: bool = False, **kwargs) -> dict:
     """
     Given a two locations, returns the traveling distance and path between locations.
@@ -1,13 +1,19 @@
 import heapq
 import math
+import queue
+import collections
 import warnings
+import threading
+import multiprocessing
 import networkx as nx
+from scipy.spatial import cKDTree
 import gurobipy as grb
 
 from .common import *
 from .geometry import *
 from .ring import *
 from .travel import *
+from .travel import _parallelMap
 
 # Traveling Salesman Problem
 def solveTSP(
@@ -71,14 +77,32 @@ def solveTSP(
                 - cons = 'Christofides', use Christofides algorithm
                 - cons = 'CycleCover', use CycleCover algorithm, particularly design for Asymmetric TSP
                 - cons = 'Random', randomly create a feasible route
-            - impv: str, choose the local improvement heuristic to improve the existing feasible route
-                - impv = '2Opt', use the 2-opt algorithm
+                - cons = 'SpaceFillingCurve', visit nodes in the order of a Hilbert curve over their locations, O(N log N) without using `tau`, for very large instances
+                - cons = 'GreedyEdge', repeatedly add the shortest edge that keeps the route a set of paths, candidate edges are the K nearest neighbors of each node found by a KD-tree, so that the full `tau` is not needed
+                    - numNeighbors: the number of candidate edges of each node, default to be 10
+            - impv: str|list, choose the local improvement heuristic(s) to improve the existing feasible route
+                - impv = '2Opt', use the 2-opt algorithm. If `tau` is a KNNDistMatrix, only the K nearest neighbors of each node are tried as new edges (see `numNeighbors`)
+                - impv = '2OptNL', use 2-opt restricted to the K nearest neighbors of each node, with don't-look bits, for large instances. For asymmetric `tau`, same as '2Opt'
+                - impv = 'OrOpt', move segments of 1 to 3 nodes next to one of the K nearest neighbors of their ends, with don't-look bits. Can be combined with '2OptNL', e.g., impv = ['2OptNL', 'OrOpt']
+                    - numNeighbors: int, number of nearest neighbors as candidates for '2OptNL' and 'OrOpt', default to be 10
+                - impv = 'Relocate', move segments of 1 to 3 nodes to the best position among all positions, i.e., Or-opt without neighbor lists. Works for asymmetric `tau` in both directions. Can be combined with '2Opt', e.g., impv = ['2Opt', 'Relocate']
+                - impv = 'LK', Lin-Kernighan style variable-depth search (sequences of 2-opt moves on the K nearest neighbors) together with 'OrOpt'. If `timeLimit` or `numIter` is given, the local optimum is further perturbed by random segment swaps and re-optimized (iterated LK). For asymmetric `tau`, same as ['2Opt', 'OrOpt']
+                    - numNeighbors: int, number of nearest neighbors as candidates, default to be 8
+                    - timeLimit: int|float, runtime limit in seconds for 'LK', default to be None
+                    - numIter: int, number of perturbations after the first local optimum, default to be 0 if `timeLimit` is not given, otherwise unlimited until `timeLimit`
         3) 'Metaheuristic', use metaheuristic methods to solve TSP to sub-optimal, different metaheuristic methods requires different construction phase of heuristic
             - cons: str, construction heuristic for metaheuristic, options depends on `meta`
             - meta: str, choose a metaheuristic improvement method
                 - meta = 'SimulatedAnnealing', use Simulated Annealing to improve a solution create by 'cons', choice of 'cons' are all construction heuristic available for 'Heuristic'
                 - meta = 'GeneticAlgorithm', use Genetic Algorithm to create solutions. Choice of 'cons' includes ['Random', 'RandomInsertion']
                 - meta = 'TabuSearch', use Tabu Search to improve a given solution.
+            - neighRatio: dict, the probability of each neighborhood, 'swap', 'exchange', 'rotate' and 'relocate' (move a segment of 1 to 3 nodes to a random position) for 'SimulatedAnnealing' and 'TabuSearch', and 'crossover' for 'GeneticAlgorithm'
+            - numStarts: int, number of independent trajectories (SA/Tabu) or islands (GA), each with a different random seed, the best one is returned. Default to be 1
+            - workers: int, number of processes to run the starts in parallel, `tau` is calculated once and shared with the processes. Default to be 1
+            - seed: int, if provided, the k-th start uses `seed + k` as random seed, otherwise the seeds are random
+            - migrationInterval: int, for 'GeneticAlgorithm' with `numStarts` > 1, every `migrationInterval` generations each island sends its best gene to the next island (in a ring), which replaces the worst gene there if better. Default to be None, i.e., no exchange. Requires `workers` >= `numStarts`, so that all islands run at the same time
+            - deadline: int|float|datetime.datetime, anytime mode, the search stops at the deadline and returns the best solution found so far. A number is the wall-clock budget in seconds counted from calling :func:`solveTSP()`, including the calculation of `tau`. If `deadline` is given, `stop` is optional. With `numStarts` > `workers` the starts run in ceil(`numStarts` / `workers`) rounds, the remaining time is split evenly among the rounds
+            - onIncumbent: function, called as onIncumbent(seq, ofv, elapsed) whenever the best solution improves, where `seq` is the tour starting and ending at the depot and `elapsed` is the seconds since calling :func:`solveTSP()`. With `numStarts` > 1 it is called in the main process, only for improvements over all starts
 
     detailFlag: bool, optional, default as False
         If True, an additional field `vehicle` will be added into the solution, which can be used for animation. See :func:`~vrpSolver.plot.aniRouting()`.
@@ -100,6 +124,8 @@ def solveTSP(
             ...     'runtime': runtime
             ... }
 
+        For 'Metaheuristic', `convergence` is a list of (runtime, ofv) whenever a better solution is found. If `numStarts` > 1, `starts` is a list of the result of each start, with `seed`, `ofv`, `seq`, `convergence` and `runtime`.
+
     """
 
     def _solveTSPIP(nodeIDs, tau, fml, outputFlag, timeLimit, gapTolerance) -> dict|None:
@@ -732,7 +758,7 @@ def solveTSP(
                 if (len(notInNodeIDs) > 0):
                     raise OutOfRangeError("ERROR: The following nodes in 'initSeq' is not in `nodeIDs`: %s" % list2String(notInNodeIDs))
                 else:
-                    seqObj = _solvTSPHeuConsInsertion(nodeIDs, kwargs['initSeq'], tau, asymFlag, randomInsertionFlag)
+                    seqObj = _solvTSPHeuConsInsertion(nodeIDs, kwargs['initSeq'], nodeObj, tau, asymFlag, randomInsertionFlag)
         
         # Neighborhood based heuristic, including nearest neighborhood, k-nearest neighborhood, and furthest neighborhood
         elif (cons == 'NearestNeighbor'):
@@ -767,6 +793,24 @@ def solveTSP(
             raise VrpSolverNotAvailableError("ERROR: 'CycleCover' algorithm is not available yet, please stay tune")
             seqObj = _solvTSPHeuConsCycleCover(depotID, nodeIDs, tau)
 
+        # Space filling curve
+        elif (cons == 'SpaceFillingCurve'):
+            sfcSeq = nodeSeqByHilbertCurve(nodes, nodeIDs, ptFieldName)
+            for i in sfcSeq:
+                seqObj.append(nodeObj[i])
+
+        # Greedy edge
+        elif (cons == 'GreedyEdge'):
+            geSeq = _solvTSPHeuConsGreedyEdge(
+                nodes = nodes, 
+                nodeIDs = nodeIDs, 
+                tau = tau, 
+                asymFlag = asymFlag, 
+                ptFieldName = ptFieldName, 
+                numNeighbors = 10 if 'numNeighbors' not in kwargs else kwargs['numNeighbors'])
+            for i in geSeq:
+                seqObj.append(nodeObj[i])
+
         # Randomly create a sequence
         elif (cons == 'Random'):
             rndSeq = _solvTSPHeuConsRandom(depotID, nodeIDs)
@@ -793,13 +837,50 @@ def solveTSP(
 
     def _solveTSPHeuImpv(seqObj, **kwargs):
         # NOTE: For the local improvement, try every local search operator provided in a greedy way
+        impvs = [kwargs['impv']] if type(kwargs['impv']) == str else kwargs['impv']
+        lkFlag = 'LK' in impvs and not seqObj.asymFlag
+        numNeighbors = (8 if lkFlag else 10) if 'numNeighbors' not in kwargs else kwargs['numNeighbors']
+        timeLimit = None if 'timeLimit' not in kwargs else kwargs['timeLimit']
+        numIter = (0 if timeLimit == None else None) if 'numIter' not in kwargs else kwargs['numIter']
+        # NOTE: 非对称时'2OptNL'和'LK'退化为'2Opt'
+        fullTwoOptFlag = '2Opt' in impvs or (('2OptNL' in impvs or 'LK' in impvs) and seqObj.asymFlag)
         canImpvFlag = True
         while (canImpvFlag):
             canImpvFlag = False
 
             # 2Opt
-            if (not canImpvFlag and kwargs['impv'] == '2Opt' or '2Opt' in kwargs['impv']):
-                canImpvFlag = seqObj.impv2Opt()
+            if (fullTwoOptFlag):
+                if (isinstance(seqObj.tau, KNNDistMatrix)):
+                    # NOTE: KNN矩阵下完整的2-opt需要N^2次查询，改为在ArrayRoute上只考虑K近邻
+                    arrObj = ArrayRoute.fromRoute(seqObj)
+                    canImpvFlag = arrObj.impv2Opt(numNeighbors)
+                    if (canImpvFlag):
+                        nodeObj = {n.key: n for n in seqObj.traverse()}
+                        seqObj = Route(seqObj.tau, seqObj.asymFlag)
+                        for n in arrObj.traverse():
+                            seqObj.append(nodeObj[n.key])
+                else:
+                    canImpvFlag = seqObj.impv2Opt()
+
+            # Relocate
+            if ('Relocate' in impvs):
+                if (seqObj.impvRelocate()):
+                    canImpvFlag = True
+
+            # Neighbor list based 2Opt, OrOpt and LK
+            if ('2OptNL' in impvs or 'OrOpt' in impvs or 'LK' in impvs):
+                oldDist = seqObj.dist
+                seqObj = _solveTSPHeuImpvNeighborList(
+                    seqObj = seqObj, 
+                    numNeighbors = numNeighbors, 
+                    twoOptFlag = '2OptNL' in impvs and not seqObj.asymFlag, 
+                    orOptFlag = 'OrOpt' in impvs or 'LK' in impvs,
+                    lkFlag = lkFlag,
+                    timeLimit = timeLimit,
+                    numIter = numIter)
+                # NOTE: 邻域搜索本身会做到局部最优，只有和'2Opt'组合时才需要再循环
+                if (seqObj.dist < oldDist - 1e-9 and fullTwoOptFlag):
+                    canImpvFlag = True
 
         ofv = seqObj.dist
         seq = [n.key for n in seqObj.traverse(closeFlag = True)]
@@ -809,7 +890,294 @@ def solveTSP(
             'seq': seq
         }
 
-    def _solveMetaLocalSearch(seqObj, **kwargs):
+    def _tspNeighborList(tau, keys, numNeighbors):
+        # NOTE: 返回紧凑编号下的距离函数和每个点的K近邻(按距离从小到大)
+        n = len(keys)
+        K = max(0, min(numNeighbors, n - 1))
+        if (isinstance(tau, KNNDistMatrix)):
+            # KD-tree中已有的近邻，不在route中的点略去
+            loc = {keys[k]: k for k in range(n)}
+            nbr = []
+            for k in keys:
+                nbr.append([loc[l] for l in tau.neighbors(k) if l in loc][:K])
+            def d(a, b):
+                return tau[keys[a], keys[b]]
+            return d, nbr
+
+        if (isinstance(tau, DistMatrix)):
+            D = tau.toArray()[np.ix_([tau.index(k) for k in keys], [tau.index(k) for k in keys])]
+        else:
+            D = np.array([[tau[i, j] if i != j else 0 for j in keys] for i in keys], dtype = float)
+        Dl = D.tolist()
+        def d(a, b):
+            return Dl[a][b]
+        if (K == 0):
+            return d, [[] for _ in range(n)]
+        D = D.copy()
+        np.fill_diagonal(D, np.inf)
+        part = np.argpartition(D, K - 1, axis = 1)[:, :K]
+        order = np.argsort(np.take_along_axis(D, part, axis = 1), axis = 1)
+        nbr = np.take_along_axis(part, order, axis = 1).tolist()
+        return d, nbr
+
+    def _solveTSPHeuImpvNeighborList(seqObj, numNeighbors, twoOptFlag, orOptFlag, lkFlag = False, timeLimit = None, numIter = 0):
+        # NOTE: 2-opt, Or-opt和LK只考虑每个点的K近邻，用don't-look bits跳过没有变化的点，首次改进即执行
+        startTime = datetime.datetime.now()
+        nodeList = seqObj.traverse()
+        n = len(nodeList)
+        if (n < 5 or (not twoOptFlag and not orOptFlag and not lkFlag)):
+            return seqObj
+        asymFlag = seqObj.asymFlag
+        d, nbr = _tspNeighborList(seqObj.tau, [i.key for i in nodeList], numNeighbors)
+        curDist = seqObj.dist
+
+        # Route as a list of node indices, `pos` is the position of each node
+        t = list(range(n))
+        pos = list(range(n))
+        def succ(a):
+            return t[(pos[a] + 1) % n]
+        def pred(a):
+            return t[pos[a] - 1]
+
+        # Reverse the path t[i] => t[j], or the rest of the route if shorter
+        def reversePath(i, j):
+            L = (j - i) % n + 1
+            if (2 * L > n):
+                # NOTE: 对称时，翻转另一半得到的是同一个route的反向
+                i, j = (j + 1) % n, (i - 1) % n
+                L = n - L
+            for k in range(L // 2):
+                p = (i + k) % n
+                q = (j - k) % n
+                t[p], t[q] = t[q], t[p]
+                pos[t[p]] = p
+                pos[t[q]] = q
+
+        # Move the segment of k nodes starting from s to between u and succ(u)
+        def moveSegment(s, k, u, revFlag):
+            i = pos[s]
+            seg = [t[(i + m) % n] for m in range(k)]
+            if (revFlag):
+                seg.reverse()
+            # NOTE: = = p S X u v Y = = 改为 = = p X u S v Y = =，只需改写S X或Y S中较短的一段
+            lenX = (pos[u] - (i + k - 1)) % n
+            lenY = n - k - lenX
+            if (lenX <= lenY):
+                start = i
+                new = [t[(i + k + m) % n] for m in range(lenX)] + seg
+            else:
+                start = (i - lenY) % n
+                new = seg + [t[(start + m) % n] for m in range(lenY)]
+            for m in range(len(new)):
+                p = (start + m) % n
+                t[p] = new[m]
+                pos[new[m]] = p
+
+        # Don't-look bits
+        queue = collections.deque(range(n))
+        inQueue = [True for _ in range(n)]
+        def activate(nodes):
+            for a in nodes:
+                if (not inQueue[a]):
+                    inQueue[a] = True
+                    queue.append(a)
+
+        def try2Opt(a):
+            nonlocal curDist
+            for succFlag in [True, False]:
+                b = succ(a) if succFlag else pred(a)
+                dAB = d(a, b)
+                for c in nbr[a]:
+                    dAC = d(a, c)
+                    if (dAC >= dAB):
+                        break
+                    e = succ(c) if succFlag else pred(c)
+                    if (c == b or e == a):
+                        continue
+                    delta = dAC + d(b, e) - dAB - d(c, e)
+                    if (delta < -1e-9):
+                        # = = a b = = c e = = => = = a c = = b e = =
+                        curDist += delta
+                        if (succFlag):
+                            reversePath(pos[b], pos[c])
+                        else:
+                            reversePath(pos[c], pos[b])
+                        activate([a, b, c, e])
+                        return True
+            return False
+
+        def tryOrOpt(a):
+            nonlocal curDist
+            for k in range(1, 4):
+                if (n - k < 3):
+                    break
+                for startFlag in ([True, False] if k > 1 else [True]):
+                    # Segment s => e, with `a` at one end
+                    s = a
+                    e = a
+                    for _ in range(k - 1):
+                        if (startFlag):
+                            e = succ(e)
+                        else:
+                            s = pred(s)
+                    p = pred(s)
+                    q = succ(e)
+                    removeGain = d(p, s) + d(e, q) - d(p, q)
+                    if (removeGain <= 1e-9):
+                        continue
+                    seg = set([t[(pos[s] + m) % n] for m in range(k)])
+                    # (u, v, revFlag, added cost)
+                    cands = []
+                    for c in nbr[s]:
+                        if (d(c, s) >= removeGain):
+                            break
+                        if (c in seg):
+                            continue
+                        # = = c S v = =
+                        v = succ(c)
+                        if (v not in seg):
+                            cands.append((c, v, False, d(c, s) + d(e, v) - d(c, v)))
+                        # = = u S' c = =
+                        u = pred(c)
+                        if (not asymFlag and u not in seg):
+                            cands.append((u, c, True, d(u, e) + d(s, c) - d(u, c)))
+                    for c in nbr[e]:
+                        if (d(e, c) >= removeGain):
+                            break
+                        if (c in seg):
+                            continue
+                        # = = u S c = =
+                        u = pred(c)
+                        if (u not in seg):
+                            cands.append((u, c, False, d(u, s) + d(e, c) - d(u, c)))
+                        # = = c S' v = =
+                        v = succ(c)
+                        if (not asymFlag and v not in seg):
+                            cands.append((c, v, True, d(c, e) + d(s, v) - d(c, v)))
+                    for (u, v, revFlag, addCost) in cands:
+                        if (addCost - removeGain < -1e-9):
+                            curDist += addCost - removeGain
+                            moveSegment(s, k, u, revFlag)
+                            activate([p, q, s, e, u, v])
+                            return True
+            return False
+
+        def tryLK(t1):
+            # NOTE: 从(t1, t2)出发连续做2-opt，每一步断开新加的(t4, t1)，保留整个过程中最好的一步
+            # = = t1 t2 = = t4 t3 = = => = = t1 t4 = = t2 t3 = =
+            nonlocal curDist
+            for succFlag in [True, False]:
+                t2 = succ(t1) if succFlag else pred(t1)
+                oriDist = curDist
+                bestDist = curDist
+                bestDepth = 0
+                moves = []
+                touched = []
+                added = set()
+                for _ in range(maxDepth):
+                    # Gain of the open path, i.e., without (t1, t2)
+                    gOpen = oriDist - curDist + d(t1, t2)
+                    t3 = None
+                    t4 = None
+                    bestScore = None
+                    for c in nbr[t2]:
+                        dC = d(t2, c)
+                        if (dC >= gOpen):
+                            break
+                        if (c == t1):
+                            continue
+                        e = pred(c) if succFlag else succ(c)
+                        if (e == t2 or (min(e, c), max(e, c)) in added):
+                            continue
+                        score = d(e, c) - dC
+                        if (bestScore == None or score > bestScore):
+                            bestScore = score
+                            t3 = c
+                            t4 = e
+                    if (t3 == None):
+                        break
+                    curDist += d(t2, t3) + d(t4, t1) - d(t1, t2) - d(t4, t3)
+                    move = (pos[t2], pos[t4]) if succFlag else (pos[t4], pos[t2])
+                    reversePath(move[0], move[1])
+                    moves.append(move)
+                    touched.extend([t2, t3, t4])
+                    added.add((min(t2, t3), max(t2, t3)))
+                    if (curDist < bestDist - 1e-9):
+                        bestDist = curDist
+                        bestDepth = len(moves)
+                    # NOTE: reversePath()可能翻转的是另一半，重新判断t1的方向
+                    t2 = t4
+                    succFlag = (succ(t1) == t4)
+                # Roll back to the best step
+                while (len(moves) > bestDepth):
+                    move = moves.pop()
+                    reversePath(move[0], move[1])
+                curDist = bestDist
+                if (bestDepth > 0):
+                    activate([t1] + touched[:3 * bestDepth])
+                    return True
+            return False
+
+        def timeout():
+            return timeLimit != None and (datetime.datetime.now() - startTime).total_seconds() > timeLimit
+
+        def descend():
+            numPop = 0
+            while (len(queue) > 0):
+                a = queue.popleft()
+                inQueue[a] = False
+                if ((lkFlag and tryLK(a)) or (twoOptFlag and try2Opt(a)) or (orOptFlag and tryOrOpt(a))):
+                    activate([a])
+                numPop += 1
+                if (numPop % 100 == 0 and timeout()):
+                    break
+
+        maxDepth = 50
+        descend()
+
+        # Perturbation ============================================================
+        # NOTE: 交换两段相邻的片段(double bridge)，重新局部优化，变差则恢复
+        iterTotal = 0
+        while (lkFlag and n >= 8 
+                and (numIter == None or iterTotal < numIter) 
+                and (numIter != None or timeLimit != None) 
+                and not timeout()):
+            iterTotal += 1
+            tSaved = t[:]
+            posSaved = pos[:]
+            distSaved = curDist
+            lenA = random.randint(1, min(50, (n - 2) // 2))
+            lenB = random.randint(1, min(50, (n - 2) // 2))
+            i = random.randint(0, n - 1)
+            x = t[i]
+            A = [t[(i + 1 + m) % n] for m in range(lenA)]
+            B = [t[(i + 1 + lenA + m) % n] for m in range(lenB)]
+            y = t[(i + 1 + lenA + lenB) % n]
+            # = = x A B y = = => = = x B A y = =
+            curDist += (d(x, B[0]) + d(B[-1], A[0]) + d(A[-1], y)
+                - d(x, A[0]) - d(A[-1], B[0]) - d(B[-1], y))
+            new = B + A
+            for m in range(len(new)):
+                p = (i + 1 + m) % n
+                t[p] = new[m]
+                pos[new[m]] = p
+            activate([x, y, A[0], A[-1], B[0], B[-1]])
+            descend()
+            if (curDist > distSaved - 1e-9):
+                t[:] = tSaved
+                pos[:] = posSaved
+                curDist = distSaved
+                while (len(queue) > 0):
+                    inQueue[queue.popleft()] = False
+
+        # Rebuild the route =======================================================
+        newSeqObj = Route(seqObj.tau, asymFlag)
+        for k in range(n):
+            newSeqObj.append(nodeList[t[(pos[0] + k) % n]])
+        return newSeqObj
+
+    def _solveMetaLocalSearch(seqObj, incumbent = None, **kwargs):
+        stop = {} if 'stop' not in kwargs else kwargs['stop']
         if (kwargs['meta'] == 'SimulatedAnnealing'):
             seqObj = _solveTSPMetaSimulatedAnnealing(
                 seqObj = seqObj, 
@@ -817,14 +1185,16 @@ def solveTSP(
                 lengTemp = kwargs['lengTemp'], 
                 neighRatio = kwargs['neighRatio'], 
                 coolRate = kwargs['coolRate'], 
-                stop = kwargs['stop'])
+                stop = stop,
+                incumbent = incumbent)
         elif (kwargs['meta'] == 'TabuSearch'):
             seqObj = _solveTSPMetaTabuSearch(
                 seqObj = seqObj,
                 maxTabuListLength = kwargs['maxTabuListLength'],
                 neighRatio = kwargs['neighRatio'],
                 neighNum = kwargs['neighNum'],
-                stop = kwargs['stop'])
+                stop = stop,
+                incumbent = incumbent)
         else:
             raise UnsupportedInputError("ERROR: Currently not support.")
 
@@ -833,10 +1203,11 @@ def solveTSP(
 
         return {
             'ofv': ofv,
-            'seq': seq
+            'seq': seq,
+            'convergence': [] if incumbent == None else incumbent['convergence']
         }
 
-    def _solveTSPMetaPopSearch(popObj, nodeObj, depotID, tau, asymFlag, **kwargs):
+    def _solveTSPMetaPopSearch(popObj, nodeObj, depotID, tau, asymFlag, incumbent = None, **kwargs):
         if (kwargs['meta'] == 'GeneticAlgorithm'):
             seqObj = _solveTSPMetaGeneticAlgorithm(
                 popObj = popObj, 
@@ -845,7 +1216,9 @@ def solveTSP(
                 tau = tau, 
                 asymFlag = asymFlag, 
                 neighRatio = kwargs['neighRatio'], 
-                stop = kwargs['stop'])
+                stop = {} if 'stop' not in kwargs else kwargs['stop'],
+                incumbent = incumbent,
+                migration = None if 'migration' not in kwargs else kwargs['migration'])
         else:
             raise UnsupportedInputError("ERROR: Currently not support.")
 
@@ -854,55 +1227,186 @@ def solveTSP(
 
         return {
             'ofv': ofv,
-            'seq': seq
+            'seq': seq,
+            'convergence': [] if incumbent == None else incumbent['convergence']
         }
 
+    def _solveTSPMetaIncumbent(incumbent, seqObj):
+        # NOTE: 记录收敛过程，有回调时把新的最优解(从depot出发的闭合序列)传出去
+        if (incumbent == None):
+            return
+        elapsed = (datetime.datetime.now() - incumbent['startTime']).total_seconds()
+        incumbent['convergence'].append((elapsed, seqObj.dist))
+        if (incumbent['onIncumbent'] != None):
+            seq = [n.key for n in seqObj.traverse()]
+            if (incumbent['depotID'] in seq):
+                k = seq.index(incumbent['depotID'])
+                seq = seq[k:] + seq[:k]
+            seq.append(seq[0])
+            incumbent['onIncumbent'](seq, seqObj.dist, elapsed)
+        return
+
+    def _solveTSPMetaTimeout(incumbent):
+        return (incumbent != None 
+            and incumbent['deadline'] != None 
+            and datetime.datetime.now() >= incumbent['deadline'])
+
+    def _solveTSPMetaMultiStart(nodes, nodeIDs, depotID, tau, incumbent, **kwargs):
+        # NOTE: 每个起点使用不同的随机种子，tau只在每个进程初始化时传一次，只读
+        numStarts = kwargs['numStarts']
+        workers = 1 if 'workers' not in kwargs else kwargs['workers']
+        seed = None if 'seed' not in kwargs else kwargs['seed']
+        migrationInterval = None if 'migrationInterval' not in kwargs else kwargs['migrationInterval']
+        startKwargs = {k: kwargs[k] for k in kwargs if k not in ['numStarts', 'workers', 'seed', 'migrationInterval', 'onIncumbent', 'tau', 'path']}
+        seeds = [random.randint(0, 2 ** 31 - 1) if seed == None else seed + s for s in range(numStarts)]
+        parallelFlag = workers != None and workers > 1
+        # NOTE: 起点多于workers时分批运行，剩余的时间平均分给各批，每个起点从开始运行时计时，且不超过deadline
+        budget = None
+        if (incumbent['deadline'] != None):
+            numWaves = math.ceil(numStarts / (workers if parallelFlag else 1))
+            budget = max(0, (incumbent['deadline'] - datetime.datetime.now()).total_seconds()) / numWaves
+        migrationFlag = kwargs['meta'] == 'GeneticAlgorithm' and migrationInterval != None
+        manager = None
+        if (parallelFlag and (migrationFlag or incumbent['onIncumbent'] != None)):
+            manager = multiprocessing.Manager()
+
+        # Island model, the islands form a ring, each sends its best gene to the next one
+        migrations = [None for s in range(numStarts)]
+        if (migrationFlag):
+            inboxes = [manager.Queue() for s in range(numStarts)]
+            for s in range(numStarts):
+                migrations[s] = {
+                    'interval': migrationInterval,
+                    'inbox': inboxes[s],
+                    'outbox': inboxes[(s + 1) % numStarts]
+                }
+
+        # The starts report their incumbents to a queue, only the overall improvements are passed on
+        incumbentQueue = None
+        listener = None
+        if (incumbent['onIncumbent'] != None):
+            incumbentQueue = manager.Queue() if parallelFlag else queue.Queue()
+            def listen():
+                bestOfv = float('inf')
+                while (True):
+                    item = incumbentQueue.get()
+                    if (item == None):
+                        break
+                    if (item[1] < bestOfv - 1e-9):
+                        bestOfv = item[1]
+                        incumbent['onIncumbent'](item[0], item[1], (datetime.datetime.now() - incumbent['startTime']).total_seconds())
+            listener = threading.Thread(target = listen)
+            listener.start()
+
+        try:
+            starts = _parallelMap(
+                func = _solveTSPMetaStart, 
+                argsList = [(seeds[s], migrations[s], incumbentQueue) for s in range(numStarts)], 
+                workers = workers, 
+                nodes = nodes, 
+                nodeIDs = nodeIDs, 
+                depotID = depotID, 
+                tau = tau, 
+                startKwargs = startKwargs,
+                budget = budget)
+        finally:
+            if (listener != None):
+                incumbentQueue.put(None)
+                listener.join()
+            if (manager != None):
+                manager.shutdown()
+
+        best = None
+        for s in range(numStarts):
+            starts[s]['seed'] = seeds[s]
+            if (best == None or starts[s]['ofv'] < starts[best]['ofv']):
+                best = s
+
+        return {
+            'ofv': starts[best]['ofv'],
+            'seq': starts[best]['seq'],
+            'convergence': starts[best]['convergence'],
+            'starts': starts
+        }
+
+    def _tspDistRows(tau, keys):
+        # NOTE: 返回紧凑编号下从一个点到前m个点(row)和从前m个点到一个点(col)的距离，缺失的边为inf
+        if (isinstance(tau, KNNDistMatrix) and tau.edges == 'Euclidean' and len(tau._assigned) == 0):
+            # 直接由坐标计算，不用计算整行
+            pts = tau.pts[[tau.index(k) for k in keys]]
+            def rowOf(a, m = None):
+                diff = pts[:m] - pts[a]
+                return np.sqrt(np.einsum('ij,ij->i', diff, diff))
+            return rowOf, rowOf
+        if (isinstance(tau, DistMatrix)):
+            loc = np.array([tau.index(k) for k in keys], dtype = int)
+            def rowOf(a, m = None):
+                row = np.asarray(tau.row(keys[a]), dtype = float)[loc[:m]]
+                return np.where(np.isnan(row), np.inf, row)
+            def colOf(a, m = None):
+                col = np.asarray(tau.col(keys[a]), dtype = float)[loc[:m]]
+                return np.where(np.isnan(col), np.inf, col)
+            return rowOf, colOf
+        D = np.array([[tau[i, j] if (i, j) in tau else (0 if i == j else np.inf) for j in keys] for i in keys], dtype = float)
+        def rowOf(a, m = None):
+            return D[a, :m]
+        def colOf(a, m = None):
+            return D[:m, a]
+        return rowOf, colOf
+
     def _solvTSPHeuConskNearestNeighbor(depotID, nodeIDs, tau, k = 1):
         # Initialize ----------------------------------------------------------
-        seq = [depotID]
-        remain = [nodeIDs[i] for i in range(len(nodeIDs)) if nodeIDs[i] != depotID]
+        # NOTE: 紧凑编号，visited标记已访问的点，每一步在一行距离上取argmin
+        keys = [depotID] + [i for i in nodeIDs if i != depotID]
+        n = len(keys)
+        rowOf, _ = _tspDistRows(tau, keys)
+        # K nearest neighbors are already sorted in KNNDistMatrix
+        nbr = None
+        if (k == 1 and isinstance(tau, KNNDistMatrix)):
+            nbr = _tspNeighborList(tau, keys, tau.numNeighbors)[1]
+        visited = np.zeros(n, dtype = bool)
+        visited[0] = True
+        seq = [0]
+
         # Accumulate seq ------------------------------------------------------
-        while (len(remain) > 0):
-            currentNodeID = seq[-1]
-
-            # Sort the distance from current node to the rest of nodes
-            sortedSeqHeap = []
-            for n in remain:
-                if ((currentNodeID, n) in tau):
-                    dist = tau[currentNodeID, n]
-                    heapq.heappush(sortedSeqHeap, (dist, n))
-
-            # Get the kth of sorted node and append it to seq
-            nextNodeID = None
-            for _ in range(k):
-                if (len(sortedSeqHeap) > 0):
-                    nextNodeID = heapq.heappop(sortedSeqHeap)[1]
-            seq.append(nextNodeID)
-
-            # Update remain
-            remain.remove(nextNodeID)
-        return seq
+        while (len(seq) < n):
+            currentIdx = seq[-1]
+            nextIdx = None
+            if (nbr != None):
+                for c in nbr[currentIdx]:
+                    if (not visited[c]):
+                        nextIdx = c
+                        break
+            if (nextIdx == None):
+                # Get the kth of sorted node and append it to seq
+                row = np.where(visited, np.inf, rowOf(currentIdx))
+                kk = min(k, n - len(seq))
+                nextIdx = int(np.argmin(row)) if kk == 1 else int(np.argpartition(row, kk - 1)[kk - 1])
+                if (visited[nextIdx]):
+                    nextIdx = int(np.flatnonzero(~visited)[0])
+            visited[nextIdx] = True
+            seq.append(nextIdx)
+        return [keys[i] for i in seq]
 
     def _solvTSPHeuConsFarthestNeighbor(depotID, nodeIDs, tau):
         # Initialize ----------------------------------------------------------
-        seq = [depotID]
-        remain = [nodeIDs[i] for i in range(len(nodeIDs)) if nodeIDs[i] != depotID]
+        keys = [depotID] + [i for i in nodeIDs if i != depotID]
+        n = len(keys)
+        _, colOf = _tspDistRows(tau, keys)
+        visited = np.zeros(n, dtype = bool)
+        visited[0] = True
+        seq = [0]
+
         # Accumulate seq ------------------------------------------------------
-        while (len(remain) > 0):
-            nextLeng = None
-            nextID = None
-            for n in remain:
-                if ((n, seq[-1]) in tau):
-                    if (nextLeng == None or tau[n, seq[-1]] > nextLeng):
-                        nextID = n
-                        nextLeng = tau[n, seq[-1]]
-                elif ((seq[-1], n) in tau):
-                    if (nextLeng == None or tau[seq[-1], n] > nextLeng):
-                        nextID = n
-                        nextLeng = tau[seq[-1], n]
-            seq.append(nextID)
-            remain.remove(nextID)
-        return seq
+        while (len(seq) < n):
+            col = colOf(seq[-1])
+            col = np.where(visited | np.isinf(col), -np.inf, col)
+            nextIdx = int(np.argmax(col))
+            if (visited[nextIdx]):
+                nextIdx = int(np.flatnonzero(~visited)[0])
+            visited[nextIdx] = True
+            seq.append(nextIdx)
+        return [keys[i] for i in seq]
 
     def _solvTSPHeuConsSweep(nodes, depotID, nodeIDs, ptFieldName):
         # Sweep seq -----------------------------------------------------------
@@ -912,6 +1416,83 @@ def solveTSP(
             refPt = nodes[depotID][ptFieldName])
         return sweep
 
+    def _solvTSPHeuConsGreedyEdge(nodes, nodeIDs, tau, asymFlag, ptFieldName, numNeighbors):
+        # NOTE: 只考虑KD-tree找到的候选边，每个点度数不超过2，用union-find避免成环
+        keys = [i for i in nodeIDs]
+        n = len(keys)
+        if (n <= 3):
+            return keys
+        pts = np.array([nodes[k][ptFieldName] for k in keys], dtype = float)
+        # NOTE: 欧氏距离的KNNDistMatrix可以直接使用KD-tree给出的距离
+        kdDistFlag = isinstance(tau, KNNDistMatrix) and tau.edges == 'Euclidean' and len(tau._assigned) == 0
+
+        def candidateEdges(idxs, K):
+            dist, nbrs = cKDTree(pts[idxs]).query(pts[idxs], k = K + 1)
+            a = np.repeat(idxs, K + 1)
+            b = idxs[nbrs.ravel()]
+            w = dist.ravel()
+            keep = a != b
+            a, b, w = a[keep], b[keep], w[keep]
+            lo = np.minimum(a, b)
+            hi = np.maximum(a, b)
+            _, first = np.unique(lo * n + hi, return_index = True)
+            lo, hi, w = lo[first], hi[first], w[first]
+            if (not kdDistFlag):
+                if (asymFlag):
+                    w = np.array([min(tau[keys[i], keys[j]], tau[keys[j], keys[i]]) for (i, j) in zip(lo.tolist(), hi.tolist())], dtype = float)
+                else:
+                    w = np.array([tau[keys[i], keys[j]] for (i, j) in zip(lo.tolist(), hi.tolist())], dtype = float)
+            order = np.argsort(w, kind = 'stable')
+            return lo[order].tolist(), hi[order].tolist()
+
+        # Union-find
+        parent = list(range(n))
+        def find(i):
+            while (parent[i] != i):
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        deg = [0] * n
+        adj = [[] for _ in range(n)]
+        numEdges = 0
+        idxs = np.arange(n)
+        K = min(numNeighbors, n - 1)
+        # NOTE: 第一轮在所有点上找候选边，之后只在路径端点之间找，直到只剩一条路径
+        while (numEdges < n - 1):
+            added = 0
+            for (i, j) in zip(*candidateEdges(idxs, K)):
+                if (deg[i] < 2 and deg[j] < 2):
+                    ri = find(i)
+                    rj = find(j)
+                    if (ri != rj):
+                        parent[ri] = rj
+                        deg[i] += 1
+                        deg[j] += 1
+                        adj[i].append(j)
+                        adj[j].append(i)
+                        added += 1
+            numEdges += added
+            idxs = np.array([i for i in range(n) if deg[i] < 2], dtype = int)
+            if (added == 0):
+                K = min(2 * K, len(idxs) - 1)
+            else:
+                K = min(numNeighbors, len(idxs) - 1)
+
+        # Walk along the path
+        seq = []
+        prev = None
+        cur = int(idxs[0])
+        while (cur != None):
+            seq.append(keys[cur])
+            nxt = None
+            for j in adj[cur]:
+                if (j != prev):
+                    nxt = j
+            prev = cur
+            cur = nxt
+        return seq
+
     def _solvTSPHeuConsRandom(depotID, nodeIDs):
         # Get random seq ------------------------------------------------------
         seq = [i for i in nodeIDs]
@@ -920,17 +1501,76 @@ def solveTSP(
 
     def _solvTSPHeuConsInsertion(nodeIDs, initSeq, nodeObj, tau, asymFlag, randomInsertionFlag):
         # Initialize ----------------------------------------------------------
-        route = Route(tau, asymFlag)
-
         # NOTE: initSeq should starts and ends with depotID
-        for n in initSeq[:-1]:
-            route.append(nodeObj[n])
-
         unInserted = [i for i in nodeIDs if i not in initSeq[:-1]]
         if (randomInsertionFlag):
             random.shuffle(unInserted)
-        for n in unInserted:
-            route.cheapestInsert(nodeObj[n])
+        keys = [i for i in initSeq[:-1]] + unInserted
+        n = len(keys)
+        rowOf, colOf = _tspDistRows(tau, keys)
+
+        # NOTE: 用数组表示route，succ/pred为前后的点，ef/eb为到succ/从succ出发的距离
+        m = len(initSeq) - 1
+        succ = np.zeros(n, dtype = int)
+        pred = np.zeros(n, dtype = int)
+        ef = np.zeros(n)
+        eb = np.zeros(n)
+        for a in range(m):
+            b = (a + 1) % m
+            succ[a] = b
+            pred[b] = a
+            if (m > 1):
+                ef[a] = tau[keys[a], keys[b]]
+                eb[a] = tau[keys[b], keys[a]]
+        dist = float(np.sum(ef[:m]))
+        revDist = float(np.sum(eb[:m]))
+        members = np.arange(n)
+
+        # Insert each node after the cheapest edge, evaluated for all edges at once
+        # NOTE: 第x个点插入时，route中正好是前x个点
+        for x in range(m, n):
+            inRoute = members[:x]
+            rx = rowOf(x, x)
+            cx = colOf(x, x) if asymFlag else rx
+            nxt = succ[:x]
+            # = = a b = = => = = a x b = =
+            deltaF = cx + rx[nxt] - ef[:x]
+            cost = deltaF
+            if (asymFlag):
+                deltaB = rx + cx[nxt] - eb[:x]
+                cost = np.minimum(dist + deltaF, revDist + deltaB)
+            k = int(np.argmin(cost))
+            a = int(inRoute[k])
+            b = int(succ[a])
+            dist += deltaF[k]
+            if (asymFlag):
+                revDist += deltaB[k]
+            succ[a] = x
+            pred[x] = a
+            succ[x] = b
+            pred[b] = x
+            ef[x] = rx[b]
+            eb[x] = cx[b]
+            ef[a] = cx[a]
+            eb[a] = rx[a]
+
+            # Reverse the route if it is shorter in the opposite direction
+            if (asymFlag and dist > revDist):
+                inRoute = members[:x + 1]
+                oriPred = pred[inRoute].copy()
+                newEf = eb[oriPred]
+                newEb = ef[oriPred]
+                pred[inRoute] = succ[inRoute]
+                succ[inRoute] = oriPred
+                ef[inRoute] = newEf
+                eb[inRoute] = newEb
+                dist, revDist = revDist, dist
+
+        route = Route(tau, asymFlag)
+        cur = 0
+        for _ in range(n):
+            route.append(nodeObj[keys[cur]])
+            cur = int(succ[cur])
 
         return route
 
@@ -939,6 +1579,26 @@ def solveTSP(
         subG = nx.Graph()
         for (i, j) in tau:
             G.add_edge(i, j, weight=tau[i, j])
+        # NOTE: KNNDistMatrix只遍历K近邻，聚类的数据上图可能不连通，用实际距离补上每两个连通分量之间最短的边
+        if (isinstance(tau, KNNDistMatrix)):
+            G.add_nodes_from(tau.nodeIDs)
+            for (k, l) in tau._assigned:
+                G.add_edge(tau.nodeIDs[k], tau.nodeIDs[l], weight=tau._assigned[k, l])
+            comps = [list(c) for c in nx.connected_components(G)]
+            if (len(comps) > 1):
+                compIdx = [np.array([tau.index(i) for i in c], dtype = int) for c in comps]
+                for a in range(len(comps) - 1):
+                    bestDist = [np.inf for b in range(len(comps))]
+                    bestEdge = [None for b in range(len(comps))]
+                    for i in comps[a]:
+                        row = tau.row(i)
+                        for b in range(a + 1, len(comps)):
+                            m = int(np.argmin(row[compIdx[b]]))
+                            if (row[compIdx[b][m]] < bestDist[b]):
+                                bestDist[b] = row[compIdx[b][m]]
+                                bestEdge[b] = (i, comps[b][m])
+                    for b in range(a + 1, len(comps)):
+                        G.add_edge(bestEdge[b][0], bestEdge[b][1], weight=tau[bestEdge[b][0], bestEdge[b][1]])
         mst = nx.minimum_spanning_tree(G)
 
         degreeOfEachNodes = {}
@@ -976,7 +1636,7 @@ def solveTSP(
     def _solvTSPHeuConsCycleCover(depotID, tau):
         raise VrpSolverNotAvailableError("ERROR: vrpSolver has not implement this kwargs yet")
 
-    def _solveTSPMetaTabuSearch(seqObj, maxTabuListLength, neighRatio, neighNum, stop) -> dict:
+    def _solveTSPMetaTabuSearch(seqObj, maxTabuListLength, neighRatio, neighNum, stop, incumbent = None) -> dict:
 
         # Subroutines to generate neighborhoods ===================================
         # Swap i and i + 1
@@ -1002,6 +1662,20 @@ def solveTSP(
             seqObjRotate.rotate(nI, nJ)
             return
 
+        # Randomly move a segment of 1 to 3 vertices to another position
+        def relocate(seqObjRelocate, keyS, keys):
+            nS = seqObjRelocate.query(keyS)
+            nE = nS
+            segKeys = [nS.key]
+            for _ in range(random.randint(0, 2)):
+                nE = nE.next
+                segKeys.append(nE.key)
+            keyA = None
+            while (keyA == None or keyA in segKeys or keyA == nS.prev.key):
+                keyA = keys[random.randint(0, len(keys) - 1)]
+            seqObjRelocate.relocateSegment(nS, nE, seqObjRelocate.query(keyA))
+            return
+
         # Initialize ==============================================================
         tabu = []
 
@@ -1009,6 +1683,7 @@ def solveTSP(
         curSeq = [i.key for i in seqObj.traverse()]
         ofv = seqObj.dist
         startTime = datetime.datetime.now()
+        _solveTSPMetaIncumbent(incumbent, seqObj)
 
         # Main tabu ===============================================================
         contFlag = True
@@ -1023,6 +1698,9 @@ def solveTSP(
             # Create a list of candidates =========================================
             candi = []
             for i in range(neighNum):
+                if (_solveTSPMetaTimeout(incumbent)):
+                    break
+
                 # Clone a current sequence
                 seqObjNew = seqObj.clone()
 
@@ -1077,6 +1755,17 @@ def solveTSP(
                     if (tuple([f.key for f in seqObjNew.traverse()]) not in tabu):
                         candi.append(seqObjNew)
 
+                # Randomly move a segment
+                elif (typeOfNeigh == 'relocate'):
+                    curSeq = [f.key for f in seqObj.traverse()]
+                    if (len(curSeq) <= 5):
+                        continue
+                    keyS = curSeq[random.randint(0, len(curSeq) - 1)]
+                    relocate(seqObjNew, keyS, curSeq)
+                    seqObjNew.rehead(0)
+                    if (tuple([f.key for f in seqObjNew.traverse()]) not in tabu):
+                        candi.append(seqObjNew)
+
             # Add all candidates into tabu list ===================================
             for i in candi:
                 tabu.append(tuple([f.key for f in i.traverse()]))
@@ -1094,6 +1783,7 @@ def solveTSP(
             if (newOfvFound):
                 seqObj = bestSeq.clone()
                 iterNoImp = 0
+                _solveTSPMetaIncumbent(incumbent, seqObj)
             else:
                 iterNoImp += 1
 
@@ -1106,6 +1796,9 @@ def solveTSP(
             tabu = tabu[max((len(tabu) - maxTabuListLength), 0):-1]
 
             # Check stopping criteria
+            if (_solveTSPMetaTimeout(incumbent)):
+                contFlag = False
+                break
             if ('numNoImproveIter' in stop):
                 if (iterNoImp > stop['numNoImproveIter']):
                     contFlag = False
@@ -1121,34 +1814,42 @@ def solveTSP(
 
         return seqObj
 
-    def _solveTSPMetaSimulatedAnnealing(seqObj, initTemp, lengTemp, neighRatio, coolRate, stop) -> dict:
+    def _solveTSPMetaSimulatedAnnealing(seqObj, initTemp, lengTemp, neighRatio, coolRate, stop, incumbent = None) -> dict:
 
         # Subroutines to generate neighborhoods ===================================
+        # NOTE: 先用delta函数评估，被接受的邻域才会修改seqObj
         # Swap i and i + 1
         def swap(keyI):
-            oldDist = seqObj.dist
             nI = seqObj.query(keyI)
             seqObj.swap(nI)
-            newDist = seqObj.dist
-            return (newDist - oldDist)
+            return
 
         # Randomly exchange two vertices
         def exchange(keyI, keyJ):
-            oldDist = seqObj.dist
             nI = seqObj.query(keyI)
             nJ = seqObj.query(keyJ)
             seqObj.exchange(nI, nJ)
-            newDist = seqObj.dist
-            return (newDist - oldDist)
+            return
             
         # Randomly rotate part of seq
         def rotate(keyI, keyJ):
-            oldDist = seqObj.dist
             nI = seqObj.query(keyI)
             nJ = seqObj.query(keyJ)
             seqObj.rotate(nI, nJ)
-            newDist = seqObj.dist
-            return (newDist - oldDist)
+            return
+
+        # Move segment s => e to after a
+        def relocate(keyS, keyE, keyA):
+            nS = seqObj.query(keyS)
+            nE = seqObj.query(keyE)
+            nA = seqObj.query(keyA)
+            seqObj.relocateSegment(nS, nE, nA)
+            return
+
+        # Too close to exchange/rotate, i.e., within two steps on the route
+        def nearby(keyI, keyJ):
+            nI = seqObj.query(keyI)
+            return keyJ in [nI.key, nI.next.key, nI.next.next.key, nI.prev.key, nI.prev.prev.key]
 
         # Initialize ==============================================================
         # Initial temperature
@@ -1157,9 +1858,17 @@ def solveTSP(
         L = lengTemp
 
         # Initial Solution
-        curSeq = [i.key for i in seqObj.traverse()]
+        # NOTE: 节点的集合不变，随机选点不需要每次遍历route，通过query()直接找到节点
+        keys = [i.key for i in seqObj.traverse()]
         ofv = seqObj.dist
         startTime = datetime.datetime.now()
+        _solveTSPMetaIncumbent(incumbent, seqObj)
+
+        # Best solution found
+        # NOTE: 只有从最优解接受一个变差的邻域时才需要保存最优解的序列
+        bestOfv = ofv
+        bestKeys = None
+        curBestFlag = True
 
         # Main cooling ============================================================
         contFlag = True
@@ -1176,94 +1885,111 @@ def solveTSP(
 
                 # Generate a neighbor using different type
                 typeOfNeigh = rndPickFromDict(neighRatio)
+                if (len(keys) <= 5):
+                    typeOfNeigh = 'swap'
 
                 deltaC = None
-                revAction = {}
+                action = {}
 
                 # Randomly swap
                 if (typeOfNeigh == 'swap'):
-                    curSeq = [f.key for f in seqObj.traverse()]
-                    i = random.randint(0, len(curSeq) - 1)
-                    keyI = curSeq[i]
-                    keyINext = seqObj.query(keyI).next.key
-                    revAction = {
+                    keyI = keys[random.randint(0, len(keys) - 1)]
+                    action = {
                         'opt': 'swap',
-                        'key': keyINext
+                        'key': keyI
                     }
-                    deltaC = swap(keyI)
+                    deltaC = seqObj.deltaSwap(seqObj.query(keyI))[0]
 
                 # Randomly exchange two digits
                 elif (typeOfNeigh == 'exchange'):
-                    curSeq = [f.key for f in seqObj.traverse()]
-                    i = None
-                    j = None
-                    while (i == None 
-                            or j == None 
-                            or abs(i - j) <= 2 
-                            or (i == 0 and j == len(curSeq) - 1) 
-                            or (i == len(curSeq) - 1 and j == 0)):
-                        i = random.randint(0, len(curSeq) - 1)
-                        j = random.randint(0, len(curSeq) - 1)
-                    keyI = curSeq[i]
-                    keyJ = curSeq[j]
-                    revAction = {
+                    keyI = None
+                    keyJ = None
+                    while (keyI == None 
+                            or keyJ == None 
+                            or nearby(keyI, keyJ)):
+                        keyI = keys[random.randint(0, len(keys) - 1)]
+                        keyJ = keys[random.randint(0, len(keys) - 1)]
+                    action = {
                         'opt': 'exchange',
-                        'key': (keyJ, keyI)
+                        'key': (keyI, keyJ)
                     }
                     nI = seqObj.query(keyI)
                     nJ = seqObj.query(keyJ)
                     if (nI.next.key == nJ.key or nJ.next.key == nI.key):
                         raise
-                    deltaC = exchange(keyI, keyJ)
+                    deltaC = seqObj.deltaExchange(nI, nJ)[0]
 
                 # Randomly reverse part of path
                 elif (typeOfNeigh == 'rotate'):
-                    curSeq = [f.key for f in seqObj.traverse()]
-                    i = None
-                    j = None
-                    while (i == None 
-                            or j == None 
-                            or abs(i - j) <= 2 
-                            or (i == 0 and j == len(curSeq) - 1) 
-                            or (i == len(curSeq) - 1 and j == 0)):
-                        i = random.randint(0, len(curSeq) - 1)
-                        j = random.randint(0, len(curSeq) - 1)
-                    keyI = curSeq[i]
-                    keyJ = curSeq[j]
-
-                    revAction = {
+                    keyI = None
+                    keyJ = None
+                    while (keyI == None 
+                            or keyJ == None 
+                            or nearby(keyI, keyJ)):
+                        keyI = keys[random.randint(0, len(keys) - 1)]
+                        keyJ = keys[random.randint(0, len(keys) - 1)]
+
+                    action = {
                         'opt': 'rotate',
-                        'key': (keyJ, keyI)
+                        'key': (keyI, keyJ)
                     }                
                     nI = seqObj.query(keyI)
                     nJ = seqObj.query(keyJ)
                     if (nI.next.key == nJ.key or nJ.next.key == nI.key):
                         raise
-                    deltaC = rotate(keyI, keyJ)
+                    # NOTE: rotate(nI, nJ)翻转nI => nJ，即替换(nI.prev, nI)和(nJ, nJ.next)两条边
+                    deltaC = seqObj.delta2Opt(nI.prev, nJ)[0]
+
+                # Randomly move a segment of 1 to 3 vertices to another position
+                elif (typeOfNeigh == 'relocate'):
+                    nS = seqObj.query(keys[random.randint(0, len(keys) - 1)])
+                    nE = nS
+                    segKeys = [nS.key]
+                    for _ in range(random.randint(0, 2)):
+                        nE = nE.next
+                        segKeys.append(nE.key)
+                    keyA = None
+                    while (keyA == None or keyA in segKeys or keyA == nS.prev.key):
+                        keyA = keys[random.randint(0, len(keys) - 1)]
+                    action = {
+                        'opt': 'relocate',
+                        'key': (nS.key, nE.key, keyA)
+                    }
+                    deltaC = seqObj.deltaOrOpt(nS, nE, seqObj.query(keyA))[0]
 
                 # If this new neighbor is good, accept it, 
                 #     otherwise accept it with probability
+                acceptFlag = False
                 if (deltaC <= 0): # deltaC = newC - preC, <0 means improve
                     # print("Improved: Accept")
-                    ofv = seqObj.dist
-                    iterAcc += 1
+                    acceptFlag = True
                     iterNoImp = 0
                 else:
                     sample = random.random()
                     if (sample < math.exp(- deltaC / T)):
                         # print("No improve: Accept by chance", sample, "<", math.exp(- deltaC / T))
-                        ofv = seqObj.dist
-                        iterAcc += 1
+                        acceptFlag = True
                     else:
                         # print("No improve: Refused.")
-                        beforeSeq = seqObj.traverse()
-                        if (revAction['opt'] == 'swap'):
-                            _ = swap(revAction['key'])
-                        elif (revAction['opt'] == 'exchange'):
-                            _ = exchange(revAction['key'][0], revAction['key'][1])
-                        elif (revAction['opt'] == 'rotate'):
-                            _ = rotate(revAction['key'][0], revAction['key'][1])
                         iterNoImp += 1
+                if (acceptFlag):
+                    if (curBestFlag and deltaC > 0):
+                        bestKeys = [i.key for i in seqObj.traverse()]
+                        curBestFlag = False
+                    if (action['opt'] == 'swap'):
+                        swap(action['key'])
+                    elif (action['opt'] == 'exchange'):
+                        exchange(action['key'][0], action['key'][1])
+                    elif (action['opt'] == 'rotate'):
+                        rotate(action['key'][0], action['key'][1])
+                    elif (action['opt'] == 'relocate'):
+                        relocate(action['key'][0], action['key'][1], action['key'][2])
+                    ofv = seqObj.dist
+                    iterAcc += 1
+                    if (ofv < bestOfv - 1e-9):
+                        bestOfv = ofv
+                        curBestFlag = True
+                        _solveTSPMetaIncumbent(incumbent, seqObj)
 
                 apRate = iterAcc / iterTotal
 
@@ -1273,6 +1999,9 @@ def solveTSP(
                     "\nDist: " + str(seqObj.dist))
 
                 # Check stopping criteria
+                if (_solveTSPMetaTimeout(incumbent)):
+                    contFlag = False
+                    break
                 if ('finalTemp' in stop):
                     if (T < stop['finalTemp']):
                         contFlag = False
@@ -1295,9 +2024,16 @@ def solveTSP(
                         break
             # Cool down
             T = coolRate * T
+
+        # Return the best solution rather than the last one
+        if (not curBestFlag and bestOfv < seqObj.dist):
+            bestSeqObj = Route(seqObj.tau, seqObj.asymFlag)
+            for k in bestKeys:
+                bestSeqObj.append(seqObj.query(k).clone())
+            seqObj = bestSeqObj
         return seqObj
 
-    def _solveTSPMetaGeneticAlgorithm(popObj, nodeObj, depotID, tau, asymFlag, neighRatio, stop) -> dict:
+    def _solveTSPMetaGeneticAlgorithm(popObj, nodeObj, depotID, tau, asymFlag, neighRatio, stop, incumbent = None, migration = None) -> dict:
 
         # Subroutines to generate neighborhoods ===================================
         # Swap i and i + 1
@@ -1329,20 +2065,19 @@ def solveTSP(
             if (idx1 > idx2):
                 idx1, idx2 = idx2, idx1
             # 构造新序列
+            # NOTE: 用集合判断是否已在新序列中，避免O(n^2)
             newSeq1 = [seq2[i] for i in range(idx1, idx2)]
-            for i in range(idx2, len(seq1)):
-                if (seq1[i] not in newSeq1):
-                    newSeq1.append(seq1[i])
-            for i in range(idx2):
-                if (seq1[i] not in newSeq1):
+            inSeq1 = set(newSeq1)
+            for i in list(range(idx2, len(seq1))) + list(range(idx2)):
+                if (seq1[i] not in inSeq1):
                     newSeq1.append(seq1[i])
+                    inSeq1.add(seq1[i])
             newSeq2 = [seq1[i] for i in range(idx1, idx2)]
-            for i in range(idx2, len(seq2)):
-                if (seq2[i] not in newSeq2):
-                    newSeq2.append(seq2[i])
-            for i in range(idx2):
-                if (seq2[i] not in newSeq2):
+            inSeq2 = set(newSeq2)
+            for i in list(range(idx2, len(seq2))) + list(range(idx2)):
+                if (seq2[i] not in inSeq2):
                     newSeq2.append(seq2[i])
+                    inSeq2.add(seq2[i])
             # 构造新序列实体
             newSeqObj1 = Route(tau, asymFlag)
             for i in newSeq1:
@@ -1355,16 +2090,41 @@ def solveTSP(
 
             return newSeqObj1, newSeqObj2
 
+        # Exchange the best gene with other islands
+        def migrate():
+            # NOTE: 只发送本岛最优的个体，收到的个体替换本岛最差的个体，不等待其他岛
+            migration['outbox'].put(dashboard['bestSeq'])
+            while (True):
+                try:
+                    seq = migration['inbox'].get_nowait()
+                except queue.Empty:
+                    break
+                worst = max(range(len(popObj)), key = lambda k: popObj[k].dist)
+                newSeqObj = Route(tau, asymFlag)
+                for i in seq:
+                    newSeqObj.append(nodeObj[i].clone())
+                newSeqObj.rehead(depotID)
+                if (newSeqObj.dist < popObj[worst].dist):
+                    popObj[worst] = newSeqObj
+                # NOTE: 交叉时的权重依赖于bestOfv，需要立即更新
+                if (newSeqObj.dist < dashboard['bestOfv']):
+                    dashboard['bestOfv'] = newSeqObj.dist
+                    dashboard['bestSeq'] = seq
+                    _solveTSPMetaIncumbent(incumbent, newSeqObj)
+
         # Initialize ==============================================================
         dashboard = {
             'bestOfv': float('inf'),
             'bestSeq': None
         }
         startTime = datetime.datetime.now()
+        bestSeqObj = None
         for seq in popObj:
             if (seq.dist < dashboard['bestOfv']):
                 dashboard['bestOfv'] = seq.dist
                 dashboard['bestSeq'] = [i.key for i in seq.traverse()]
+                bestSeqObj = seq
+        _solveTSPMetaIncumbent(incumbent, bestSeqObj)
 
         popSize = len(popObj)
         geneLen = len(popObj[0].traverse())
@@ -1377,7 +2137,10 @@ def solveTSP(
 
         while (contFlag):
             # Crossover and create offspring
+            # NOTE: 到达deadline时跳过剩下的步骤，直接更新dashboard，新的后代也会被考虑
             while (len(popObj) <= (int)((1 + neighRatio['crossover']) * popSize)):
+                if (_solveTSPMetaTimeout(incumbent)):
+                    break
                 # Randomly select two genes, the better gene has better chance to have offspring
                 
                 rnd1 = None
@@ -1407,6 +2170,8 @@ def solveTSP(
             # swap
             numSwap = (int)(neighRatio['swap'] * popSize)
             for i in range(numSwap):
+                if (_solveTSPMetaTimeout(incumbent)):
+                    break
                 rnd = random.randint(0, len(popObj) - 1)
                 curSeq = [f.key for f in popObj[rnd].traverse()]
                 idx = random.randint(0, geneLen - 1)
@@ -1416,6 +2181,8 @@ def solveTSP(
             # exchange
             numExchange = (int)(neighRatio['exchange'] * popSize)
             for i in range(numExchange):
+                if (_solveTSPMetaTimeout(incumbent)):
+                    break
                 rnd = random.randint(0, len(popObj) - 1)
                 curSeq = [f.key for f in popObj[rnd].traverse()]
                 idx1 = None
@@ -1438,6 +2205,8 @@ def solveTSP(
             # rotate
             numRotate = (int)(neighRatio['rotate'] * popSize)
             for i in range(numRotate):
+                if (_solveTSPMetaTimeout(incumbent)):
+                    break
                 rnd = random.randint(0, len(popObj) - 1)
                 curSeq = [f.key for f in popObj[rnd].traverse()]
                 idx1 = None
@@ -1478,18 +2247,27 @@ def solveTSP(
                     newOfvFound = True
                     dashboard['bestOfv'] = seq.dist
                     dashboard['bestSeq'] = [i.key for i in seq.traverse()]
+                    bestSeqObj = seq
             if (newOfvFound):
                 iterNoImp = 0
+                _solveTSPMetaIncumbent(incumbent, bestSeqObj)
             else:
                 iterNoImp += 1
             iterTotal += 1
 
+            # Island model
+            if (migration != None and iterTotal % migration['interval'] == 0):
+                migrate()
+
             writeLog(hyphenStr())
             writeLog("Iter: " + str(iterTotal) + 
                 "\nRuntime [s]: " + str(round((datetime.datetime.now() - startTime).total_seconds(), 2)) + 
                 "\nDist: " + str(dashboard['bestOfv']))
 
             # Check stopping criteria
+            if (_solveTSPMetaTimeout(incumbent)):
+                contFlag = False
+                break
             if ('numNoImproveIter' in stop):
                 if (iterNoImp > stop['numNoImproveIter']):
                     contFlag = False
@@ -1510,6 +2288,9 @@ def solveTSP(
 
         return seqObj
 
+    # NOTE: 元启发式的deadline从调用solveTSP时开始计时
+    callTime = datetime.datetime.now()
+
     # Field names =============================================================
     ptFieldName = 'pt' if 'ptFieldName' not in kwargs else kwargs['ptFieldName']
 
@@ -1562,6 +2343,9 @@ def solveTSP(
         if ('impv' not in kwargs):
             kwargs['impv'] = '2Opt'
             warnings.warn("WARNING: No local improvement heuristic are specified.")
+        for impv in ([kwargs['impv']] if type(kwargs['impv']) == str else kwargs['impv']):
+            if (impv not in ['2Opt', '2OptNL', 'OrOpt', 'Relocate', 'LK']):
+                raise UnsupportedInputError("ERROR: `impv` supports '2Opt', '2OptNL', 'OrOpt', 'Relocate' and 'LK'")
     elif (algo == 'Metaheuristic'):
         if ('cons' not in kwargs):
             kwargs['cons'] = 'NearestNeighbor'
@@ -1569,11 +2353,24 @@ def solveTSP(
         if ('meta' not in kwargs):
             kwargs['meta'] = 'SimulatedAnnealing'
             warnings.warn("WARNING: No metaheuristic are specified.")
+        if ('deadline' in kwargs and type(kwargs['deadline']) in [int, float]):
+            kwargs['deadline'] = callTime + datetime.timedelta(seconds = kwargs['deadline'])
+        if ('stop' not in kwargs and 'deadline' not in kwargs):
+            raise MissingParameterError("ERROR: Missing required field `stop` or `deadline` for metaheuristic.")
+        # NOTE: 岛屿之间只有同时运行时才能交换基因，依次运行时前一个岛屿结束后才会发出基因
+        if (kwargs['meta'] == 'GeneticAlgorithm' 
+                and 'migrationInterval' in kwargs and kwargs['migrationInterval'] != None
+                and 'numStarts' in kwargs and kwargs['numStarts'] > 1
+                and ('workers' not in kwargs or kwargs['workers'] == None or kwargs['workers'] < kwargs['numStarts'])):
+            raise UnsupportedInputError("ERROR: `migrationInterval` requires `workers` >= `numStarts`, so that all islands run at the same time.")
 
     # Define tau ==============================================================
     tau = None
     pathPt = None
-    if (detailFlag):
+    if ('sharedTau' in kwargs):
+        # NOTE: 多起点的元启发式中，每个起点直接使用主进程中算好的tau
+        tau = kwargs['sharedTau']
+    elif (detailFlag):
         res = matrixDist(
             nodes = nodes, 
             nodeIDs = nodeIDs,
@@ -1593,15 +2390,15 @@ def solveTSP(
 
     # Check symmetric =========================================================
     asymFlag = False
-    for (i, j) in tau:
-        if (tau[i, j] != tau[j, i]):
-            asymFlag = True
-            break
+    if (isinstance(tau, DistMatrix)):
+        asymFlag = not tau.isSymmetric()
+    else:
+        for (i, j) in tau:
+            if (tau[i, j] != tau[j, i]):
+                asymFlag = True
+                break
 
     # Open TSP modify =========================================================
-    M = 0
-    for (i, j) in tau:
-        M += tau[i, j]
     if (depotID == None and (startID != None and endID != None)):
         depotID = endID
         tau[startID, endID] = 0
@@ -1645,9 +2442,27 @@ def solveTSP(
         nodeObj = {}
         for n in nodeIDs:
             nodeObj[n] = RouteNode(n, value=nodes[n][ptFieldName])
+        incumbent = {
+            'startTime': callTime,
+            'deadline': None if 'deadline' not in kwargs else kwargs['deadline'],
+            'onIncumbent': None if 'onIncumbent' not in kwargs else kwargs['onIncumbent'],
+            'depotID': depotID,
+            'convergence': []
+        }
 
+        # Multi-start, each start is an independent trajectory
+        if ('numStarts' in kwargs and kwargs['numStarts'] > 1):
+            tsp = _solveTSPMetaMultiStart(
+                nodes = nodes, 
+                nodeIDs = nodeIDs, 
+                depotID = depotID, 
+                tau = tau, 
+                incumbent = incumbent,
+                **kwargs)
+            tsp['cons'] = kwargs['cons']
+            tsp['meta'] = kwargs['meta']
         # Population based
-        if (kwargs['meta'] in ['GeneticAlgorithm', 'PSO', 'ACO']):
+        elif (kwargs['meta'] in ['GeneticAlgorithm', 'PSO', 'ACO']):
             # Two-phase: popularize phase
             popObj = _solveTSPHeuPop(
                 nodes = nodes,
@@ -1664,6 +2479,7 @@ def solveTSP(
                 tau = tau,
                 depotID = depotID,
                 asymFlag = asymFlag,
+                incumbent = incumbent,
                 **kwargs)
             tsp['cons'] = kwargs['cons']
             tsp['meta'] = kwargs['meta']
@@ -1681,6 +2497,7 @@ def solveTSP(
             # Two-phase: local search phase
             tsp = _solveMetaLocalSearch( 
                 seqObj = seqObj, 
+                incumbent = incumbent,
                 **kwargs)
             tsp['cons'] = kwargs['cons']
             tsp['meta'] = kwargs['meta']
@@ -1749,7 +2566,7 @@ def solveTSP(
         # 对每个leg检索path中的shapepoints，涉及到serviceTime，先不看最后一段leg
         for i in range(1, len(nodeSeq) - 1):
             # 对于Euclidean型的，没有中间节点
-            if (edges in ['Euclidean', 'LatLon']):
+            if (edges in ['Euclidean', 'LatLon', 'EuclideanKNN', 'LatLonKNN']):
                 curTime += tau[nodeSeq[i - 1], nodeSeq[i]] / vehicles[vehicleID]['speed']
                 curPt = nodes[nodeSeq[i]][ptFieldName]
                 timedSeq.append((curPt, curTime))
@@ -1768,7 +2585,7 @@ def solveTSP(
                 # curPt = curPt
                 timedSeq.append((curPt, curTime))
         # 现在补上最后一段leg
-        if (edges in ['Euclidean', 'LatLon']):
+        if (edges in ['Euclidean', 'LatLon', 'EuclideanKNN', 'LatLonKNN']):
             curTime += tau[nodeSeq[-2], nodeSeq[-1]] / vehicles[vehicleID]['speed']
             curPt = nodes[nodeSeq[-1]][ptFieldName]
             timedSeq.append((curPt, curTime))
@@ -1793,6 +2610,10 @@ def solveTSP(
         res['solType'] = tsp['solType']
         res['lowerBound'] = tsp['lowerBound']
         res['upperBound'] = tsp['upperBound']   
+    if (algo == 'Metaheuristic'):
+        res['convergence'] = tsp['convergence']
+        if ('starts' in tsp):
+            res['starts'] = tsp['starts']
     if (metaFlag):
         res['algo'] = algo
         res['serviceTime'] = serviceTime
@@ -1802,3 +2623,32 @@ def solveTSP(
     res['runtime'] = (datetime.datetime.now() - startTime).total_seconds()
 
     return res
+
+def _solveTSPMetaStart(seed, migration, incumbentQueue, nodes, nodeIDs, depotID, tau, startKwargs, budget = None) -> dict:
+    # NOTE: 需要在模块层级才能被子进程调用，每个起点都是一次独立的solveTSP
+    random.seed(seed)
+    np.random.seed(seed % (2 ** 32))
+    startTime = datetime.datetime.now()
+    if (budget != None):
+        startKwargs = dict(startKwargs)
+        startKwargs['deadline'] = min(startKwargs['deadline'], startTime + datetime.timedelta(seconds = budget))
+    if (incumbentQueue != None):
+        def onIncumbent(seq, ofv, elapsed):
+            incumbentQueue.put((seq, ofv))
+        startKwargs = dict(startKwargs)
+        startKwargs['onIncumbent'] = onIncumbent
+    res = solveTSP(
+        nodes = nodes, 
+        depotID = depotID, 
+        nodeIDs = nodeIDs, 
+        algo = 'Metaheuristic', 
+        sharedTau = tau, 
+        migration = migration, 
+        **startKwargs)
+    seq = res['seq']
+    return {
+        'ofv': sum(tau[seq[k], seq[k + 1]] for k in range(len(seq) - 1)),
+        'seq': seq,
+        'convergence': res['convergence'],
+        'runtime': (datetime.datetime.now() - startTime).total_seconds()
+    }